@@ -0,0 +1,99 @@
+from metrics import Counter, Gauge
+
+SENSOR_SAMPLES = Counter("planter_sensor_samples_total", "Sensor readings actually taken, by channel.")
+SAMPLE_INTERVAL = Gauge("planter_sample_interval_seconds", "Current adaptive sampling interval, by channel.")
+
+
+class AdaptiveSampler:
+    """Sampling interval for one signal, driven by its rate of change.
+
+    After each reading the interval is set so the signal is expected to move about
+    `change` units between samples (change / rate), growing by at most `backoff`x per
+    sample while the signal is stable and dropping straight to `min_interval` on fast
+    change. `change` may be a tuple when one read returns several values (DHT11).
+    """
+
+    def __init__(self, name, min_interval, max_interval, change, backoff=2.0):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.change = change
+        self.backoff = backoff
+        self.interval = min_interval
+        self.next_due = 0.0
+        self.burst_until = 0.0
+        self._last_value = None
+        self._last_time = None
+
+    def due(self, now):
+        return now >= self.next_due
+
+    def record(self, value, now):
+        SENSOR_SAMPLES.inc(channel=self.name)
+        if self._last_value is not None and value is not None and now > self._last_time:
+            steps = self._normalized_change(self._last_value, value)  # in units of `change`
+            rate = steps / (now - self._last_time)
+            target = 1.0 / rate if rate > 0 else self.max_interval
+            self.interval = min(target, self.interval * self.backoff)
+        if now < self.burst_until:
+            self.interval = self.min_interval
+        self.interval = max(self.min_interval, min(self.interval, self.max_interval))
+        if value is not None:
+            self._last_value = value
+            self._last_time = now
+        self.next_due = now + self.interval
+        SAMPLE_INTERVAL.set(self.interval, channel=self.name)
+
+    def burst(self, now, duration):
+        """Sample at the minimum interval, starting now, for `duration` seconds."""
+        self.burst_until = now + duration
+        self.interval = self.min_interval
+        self.next_due = now
+
+    def snapshot(self):
+        return {"interval": self.interval, "next_due": self.next_due, "burst_until": self.burst_until,
+                "last_value": self._last_value, "last_time": self._last_time}
+
+    def restore(self, state):
+        self.interval = max(self.min_interval, min(state["interval"], self.max_interval))
+        self.next_due = state["next_due"]
+        self.burst_until = state["burst_until"]
+        self._last_value = state["last_value"]
+        self._last_time = state["last_time"]
+
+    def _normalized_change(self, old, new):
+        if not isinstance(new, tuple):
+            return abs(new - old) / self.change
+        steps = [abs(b - a) / c for a, b, c in zip(old, new, self.change) if a is not None and b is not None]
+        return max(steps, default=0.0)
+
+
+class SamplingScheduler:
+    """The set of adaptive samplers driven by one control loop."""
+
+    def __init__(self, samplers):
+        self.samplers = {sampler.name: sampler for sampler in samplers}
+
+    def __getitem__(self, name):
+        return self.samplers[name]
+
+    def due(self, now):
+        return {name for name, sampler in self.samplers.items() if sampler.due(now)}
+
+    def record(self, name, value, now):
+        self.samplers[name].record(value, now)
+
+    def burst(self, names, now, duration):
+        for name in names:
+            self.samplers[name].burst(now, duration)
+
+    def snapshot(self):
+        return {name: sampler.snapshot() for name, sampler in self.samplers.items()}
+
+    def restore(self, state):
+        for name, saved in state.items():
+            if name in self.samplers:
+                self.samplers[name].restore(saved)
+
+    def next_deadline(self):
+        return min(sampler.next_due for sampler in self.samplers.values())
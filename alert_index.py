@@ -0,0 +1,372 @@
+"""Inverted and time index over alerts.log and its alerts_*.zip archives, for the assistant.
+
+Each log line is parsed once into (time, alert type, message) and stored in SQLite.
+The alert type is the message with its numbers blanked out. An inverted index maps
+words to alert types, and entries are indexed by (type, time). alerts.log is indexed
+from the byte offset where the previous refresh stopped. An archive is read only
+when it first appears. Answering a question reads the index and never the archives.
+
+retrieve() takes the time window the question names ("yesterday", "last week",
+"last 3 days", "23-06", "june") and the alert types its words match. It returns
+those entries with repeats collapsed into time ranges, within a character budget.
+
+    index = AlertIndex()
+    index.refresh()
+    context = index.retrieve("Why was the tank empty last week?")
+
+    python3 alert_index.py "what happened yesterday?"   # print the context /ask would send
+"""
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+from metrics import Counter, Histogram
+
+ALERTS_LOG = "alerts.log"
+INDEX_FILE = "alert_index.db"
+ARCHIVE_PATTERN = "alerts_*.zip"
+
+ENTRIES_INDEXED = Counter("planter_alert_index_entries_total", "Alert log lines added to the index, by source type.")
+RETRIEVE_SECONDS = Histogram("planter_alert_index_retrieve_seconds", "Time to refresh the index and build /ask context.")
+
+SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, offset INTEGER, head TEXT);
+CREATE TABLE IF NOT EXISTS kinds (id INTEGER PRIMARY KEY, signature TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, kind INTEGER NOT NULL, PRIMARY KEY (term, kind)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (t REAL NOT NULL, kind INTEGER NOT NULL, source TEXT NOT NULL, message TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_kind_t ON entries (kind, t);
+CREATE INDEX IF NOT EXISTS entries_t ON entries (t);
+CREATE INDEX IF NOT EXISTS entries_source ON entries (source);
+"""
+
+LINE = re.compile(r"^\[(\d{2})-(\d{2}) (\d{2}):(\d{2})\] (.*)$")
+ARCHIVE_TIME = re.compile(r"alerts_(\d{8}_\d{6})\.zip$")
+NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+WORD = re.compile(r"[a-z]+")
+
+STOPWORDS = set("""
+the and for are was were what why when how did does has have had with this that from
+there their about into than then them they you your yes not any all can could would
+should will been being its it's which who whom happened happen going plant planter
+last past today yesterday week weeks day days hour hours month months night ago since
+too much very many some get got need does
+""".split())
+
+# Question words -> words the alert messages actually use
+SYNONYMS = {
+    "temperature": ("hot", "cold", "temp"), "heat": ("hot", "temp"), "warm": ("hot", "temp"),
+    "freezing": ("cold", "temp"), "humid": ("humidity",), "wet": ("humidity", "soil"),
+    "dry": ("soil", "dry", "watering"), "thirsty": ("soil", "watering"), "die": ("soil", "water", "hot", "cold"),
+    "dead": ("soil", "water", "hot", "cold"), "wilt": ("soil", "watering", "hot"),
+    "tank": ("water", "tank", "fill", "leak"), "empty": ("water", "fill", "tank"), "refill": ("fill", "tank"),
+    "pump": ("pump", "watering", "burst"), "sensor": ("sensor", "stuck", "jumped", "silent", "dht"),
+    "broken": ("sensor", "stuck", "jumped", "silent"), "fault": ("sensor", "stuck", "jumped", "silent"),
+    "dark": ("light",), "sun": ("light",),
+}
+
+MONTHS = ("january", "february", "march", "april", "may", "june", "july", "august", "september",
+          "october", "november", "december")
+UNITS = {"hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+RUN_GAP = 1800  # repeats of one alert type closer than this are shown as one time range
+
+
+def _stem(word):
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def terms(text):
+    """Stemmed index terms of a message or question."""
+    return {_stem(word) for word in WORD.findall(text.lower()) if len(word) >= 3 and word not in STOPWORDS}
+
+
+def question_terms(question):
+    words = WORD.findall(question.lower())
+    expanded = set(words)
+    for word in words:
+        expanded.update(SYNONYMS.get(word, ()))
+        expanded.update(SYNONYMS.get(_stem(word), ()))
+    return terms(" ".join(expanded))
+
+
+def signature(message):
+    """Alert type: the message with its numbers blanked, so "score 1.3" and "score 2.0" match."""
+    return NUMBER.sub("#", message)
+
+
+def _line_time(day, month, hour, minute, reference):
+    """Log lines have no year: the latest one that puts the line at or before `reference`."""
+    year = reference.year if (month, day) <= (reference.month, reference.day) else reference.year - 1
+    try:
+        return datetime(year, month, day, hour, minute).timestamp()
+    except ValueError:  # 29-02 outside a leap year
+        return None
+
+
+def parse_lines(text, reference):
+    """(timestamp, message) for each well-formed line."""
+    for line in text.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        day, month, hour, minute = (int(group) for group in match.groups()[:4])
+        t = _line_time(day, month, hour, minute, reference)
+        if t is not None:
+            yield t, match.group(5)
+
+
+# --- Time windows named in a question ---
+
+def _midnight(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# dd-mm or dd/mm, as in the log. Not part of a longer number, date or range ("2026-10-01",
+# "23.5", "10-12-2026") and not followed by a unit ("10-12%", "5/8 degrees").
+DAY_MONTH = re.compile(r"(?<![\d.,/-])\b(\d{1,2})[-/](\d{1,2})\b(?![.,/-]?\d)(?!\s*(?:%|°|degrees?\b|v\b|lx\b|lux\b))")
+
+
+def time_window(question, now=None):
+    """(start, end, label) for the period the question asks about, or None."""
+    now = datetime.now() if now is None else now
+    text = question.lower()
+    today = _midnight(now)
+    match = re.search(r"\b(?:last|past)\s+(\d+)\s+(hour|day|week|month)s?\b", text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        return now.timestamp() - count * UNITS[unit], now.timestamp(), f"the last {count} {unit}s"
+    match = re.search(r"\b(?:last|past)\s+(hour|day|week|month)\b", text)
+    if match:
+        unit = match.group(1)
+        return now.timestamp() - UNITS[unit], now.timestamp(), f"the last {unit}"
+    if "last night" in text:
+        start = today - timedelta(hours=6)
+        return start.timestamp(), (today + timedelta(hours=8)).timestamp(), "last night"
+    if re.search(r"\byesterday\b", text):
+        return (today - timedelta(days=1)).timestamp(), today.timestamp(), "yesterday"
+    if re.search(r"\b(?:today|tonight|this morning)\b", text):
+        return today.timestamp(), now.timestamp(), "today"
+    if re.search(r"\bthis week\b", text):
+        return (today - timedelta(days=today.weekday())).timestamp(), now.timestamp(), "this week"
+    if re.search(r"\bthis month\b", text):
+        return today.replace(day=1).timestamp(), now.timestamp(), "this month"
+    match = DAY_MONTH.search(text)
+    if match:
+        start = _line_time(int(match.group(1)), int(match.group(2)), 0, 0, now)
+        if start is not None:
+            return start, start + 86400, datetime.fromtimestamp(start).strftime("%d-%m")
+    for number, name in enumerate(MONTHS, 1):
+        pattern = rf"\b(?:in|during|since|of)\s+{name}\b" if name == "may" else rf"\b{name}\b"  # "may" the verb
+        if re.search(pattern, text):
+            first = datetime.fromtimestamp(_line_time(1, number, 0, 0, now))
+            end = first.replace(year=first.year + (number == 12), month=number % 12 + 1)
+            return first.timestamp(), end.timestamp(), name.capitalize()
+    return None
+
+
+# --- Index ---
+
+class AlertIndex:
+    """SQLite-backed index of the current alert log and its archives; safe to share between threads."""
+
+    def __init__(self, log_path=ALERTS_LOG, path=INDEX_FILE, archive_pattern=None):
+        self.log_path = log_path
+        self.archive_pattern = archive_pattern or os.path.join(os.path.dirname(log_path), ARCHIVE_PATTERN)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._kinds = dict(self._db.execute("SELECT signature, id FROM kinds"))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Indexing ---
+
+    def _kind(self, message):
+        sig = signature(message)
+        kind = self._kinds.get(sig)
+        if kind is None:
+            kind = self._db.execute("INSERT INTO kinds (signature) VALUES (?)", (sig,)).lastrowid
+            self._db.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?)", [(term, kind) for term in terms(sig)])
+            self._kinds[sig] = kind
+        return kind
+
+    def _add(self, source, text, reference, source_type):
+        rows = [(t, self._kind(message), source, message) for t, message in parse_lines(text, reference)]
+        self._db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?)", rows)
+        ENTRIES_INDEXED.inc(len(rows), source=source_type)
+        return len(rows)
+
+    def _source(self, name):
+        return self._db.execute("SELECT size, mtime_ns, offset, head FROM sources WHERE name = ?", (name,)).fetchone()
+
+    def _save_source(self, name, stat, offset, head):
+        self._db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                         (name, stat.st_size, stat.st_mtime_ns, offset, head))
+
+    def _index_archive(self, path):
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        known = self._source(name)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return 0
+        match = ARCHIVE_TIME.search(name)
+        try:
+            reference = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")  # when it was rotated
+        except (AttributeError, ValueError):
+            reference = datetime.fromtimestamp(stat.st_mtime)
+        self._db.execute("DELETE FROM entries WHERE source = ?", (name,))
+        added = 0
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                text = archive.read(member).decode("utf-8", errors="replace")
+                added += self._add(name, text, reference, "archive")
+        self._save_source(name, stat, stat.st_size, None)
+        return added
+
+    def _index_log(self):
+        name = os.path.basename(self.log_path)
+        try:
+            f = open(self.log_path, "rb")
+        except FileNotFoundError:
+            return 0
+        with f:
+            stat = os.fstat(f.fileno())
+            known = self._source(name)
+            offset, head = (known[2], known[3]) if known else (0, None)
+            if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+                return 0
+            first = f.readline()
+            if stat.st_size < offset or (head is not None and first.decode("utf-8", errors="replace") != head):
+                # rotated into an archive and cleared since the last refresh: the archive has the old lines
+                self._db.execute("DELETE FROM entries WHERE source = ?", (name,))
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+        complete = data.rfind(b"\n") + 1  # a line still being written waits for the next refresh
+        added = self._add(name, data[:complete].decode("utf-8", errors="replace"),
+                          datetime.fromtimestamp(stat.st_mtime), "log")
+        self._save_source(name, stat, offset + complete, first.decode("utf-8", errors="replace") or None)
+        return added
+
+    def refresh(self):
+        """Index what was appended to the log and any new archives; returns the entries added."""
+        with self._lock, self._db:
+            added = sum(self._index_archive(path) for path in sorted(glob.glob(self.archive_pattern)))
+            return added + self._index_log()
+
+    # --- Retrieval ---
+
+    def matching_kinds(self, question):
+        words = question_terms(question)
+        if not words:
+            return []
+        marks = ",".join("?" * len(words))
+        return [kind for (kind,) in self._db.execute(
+            f"SELECT DISTINCT kind FROM postings WHERE term IN ({marks})", sorted(words))]
+
+    def retrieve(self, question, now=None, max_chars=4000, default_window=7 * 86400):
+        """Prompt context: the alerts of the types and period the question is about, newest kept first."""
+        with RETRIEVE_SECONDS.time(), self._lock:
+            window = time_window(question, now)
+            if window is None:
+                end = (now or datetime.now()).timestamp()
+                window = (end - default_window, end, "the last 7 days")
+            start, end, label = window
+            kinds = self.matching_kinds(question)
+            query = "SELECT t, kind, message FROM entries WHERE t >= ? AND t < ?"
+            params = [start, end]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params += kinds
+            rows = self._db.execute(query + " ORDER BY t", params).fetchall()
+            if not rows and kinds:  # nothing of those types: say what else happened
+                kinds = []
+                rows = self._db.execute("SELECT t, kind, message FROM entries WHERE t >= ? AND t < ? ORDER BY t",
+                                        (start, end)).fetchall()
+        if not rows:
+            return f"No alerts were logged in {label}."
+        return _format(rows, label, bool(kinds), max_chars)
+
+    def entries(self, since, until):
+        """(t, message) oldest first, from a connection of its own so a long export doesn't hold the lock."""
+        db = sqlite3.connect(self.path)
+        try:
+            yield from db.execute("SELECT t, message FROM entries WHERE t >= ? AND t < ? ORDER BY t", (since, until))
+        finally:
+            db.close()
+
+    def stats(self):
+        with self._lock:
+            entries, first, last = self._db.execute("SELECT count(*), min(t), max(t) FROM entries").fetchone()
+            sources = self._db.execute("SELECT count(*) FROM sources").fetchone()[0]
+        return {"entries": entries, "sources": sources, "kinds": len(self._kinds), "first": first, "last": last}
+
+
+def _runs(rows):
+    """Per alert type, repeats less than RUN_GAP apart -> [start, end, count, last message]."""
+    open_runs, runs = {}, []
+    for t, kind, message in rows:
+        run = open_runs.get(kind)
+        if run is not None and t - run[1] <= RUN_GAP:
+            run[1], run[2], run[3] = t, run[2] + 1, message
+            continue
+        run = [t, t, 1, message]
+        open_runs[kind] = run
+        runs.append(run)
+    return runs
+
+
+def _format(rows, label, filtered, max_chars):
+    def stamp(t):
+        return datetime.fromtimestamp(t).strftime("%d-%m %H:%M")
+
+    lines = []
+    for start, end, count, message in _runs(rows):
+        when = f"[{stamp(start)}]" if count == 1 else f"[{stamp(start)} → {stamp(end)}]"
+        lines.append(f"{when} {message}" + (f" (×{count})" if count > 1 else ""))
+    scope = "matching alerts" if filtered else "alerts"
+    header = f"{len(rows)} {scope} from {label}, repeats shown as time ranges:"
+    kept, size = [], len(header)
+    for line in reversed(lines):  # newest first until the budget is spent
+        if size + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    omitted = len(lines) - len(kept)
+    if omitted:
+        header += f"\n({omitted} earlier ranges omitted)"
+    return "\n".join([header] + kept[::-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert log index for the plant assistant")
+    parser.add_argument("question", nargs="?", help="print the context /ask would build for this question")
+    parser.add_argument("--log", default=ALERTS_LOG)
+    parser.add_argument("--index", default=INDEX_FILE)
+    parser.add_argument("--rebuild", action="store_true", help="drop the index and rebuild it from the logs")
+    args = parser.parse_args()
+    if args.rebuild and os.path.exists(args.index):
+        os.remove(args.index)
+    index = AlertIndex(args.log, args.index)
+    started = time.perf_counter()
+    added = index.refresh()
+    print(f"indexed {added} new entries in {(time.perf_counter() - started) * 1000:.1f} ms: {index.stats()}")
+    if args.question:
+        print(index.retrieve(args.question))
+
+
+if __name__ == "__main__":
+    main()
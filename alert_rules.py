@@ -0,0 +1,207 @@
+"""Threshold alerts declared in alert_rules.conf instead of if-chains in each program.
+
+Each [section] of alert_rules.conf is one rule: the snapshot metric it watches, a
+comparator and threshold (a number or a variables.conf key), a hysteresis band, how
+long the condition must hold before the alert fires, a severity, a message template
+and an optional emoji key. The rules are compiled into a flat evaluation plan once and
+recompiled only when alert_rules.conf or variables.conf changes on disk.
+
+    engine = AlertEngine()
+    for alert in engine.evaluate({"temperature": 26, "humidity": 55}, time.time()):
+        messages.append(alert.message)
+        if alert.fired:
+            log_alert(alert.message)
+"""
+import configparser
+import operator
+import os
+import time
+from collections import namedtuple
+
+from metrics import Counter, Gauge
+from planter_config import VARIABLES_FILE, load_variables
+
+RULES_FILE = "alert_rules.conf"
+
+ALERT_ACTIVE = Gauge("planter_alert_active", "1 while an alert rule is firing, by rule.")
+RULE_COMPILES = Counter("planter_alert_rule_compiles_total", "Times the alert rules were compiled into a plan.")
+
+COMPARATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+SEVERITIES = {"info": 0, "warning": 1, "critical": 2}
+
+# fired: True on the tick the alert starts (and on each `repeat`), when it should be logged
+Alert = namedtuple("Alert", "rule severity message emoji fired")
+
+# One compiled rule: everything evaluate() needs, resolved to plain values and callables
+Step = namedtuple("Step", "name metric fires clears duration severity template emoji repeat threshold")
+
+
+class RuleError(ValueError):
+    pass
+
+
+def load_rules(filepath=RULES_FILE):
+    parser = configparser.ConfigParser(interpolation=None, inline_comment_prefixes=(";",))
+    with open(filepath, encoding="utf-8") as file:
+        parser.read_file(file)
+    return {name: dict(parser[name]) for name in parser.sections()}
+
+
+def _number(rule_name, key, value, variables):
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if value not in variables:
+        raise RuleError(f"rule [{rule_name}]: {key} '{value}' is neither a number nor a variables.conf key")
+    return float(variables[value])
+
+
+def compile_plan(rules, variables):
+    """Rules (as from load_rules) -> tuple of Steps with thresholds resolved from `variables`."""
+    plan = []
+    for name, rule in rules.items():
+        op = rule.get("op", ">").strip()
+        if op not in COMPARATORS:
+            raise RuleError(f"rule [{name}]: unknown op '{op}' (use one of {' '.join(COMPARATORS)})")
+        if "metric" not in rule or "threshold" not in rule:
+            raise RuleError(f"rule [{name}]: metric and threshold are required")
+        severity = rule.get("severity", "warning").strip()
+        if severity not in SEVERITIES:
+            raise RuleError(f"rule [{name}]: unknown severity '{severity}'")
+        threshold = _number(name, "threshold", rule["threshold"].strip(), variables)
+        hysteresis = _number(name, "hysteresis", rule.get("hysteresis", "0").strip(), variables)
+        template = rule.get("message", f"⚠️ {name}: {{metric}} {op} {{threshold:g}} ({{value:g}})").strip()
+        try:
+            template.format(metric="", value=0.0, threshold=threshold)
+        except (KeyError, IndexError, ValueError) as e:
+            raise RuleError(f"rule [{name}]: bad message template: {e}")
+        compare = COMPARATORS[op]
+        # clears once the value is back past the threshold by the hysteresis band
+        clear_at = threshold + hysteresis if op in ("<", "<=") else threshold - hysteresis
+        plan.append(Step(
+            name=name,
+            metric=rule["metric"].strip(),
+            fires=lambda value, compare=compare, threshold=threshold: compare(value, threshold),
+            clears=lambda value, compare=compare, clear_at=clear_at: not compare(value, clear_at),
+            duration=_number(name, "duration", rule.get("duration", "0").strip(), variables),
+            severity=severity,
+            template=template,
+            emoji=rule.get("emoji", "").strip() or None,
+            repeat=_number(name, "repeat", rule.get("repeat", "0").strip(), variables),
+            threshold=threshold,
+        ))
+    RULE_COMPILES.inc()
+    return tuple(plan)
+
+
+class _RuleState:
+    def __init__(self):
+        self.active = False
+        self.since = None       # when the condition started holding
+        self.logged = None      # when the alert was last reported as fired
+        self.value = None       # last known value, for the message while the metric is missing
+
+    def snapshot(self):
+        return {"active": self.active, "since": self.since, "logged": self.logged, "value": self.value}
+
+    def restore(self, state):
+        self.active, self.since, self.logged, self.value = state["active"], state["since"], state["logged"], state["value"]
+
+
+class AlertEngine:
+    """Evaluates the compiled plan over each tick's snapshot, with per-rule hysteresis state."""
+
+    def __init__(self, rules_path=RULES_FILE, variables_path=VARIABLES_FILE, overrides=None, check_interval=5.0,
+                 labels=None):
+        self.rules_path = rules_path
+        self.variables_path = variables_path
+        self.overrides = overrides or {}
+        self.check_interval = check_interval
+        self.labels = labels or {}  # extra metric labels, e.g. planter=<name>
+        self.states = {}
+        self._stamp = None
+        self._checked = 0.0
+        self.plan = ()
+        self._reload(initial=True)
+
+    def _mtimes(self):
+        stamp = []
+        for path in (self.rules_path, self.variables_path):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _reload(self, initial=False):
+        stamp = self._mtimes()
+        try:
+            variables = load_variables(self.variables_path)
+            variables.update(self.overrides)
+            plan = compile_plan(load_rules(self.rules_path), variables)
+        except (OSError, configparser.Error, RuleError) as e:
+            if initial:
+                raise
+            print(f"⚠️ Alert rules not reloaded, keeping the previous ones: {e}")
+            self._stamp = stamp  # don't retry until the files change again
+            return
+        self.plan = plan
+        self._stamp = stamp
+        names = {step.name for step in plan}
+        for name in set(self.states) - names:
+            ALERT_ACTIVE.set(0, rule=name, **self.labels)  # rule removed from the file
+        self.states = {name: self.states.get(name) or _RuleState() for name in names}
+
+    def snapshot(self):
+        return {name: state.snapshot() for name, state in self.states.items()}
+
+    def restore(self, saved):
+        """Hysteresis state of rules that still exist; thresholds always come from the current files."""
+        for name, state in saved.items():
+            if name in self.states:
+                self.states[name].restore(state)
+                ALERT_ACTIVE.set(int(self.states[name].active), rule=name, **self.labels)
+
+    def maybe_reload(self, now):
+        if now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        if self._mtimes() == self._stamp:
+            return False
+        self._reload()
+        return True
+
+    def evaluate(self, snapshot, now=None):
+        """Active alerts for this snapshot, most severe first. Metrics that are None keep their state."""
+        now = time.time() if now is None else now
+        self.maybe_reload(now)
+        active = []
+        for step in self.plan:
+            state = self.states[step.name]
+            value = snapshot.get(step.metric)
+            if value is not None:
+                state.value = value
+                if state.active:
+                    if step.clears(value):
+                        state.active = False
+                        state.since = None
+                        ALERT_ACTIVE.set(0, rule=step.name, **self.labels)
+                elif step.fires(value):
+                    if state.since is None:
+                        state.since = now
+                    if now - state.since >= step.duration:
+                        state.active = True
+                        state.logged = None
+                        ALERT_ACTIVE.set(1, rule=step.name, **self.labels)
+                else:
+                    state.since = None
+            if not state.active:
+                continue
+            fired = state.logged is None or (step.repeat > 0 and now - state.logged >= step.repeat)
+            if fired:
+                state.logged = now
+            message = step.template.format(metric=step.metric, value=state.value, threshold=step.threshold)
+            active.append(Alert(step.name, step.severity, message, step.emoji, fired))
+        active.sort(key=lambda alert: -SEVERITIES[alert.severity])
+        return active
@@ -0,0 +1,384 @@
+"""Streaming anomaly detection over the planter's sensor channels.
+
+Every detector keeps O(1) state per channel and looks at one sample at a time:
+
+  stuck    raw voltage has not moved by more than the channel's noise for ANOMALY_STUCK_SECONDS
+           (light readings at or below ANOMALY_LIGHT_FLOOR are a dark room, not a fault)
+  jump     the level shifted by more than ANOMALY_JUMP_SIGMA standard deviations and stayed
+           there (single spikes are left to the Hampel filter). Off for light unless
+           ANOMALY_LIGHT_JUMP_SIGMA is set: a lamp or a blind is a real step, not a fault
+  leak     tank level falling faster than ANOMALY_LEAK_RATE %/h while the pump is off
+  dropout  the DHT11 has gone quiet for much longer than its usual gap between readings
+
+Events carry a score (observed / threshold, so >= 1) and go to a sink, normally log_alert.
+
+    python3 anomaly.py --simulate      # inject faults into simulated sensors
+"""
+import argparse
+import math
+import random
+from collections import namedtuple
+
+from metrics import Counter, Gauge
+from watering_predictor import DryingPredictor
+
+ANOMALIES = Counter("planter_anomalies_total", "Anomaly events raised, by kind and channel.")
+ANOMALY_SCORE = Gauge("planter_anomaly_score", "Score of the last anomaly event, by kind and channel.")
+
+AnomalyEvent = namedtuple("AnomalyEvent", "kind channel score message timestamp")
+
+ADC_LSB = 0.000125  # ADS1115 at gain 1
+
+
+class RollingStats:
+    """Exponentially weighted mean and variance, O(1) per sample."""
+
+    def __init__(self, alpha=0.05):
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+
+    def update(self, x):
+        self.count += 1
+        if self.count == 1:
+            self.mean = x
+            return
+        delta = x - self.mean
+        self.mean += self.alpha * delta
+        self.var = (1 - self.alpha) * (self.var + self.alpha * delta * delta)
+
+    def reset(self, x):
+        self.count = 1
+        self.mean = x
+
+    def snapshot(self):
+        return {"count": self.count, "mean": self.mean, "var": self.var}
+
+    def restore(self, state):
+        self.count, self.mean, self.var = state["count"], state["mean"], state["var"]
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class ChannelMonitor:
+    """Stuck and jump detection on one channel's raw samples."""
+
+    def __init__(self, name, noise=None, stuck_seconds=3600.0, jump_sigma=6.0, confirm=2, warmup=20, alpha=0.05,
+                 floor=None):
+        self.name = name
+        self.noise = max(noise or 0.0005, ADC_LSB)
+        self.stuck_seconds = stuck_seconds
+        self.floor = floor          # readings at or below it are legitimately flat (e.g. light in the dark)
+        self.jump_sigma = jump_sigma  # None: no jump detection (steps are normal on this channel)
+        self.confirm = confirm
+        self.warmup = warmup
+        self.stats = RollingStats(alpha)
+        self.anchor = None          # (value, since): stuck while samples stay near it
+        self.shift = None           # (direction, samples) of a pending level shift
+        self.quiet_until = 0.0
+
+    def update(self, x, now):
+        events = []
+        stuck = self._check_stuck(x, now)
+        if stuck:
+            events.append(stuck)
+        if self.jump_sigma is None:
+            return events
+        if now < self.quiet_until:
+            self.stats.update(x)  # expected change (pump): follow it, don't judge it
+            self.shift = None
+            return events
+        jump = self._check_jump(x, now)
+        if jump:
+            events.append(jump)
+        return events
+
+    def snapshot(self):
+        return {"stats": self.stats.snapshot(), "anchor": self.anchor, "shift": self.shift,
+                "quiet_until": self.quiet_until}
+
+    def restore(self, state):
+        self.stats.restore(state["stats"])
+        self.anchor, self.shift, self.quiet_until = state["anchor"], state["shift"], state["quiet_until"]
+
+    def _check_stuck(self, x, now):
+        if self.floor is not None and x <= self.floor:
+            self.anchor = None
+            return None
+        if self.anchor is None or abs(x - self.anchor[0]) > self.noise / 4:
+            self.anchor = (x, now)
+            return None
+        held = now - self.anchor[1]
+        if held < self.stuck_seconds:
+            return None
+        return AnomalyEvent("stuck", self.name, held / self.stuck_seconds,
+                            f"⚠️ {self.name.capitalize()} sensor stuck at {x:.4f} V for {held / 60:.0f} min.", now)
+
+    def _check_jump(self, x, now):
+        stats = self.stats
+        if stats.count < self.warmup:
+            stats.update(x)
+            return None
+        spread = math.sqrt(stats.var + self.noise * self.noise)
+        z = (x - stats.mean) / spread
+        if abs(z) < self.jump_sigma:
+            self.shift = None
+            stats.update(x)
+            return None
+        direction = 1 if z > 0 else -1
+        samples = self.shift[1] + 1 if self.shift and self.shift[0] == direction else 1
+        self.shift = (direction, samples)
+        if samples < self.confirm:
+            return None  # could still be a spike; judge on the next sample
+        before = stats.mean
+        stats.reset(x)
+        self.shift = None
+        return AnomalyEvent("jump", self.name, abs(z) / self.jump_sigma,
+                            f"⚠️ {self.name.capitalize()} sensor jumped {before:.4f} → {x:.4f} V.", now)
+
+
+class LeakMonitor:
+    """Tank level trend while the pump is off, from the same fit used for soil drying."""
+
+    def __init__(self, rate=2.0, window=3600.0, min_drop=3.0, refill_step=5.0):
+        self.rate = rate              # %/h
+        self.min_drop = min_drop      # % below the level the window started at
+        self.refill_step = refill_step
+        self.trend = DryingPredictor(half_life=window, min_points=6, min_span=window)
+        self.start_level = None
+        self.last_level = None
+
+    def restart(self, now):
+        self.trend.reset(now)
+        self.start_level = None
+
+    def snapshot(self):
+        return {"trend": self.trend.snapshot(), "start_level": self.start_level, "last_level": self.last_level}
+
+    def restore(self, state):
+        self.trend.restore(state["trend"])
+        self.start_level, self.last_level = state["start_level"], state["last_level"]
+
+    def update(self, level, now):
+        if self.last_level is not None and level - self.last_level >= self.refill_step:
+            self.restart(now)  # tank refilled
+        self.last_level = level
+        if self.start_level is None:
+            self.start_level = level
+        self.trend.update(now, level)
+        fit = self.trend.fit()
+        if fit is None:
+            return None
+        slope, fitted, _ = fit
+        per_hour = -slope * 3600
+        if per_hour < self.rate or self.start_level - fitted < self.min_drop:
+            return None
+        return AnomalyEvent("leak", "water", per_hour / self.rate,
+                            f"⚠️ Possible leak: tank level falling {per_hour:.1f} %/h with the pump off.", now)
+
+
+class DropoutMonitor:
+    """DHT silence measured against the learned gap between its good readings."""
+
+    def __init__(self, min_silence=600.0, factor=4.0, alpha=0.1):
+        self.min_silence = min_silence
+        self.factor = factor
+        self.gaps = RollingStats(alpha)
+        self.last_timestamp = None
+        self.started = None
+        self.episodes = 0
+        self._in_dropout = False
+
+    def snapshot(self):
+        return {"gaps": self.gaps.snapshot(), "last_timestamp": self.last_timestamp, "started": self.started,
+                "episodes": self.episodes, "in_dropout": self._in_dropout}
+
+    def restore(self, state):
+        self.gaps.restore(state["gaps"])
+        self.last_timestamp, self.started = state["last_timestamp"], state["started"]
+        self.episodes, self._in_dropout = state["episodes"], state["in_dropout"]
+
+    def update(self, reading, now):
+        if self.started is None:
+            self.started = now
+        timestamp = reading.timestamp
+        if timestamp is not None and timestamp != self.last_timestamp:
+            if self.last_timestamp is not None:
+                self.gaps.update(timestamp - self.last_timestamp)
+            self.last_timestamp = timestamp
+            self._in_dropout = False
+        since = self.last_timestamp if self.last_timestamp is not None else self.started
+        silence = now - since
+        limit = max(self.min_silence, self.factor * (self.gaps.mean + self.gaps.std)) if self.gaps.count else self.min_silence
+        if silence < limit:
+            return None
+        if not self._in_dropout:
+            self._in_dropout = True
+            self.episodes += 1
+        usual = f" (usual gap {self.gaps.mean / 60:.1f} min)" if self.gaps.count else ""
+        return AnomalyEvent("dropout", "dht", silence / limit,
+                            f"⚠️ DHT11 silent for {silence / 60:.0f} min{usual}, dropout #{self.episodes}.", now)
+
+
+class AnomalyDetector:
+    """Routes samples to the monitors and sends scored events to `sink`, once per `repeat_after`."""
+
+    def __init__(self, channels, leak=None, dropout=None, sink=None, repeat_after=3600.0):
+        self.channels = channels
+        self.leak = leak
+        self.dropout = dropout
+        self.sink = sink
+        self.repeat_after = repeat_after
+        self._last_sent = {}
+
+    def snapshot(self):
+        return {
+            "channels": {name: monitor.snapshot() for name, monitor in self.channels.items()},
+            "leak": self.leak.snapshot() if self.leak is not None else None,
+            "dropout": self.dropout.snapshot() if self.dropout is not None else None,
+            "last_sent": dict(self._last_sent),
+        }
+
+    def restore(self, state):
+        for name, saved in state["channels"].items():
+            if name in self.channels:
+                self.channels[name].restore(saved)
+        if self.leak is not None and state["leak"] is not None:
+            self.leak.restore(state["leak"])
+        if self.dropout is not None and state["dropout"] is not None:
+            self.dropout.restore(state["dropout"])
+        self._last_sent = dict(state["last_sent"])
+
+    def observe(self, name, voltage, now):
+        monitor = self.channels.get(name)
+        if monitor is not None:
+            for event in monitor.update(voltage, now):
+                self._emit(event)
+
+    def observe_level(self, level, now):
+        water = self.channels.get("water")
+        if self.leak is not None and (water is None or now >= water.quiet_until):
+            self._emit(self.leak.update(level, now))
+
+    def observe_dht(self, reading, now):
+        if self.dropout is not None:
+            self._emit(self.dropout.update(reading, now))
+
+    def expect_change(self, names, until):
+        """The pump is about to change these channels: no jump or leak judgement until `until`."""
+        for name in names:
+            if name in self.channels:
+                self.channels[name].quiet_until = max(self.channels[name].quiet_until, until)
+        if self.leak is not None and "water" in names:
+            self.leak.restart(until)
+
+    def _emit(self, event):
+        if event is None:
+            return
+        key = (event.kind, event.channel)
+        last = self._last_sent.get(key)
+        if last is not None and event.timestamp - last < self.repeat_after:
+            return
+        self._last_sent[key] = event.timestamp
+        ANOMALIES.inc(kind=event.kind, channel=event.channel)
+        ANOMALY_SCORE.set(round(event.score, 2), kind=event.kind, channel=event.channel)
+        if self.sink is not None:
+            self.sink(event)
+
+
+def noise_for(config, sensor):
+    """Smallest calibrated noise (std, V) for a sensor, from calibrate.py's *_NOISE keys."""
+    values = [value for key, value in config.items() if key.startswith(f"{sensor}_") and key.endswith("_NOISE")]
+    return min(values) if values else None
+
+
+def from_config(config, sink=None):
+    stuck = config.get("ANOMALY_STUCK_SECONDS", 3600)
+    sigma = config.get("ANOMALY_JUMP_SIGMA", 6)
+    floors = {"light": config.get("ANOMALY_LIGHT_FLOOR", 0.02)}  # V; ~20 lx on the default light curve
+    sigmas = {"light": config.get("ANOMALY_LIGHT_JUMP_SIGMA") or None}  # lamps and blinds step the light level
+    channels = {
+        name: ChannelMonitor(name, noise_for(config, name.upper()), stuck_seconds=stuck,
+                             jump_sigma=sigmas.get(name, sigma), floor=floors.get(name))
+        for name in ("soil", "water", "light")
+    }
+    return AnomalyDetector(
+        channels,
+        leak=LeakMonitor(rate=config.get("ANOMALY_LEAK_RATE", 2), window=config.get("ANOMALY_LEAK_WINDOW", 3600)),
+        dropout=DropoutMonitor(min_silence=config.get("ANOMALY_DHT_SILENCE", 600)),
+        sink=sink,
+        repeat_after=config.get("ANOMALY_REPEAT_SECONDS", 3600),
+    )
+
+
+# --- Simulation check ---
+
+def simulate(hours=48, dt=10.0, seed=2):
+    """Healthy sensors for the first half (including a dark night), then one injected fault per monitor.
+    A lamp is switched on every evening; it must never raise an alert.
+
+    Returns (false alarms: anything before the faults or on light, {fault: minutes until detected or None}).
+    """
+    from dht_poller import DHTReading
+
+    rng = random.Random(seed)
+    events = []
+    detector = from_config({}, sink=events.append)
+    fault_at = hours / 2 * 3600
+    faults = {"stuck": ("soil", fault_at), "jump": ("water", fault_at), "leak": ("water", fault_at),
+              "dropout": ("dht", fault_at)}
+    level = 80.0
+    dht_time = 0.0
+    t = 0.0
+    pump_every = 6 * 3600
+    while t < hours * 3600:
+        day = max(math.sin(2 * math.pi * (t / 86400 - 0.25)), 0.0)
+        soil = 2.1 + 0.3 * math.exp(-(t % pump_every) / 7200) + rng.gauss(0, 0.0005)
+        if t >= fault_at:
+            soil = 2.25  # probe pinned
+        lamp = 0.8 if 19 <= t % 86400 / 3600 < 23 else 0.0  # a reading lamp, 19:00-23:00
+        light = (1.5 * day + lamp) * (1 + rng.gauss(0, 0.002))  # a dark room reads a flat 0 V all night
+        if t % pump_every < dt and 0 < t < fault_at:
+            detector.expect_change(("soil", "water"), t + 300)
+            level -= 3.0
+        level -= (0.05 + (4.0 if t >= fault_at else 0.0)) * dt / 3600
+        level = max(level, 0.0)
+        detector.observe("soil", soil, t)
+        detector.observe("light", light, t)
+        water = 2.4 + level / 200 + rng.gauss(0, 0.0005) + (0.3 if t >= fault_at else 0.0)  # probe shifted
+        detector.observe("water", water, t)
+        detector.observe_level(int(level), t)
+        if t < fault_at and t - dht_time >= rng.choice((2, 4, 60)):
+            dht_time = t
+        detector.observe_dht(DHTReading(50, 21, dht_time or None, "ok"), t)
+        t += dt
+    false_alarms = [e for e in events if e.timestamp < fault_at or e.channel == "light"]
+    detected = {}
+    for kind, (channel, start) in faults.items():
+        hits = [e.timestamp for e in events if e.kind == kind and e.channel == channel and e.timestamp >= start]
+        detected[kind] = (hits[0] - start) / 60 if hits else None
+    return false_alarms, detected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensor anomaly detection")
+    parser.add_argument("--simulate", action="store_true")
+    args = parser.parse_args()
+    if not args.simulate:
+        parser.print_help()
+        return
+    false_alarms, detected = simulate()
+    print(f"false alarms (24 h of healthy sensors, evening lamp): {len(false_alarms)}")
+    for event in false_alarms:
+        print(f"  {event.kind} {event.channel}: {event.message}")
+    for kind, minutes in detected.items():
+        print(f"{kind:>8}: " + (f"detected after {minutes:.0f} min" if minutes is not None else "missed"))
+    if false_alarms or None in detected.values():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
-from flask import Flask, request, render_template_string, redirect, url_for
+from flask import Flask, Response, request, render_template_string, redirect, url_for, stream_with_context
 import os
+import time
 import requests
 from dotenv import load_dotenv
+import profiling
+from alert_index import AlertIndex
+import export
+import history
 
 load_dotenv()
 
@@ -9,12 +14,16 @@ app = Flask(__name__)
 
 # Load Hugging Face API token and URL
 HF_API_TOKEN = os.getenv("HF_API_TOKEN")
-HF_API_URL = "https://api-inference.huggingface.co/models/HuggingFaceH4/zephyr-7b-beta"
+# HF_API_URL in the environment overrides it (a self-hosted model, or loadtest.py's stub)
+HF_API_URL = os.getenv("HF_API_URL", "https://api-inference.huggingface.co/models/HuggingFaceH4/zephyr-7b-beta")
 HEADERS = {"Authorization": f"Bearer {HF_API_TOKEN}"}
 
 VARIABLES_FILE = "variables.conf"
 ALERTS_LOG = "alerts.log"
 
+# Current log and alerts_*.zip archives, indexed incrementally; /ask sends only the relevant part
+alert_index = AlertIndex(ALERTS_LOG)
+
 # Templates
 HOME_TEMPLATE = """
 <!DOCTYPE html>
@@ -33,7 +42,8 @@ HOME_TEMPLATE = """
         <p style="color:red;"><strong>Error:</strong> {{ error }}</p>
     {% endif %}
     <br>
-    <a href="{{ url_for('edit_config') }}">Edit Configuration</a>
+    <a href="{{ url_for('edit_config') }}">Edit Configuration</a> |
+    <a href="{{ url_for('export_history', format='csv', gzip=1) }}">Download history (CSV)</a>
 </body>
 </html>
 """
@@ -80,6 +90,19 @@ def write_config(config):
         for key, value in config.items():
             f.write(f"{key}={value}\n")
 
+def build_prompt(alerts_text, question):
+    return f"""Act as a smart plant monitoring assistant.
+
+Here are the entries from a smart planter's alert log that relate to the question
+(repeated alerts are shown once, with their time range and count):
+
+{alerts_text}
+
+Now, based on this log, answer this user question in simple language:
+
+Q: {question}
+A:"""
+
 # Routes
 @app.route("/", methods=["GET"])
 def index():
@@ -98,21 +121,12 @@ def ask_ai():
         return render_template_string(HOME_TEMPLATE, error="alerts.log file not found.")
 
     try:
-        with open(ALERTS_LOG, "r") as log_file:
-            alerts_text = log_file.read()
+        alert_index.refresh()
+        alerts_text = alert_index.retrieve(prompt)
     except Exception as e:
         return render_template_string(HOME_TEMPLATE, error=f"Error reading alerts.log: {e}")
 
-    full_prompt = f"""Act as a smart plant monitoring assistant.
-
-Here is the recent sensor alert log from a smart planter:
-
-{alerts_text}
-
-Now, based on this log, answer this user question in simple language:
-
-Q: {prompt}
-A:"""
+    full_prompt = build_prompt(alerts_text, prompt)
 
     try:
         response = requests.post(HF_API_URL, headers=HEADERS, json={"inputs": full_prompt})
@@ -144,6 +158,28 @@ def edit_config():
         message = "Configuration saved."
     return render_template_string(CONFIG_TEMPLATE, config=config, message=message)
 
+@app.route("/export", methods=["GET"])
+def export_history():
+    """GET /export?since=2026-09-01&until=...&format=csv|jsonl|binary&gzip=1&only=reading|alert"""
+    args = request.args
+    try:
+        since = export.parse_time(args.get("since"), 0.0)
+        until = export.parse_time(args.get("until"), time.time())
+        fmt = args.get("format", "csv")
+        compress = args.get("gzip", "") in ("1", "true", "yes")
+        kinds = (args["only"],) if args.get("only") in ("reading", "alert") else ("reading", "alert")
+        alert_index.refresh()
+        chunks = export.stream(since, until, fmt, compress, history.ReadingLog(), alert_index, kinds)
+    except ValueError as e:
+        return Response(f"Bad export request: {e}\n", status=400, mimetype="text/plain")
+    # No Content-Length: the body goes out with chunked transfer encoding as it is generated
+    return Response(stream_with_context(chunks), mimetype="application/gzip" if compress else export.FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={export.filename(since, until, fmt, compress)}"})
+
+# Profiling: POST /profile?n=10&mode=cprofile|sample (from localhost) captures the next n /ask or /config requests
+request_profiler = profiling.Profiler("app")
+profiling.register_flask_hooks(app, request_profiler, endpoints=("ask_ai", "edit_config"))
+
 # Start app
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
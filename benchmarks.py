@@ -0,0 +1,508 @@
+"""Benchmarks for the planter's hot paths on simulated hardware (see fakehw.py).
+
+Usage:
+    python benchmarks.py                          # run everything, print a table
+    python benchmarks.py -o bench.json            # also write machine-readable results
+    python benchmarks.py -k render -o new.json --compare old.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+import zipfile
+from datetime import datetime
+
+import fakehw
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = []
+
+
+def benchmark(name, group):
+    """Register a setup function that returns the callable to time."""
+    def register(setup):
+        BENCHMARKS.append((name, group, setup))
+        return setup
+    return register
+
+
+# --- Simulated Environment ---
+
+def prepare_workdir():
+    """Run from a scratch directory so alerts.log, archives and config writes never touch the repo."""
+    workdir = tempfile.mkdtemp(prefix="planter_bench_")
+    for name in ("variables.conf", "alert_rules.conf"):
+        shutil.copy(os.path.join(REPO_DIR, name), workdir)
+    os.chdir(workdir)
+    try:
+        os.environ["EMOJI_PATH"] = make_emoji_icons(os.path.join(workdir, "emoji_icons"))
+    except ImportError:
+        pass  # without Pillow the rendering benchmarks are reported as skipped
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    fakehw.install()
+    return workdir
+
+
+def make_emoji_icons(path):
+    from PIL import Image
+    os.makedirs(path, exist_ok=True)
+    for i, name in enumerate(("too_cold", "too_hot", "humidity", "watering", "fill_water", "ok")):
+        Image.new("RGBA", (32, 32), (40 * i, 200, 255 - 40 * i, 255)).save(os.path.join(path, f"{name}.png"))
+    return path + os.sep
+
+
+def load_program(name):
+    return importlib.import_module(name)
+
+
+def without_sleep(module):
+    """Swap a program's `time` for one whose sleep() returns at once, leaving the real module alone."""
+    fast_time = types.SimpleNamespace(**{k: getattr(time, k) for k in dir(time) if not k.startswith("__")})
+    fast_time.sleep = lambda seconds: None
+    module.time = fast_time
+    return module
+
+
+def write_alert_log(path, size_bytes):
+    alerts = (
+        "⚠️ Too hot! Temp above threshold.",
+        "⚠️ Too much humidity! Above threshold.",
+        "❌ No water available! Fill the tank.",
+        "🌱 Soil dry and water available → Starting watering...",
+        "💧 Pump OFF. Waiting absorption.",
+    )
+    with open(path, "w") as f:
+        written = 0
+        i = 0
+        while written < size_bytes:
+            line = f"[{(i // 1440) % 28 + 1:02d}-06 {(i // 60) % 24:02d}:{i % 60:02d}] {alerts[i % len(alerts)]}\n"
+            f.write(line)
+            written += len(line.encode("utf-8"))
+            i += 1
+
+
+# --- Sensor Averaging ---
+
+@benchmark("read_avg_voltage", "sensors")
+def bench_read_avg_voltage():
+    mp = load_program("main_program")
+    mp.time = time  # includes the 10 ms settle sleeps between conversions
+    return lambda: mp.read_avg_voltage(mp.channel_soil, name="soil")
+
+
+@benchmark("read_avg_voltage_cpu", "sensors")
+def bench_read_avg_voltage_cpu():
+    mp = without_sleep(load_program("main_program"))
+    return lambda: mp.read_avg_voltage(mp.channel_soil, name="soil")
+
+
+@benchmark("read_filtered_soil", "sensors")
+def bench_read_filtered():
+    mp = load_program("main_program")
+    return lambda: mp.read_filtered(mp.channel_soil, "soil")
+
+
+@benchmark("filter_chain_soil", "sensors")
+def bench_filter_chain():
+    import filters
+    chain = filters.build_chain("hampel:7:3,kalman:1e-9:2.5e-7")
+    samples = [3.839 + (i % 7) * 0.0001 for i in range(100)]
+    return lambda: [chain.update(v, i) for i, v in enumerate(samples)]
+
+
+# --- Calibration and Classification ---
+
+@benchmark("soil_moisture_percent", "calibration")
+def bench_soil_percent():
+    mp = load_program("main_program")
+    voltages = [3.836 + i * 0.00001 for i in range(500)]
+    return lambda: [mp.soil_moisture_percent(v) for v in voltages]
+
+
+@benchmark("water_level_percent", "calibration")
+def bench_water_percent():
+    mp = load_program("main_program")
+    voltages = [2.3 + i * 0.0015 for i in range(500)]
+    return lambda: [mp.water_level_percent(v) for v in voltages]
+
+
+@benchmark("soil_percent_batch_10k", "calibration")
+def bench_soil_percent_batch():
+    import numpy as np
+    import calibration
+    from planter_config import load_variables
+    curve = calibration.soil_curve(load_variables())
+    voltages = np.linspace(3.836, 3.842, 10_000)
+    return lambda: calibration.percents(curve, voltages)
+
+
+@benchmark("classify_light_level", "calibration")
+def bench_classify_light():
+    mp = load_program("main_program")
+    luxes = [i * 12.0 for i in range(500)]
+    return lambda: [mp.classify_light_level(lux) for lux in luxes]
+
+
+# --- Alert Logging ---
+
+@benchmark("log_alert", "logging")
+def bench_log_alert():
+    mp = load_program("main_program")
+    open(mp.LOG_FILE, "w").close()
+    return lambda: mp.log_alert("⚠️ Too hot! Temp above threshold.")
+
+
+@benchmark("log_alert_rotation", "logging")
+def bench_log_alert_rotation():
+    mp = load_program("main_program")
+
+    def rotate_once():
+        write_alert_log(mp.LOG_FILE, 50_001)
+        mp.log_alert("❌ No water available! Fill the tank.")
+    return rotate_once
+
+
+# --- TFT Rendering ---
+
+@benchmark("display_messages", "render")
+def bench_display_messages():
+    mp = load_program("main_program")
+    mp.display.get(wait=True)  # the TFT is brought up on a background thread
+    lines = [
+        "⚠️ Too hot! Temp above threshold.",
+        "⚠️ Too much humidity! Above threshold.",
+        "Light Level: 🌞 Ideal light (1200 lx)",
+        "⏳ Waiting absorption (4 min left)...",
+    ]
+    return lambda: mp.display_messages(lines)
+
+
+@benchmark("display_messages_countdown", "render")
+def bench_display_messages_countdown():
+    mp = load_program("main_program")
+    mp.display.get(wait=True)
+    frames = [
+        ["⚠️ Too hot! Temp above threshold.", f"⏳ Waiting absorption ({minutes} min left)..."]
+        for minutes in range(5)
+    ]
+    state = {"i": 0}
+
+    def next_frame():
+        state["i"] += 1
+        mp.display_messages(frames[state["i"] % len(frames)])
+    return next_frame
+
+
+@benchmark("tft_partial_countdown", "render")
+def bench_tft_partial_countdown():
+    """Countdown line changing on a static screen, pushed through the dirty-rectangle driver."""
+    import fakehw
+    import tft_driver
+    from PIL import Image, ImageDraw, ImageFont
+    panel = fakehw.FakeST7735(width=140, height=128, rotation=270)  # as main_program configures it
+    screen = tft_driver.PartialST7735(panel)
+    font = ImageFont.load_default()
+    frames = []
+    for minutes in range(5):
+        image = Image.new("RGB", (140, 128), "black")
+        draw = ImageDraw.Draw(image)
+        draw.text((10, 20), "Too hot! Temp above threshold.", font=font, fill=(255, 255, 0))
+        draw.text((10, 60), f"Waiting absorption ({minutes} min left)...", font=font, fill=(255, 255, 0))
+        frames.append(image)
+    screen.display(frames[0])
+    panel.gram.reset_counters()
+    state = {"i": 0}
+
+    def next_frame():
+        state["i"] += 1
+        screen.display(frames[state["i"] % len(frames)])
+
+    full_frame_bytes = 140 * 128 * 2
+    next_frame.extra = lambda: {
+        "spi_bytes_per_frame": panel.gram.bytes_sent / max(state["i"], 1),
+        "full_frame_bytes": full_frame_bytes,
+    }
+    return next_frame
+
+
+def _rgb565_frames(count):
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (128, 140, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+@benchmark("rgb565_convert_miss", "render")
+def bench_rgb565_miss():
+    import tft_driver
+    converter = tft_driver.RGB565Converter(max_cached=2)
+    frames = _rgb565_frames(3)
+    state = {"i": 0}
+
+    def convert_new():
+        state["i"] += 1
+        converter.convert(frames[state["i"] % 3], 270)
+    return convert_new
+
+
+@benchmark("rgb565_convert_hit", "render")
+def bench_rgb565_hit():
+    import tft_driver
+    converter = tft_driver.RGB565Converter()
+    frame = _rgb565_frames(1)[0]
+    return lambda: converter.convert(frame, 270)
+
+
+@benchmark("emoji_display_message", "render")
+def bench_emoji_display_message():
+    fe = load_program("final_emoji_program")
+    return lambda: fe.display_message(fe.device, fe.emojis["too_hot"], ["Too hot! Temp above 24C"])
+
+
+@benchmark("alert_rules_evaluate", "logging")
+def bench_alert_rules_evaluate():
+    from alert_rules import AlertEngine
+    engine = AlertEngine(check_interval=0)  # stat both files on every call, the worst case
+    snapshots = [{"temperature": 17 + i % 10, "humidity": 55 + i % 10, "soil": 40, "water": 80, "lux": 900}
+                 for i in range(10)]
+    clock = iter(range(10 ** 9))
+    return lambda: [engine.evaluate(snapshot, next(clock)) for snapshot in snapshots]
+
+
+# --- Cold Start ---
+
+@benchmark("cold_start_import", "startup")
+def bench_cold_start_import():
+    """A fresh interpreter importing main_program: everything before the first reading can be taken."""
+    code = "import benchmarks; benchmarks.prepare_workdir(); import main_program"
+    return lambda: subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, check=True,
+                                  stdout=subprocess.DEVNULL)
+
+
+# --- Warm Restart State ---
+
+@benchmark("state_checkpoint", "startup")
+def bench_state_checkpoint():
+    mp = load_program("main_program")
+    mp.state_store.max_bytes = 1 << 20  # includes a compaction every few hundred checkpoints
+    return lambda: mp.save_state(time.time())
+
+
+@benchmark("state_restore", "startup")
+def bench_state_restore():
+    mp = load_program("main_program")
+    mp.save_state(time.time())
+    return lambda: mp.restore_state(time.time())
+
+
+# --- History and Export ---
+
+@benchmark("history_record", "export")
+def bench_history_record():
+    """The control loop's side: one reading buffered, with a flush every 60 s of readings."""
+    import history
+    log = history.ReadingLog(os.path.abspath("history"))
+    clock = iter(range(10 ** 9))
+    return lambda: log.record("soil", 42.0, 1_790_000_000 + next(clock))
+
+
+@benchmark("export_day_binary", "export")
+def bench_export_day_binary():
+    """One day of five channels every 30 s, streamed from the middle of a week of history."""
+    import export
+    import history
+    log = history.ReadingLog(os.path.abspath("history_week"), flush_interval=86400)
+    start = 1_790_000_000
+    for t in range(start, start + 7 * 86400, 30):
+        for name in ("soil", "water", "light", "humidity", "temperature"):
+            log.record(name, 50.0, t)
+    log.close()
+    day = start + 3 * 86400
+
+    def run():
+        for _ in export.stream(day, day + 86400, "binary", readings=history.ReadingLog(log.directory)):
+            pass
+    return run
+
+
+# --- Config Round-trips ---
+
+@benchmark("config_roundtrip", "config")
+def bench_config_roundtrip():
+    app = load_program("app")
+    app.VARIABLES_FILE = os.path.abspath("variables.conf")
+
+    def roundtrip():
+        config = app.read_config()
+        config["HUMIDITY_THRESHOLD"] = "60"
+        app.write_config(config)
+    return roundtrip
+
+
+# --- /ask Prompt Assembly ---
+
+def _bench_prompt(size_bytes):
+    app = load_program("app")
+    path = os.path.abspath(f"alerts_{size_bytes}.log")
+    write_alert_log(path, size_bytes)
+
+    def assemble():
+        with open(path, "r") as log_file:
+            alerts_text = log_file.read()
+        return app.build_prompt(alerts_text, "What happened last week?")
+    return assemble
+
+
+@benchmark("ask_prompt_50k", "ask")
+def bench_ask_prompt_small():
+    return _bench_prompt(50_000)
+
+
+@benchmark("ask_prompt_5m", "ask")
+def bench_ask_prompt_large():
+    return _bench_prompt(5_000_000)
+
+
+@benchmark("ask_indexed_5m", "ask")
+def bench_ask_indexed():
+    """Same 5 MB of history as 100 rotated archives plus the live log, answered from the index."""
+    app = load_program("app")
+    from alert_index import AlertIndex
+    archive_dir = tempfile.mkdtemp(prefix="archives_", dir=".")
+    log_path = os.path.join(archive_dir, "alerts.log")
+    for i in range(100):
+        write_alert_log(log_path, 50_000)
+        with zipfile.ZipFile(os.path.join(archive_dir, f"alerts_2026063{i % 10}_00{i // 60:02d}{i % 60:02d}.zip"), "w",
+                             zipfile.ZIP_DEFLATED) as zipf:
+            zipf.write(log_path, "alerts.log")
+    write_alert_log(log_path, 20_000)
+    index = AlertIndex(log_path, os.path.join(archive_dir, "alert_index.db"))
+    index.refresh()
+    question = "Why was the humidity so high on 23-06?"
+
+    def ask():
+        index.refresh()
+        return app.build_prompt(index.retrieve(question), question)
+    return ask
+
+
+# --- Runner ---
+
+def measure(func, min_time=0.2, repeat=5):
+    """Time func in batches sized to take ~min_time, returning per-call seconds for each batch."""
+    func()  # warm-up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return number, timings
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "-C", REPO_DIR, "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(selected, min_time, repeat):
+    results = []
+    for name, group, setup in BENCHMARKS:
+        if selected and not any(key in name or key == group for key in selected):
+            continue
+        try:
+            func = setup()
+            number, timings = measure(func, min_time=min_time, repeat=repeat)
+        except Exception as e:  # missing optional dependency or font: record and move on
+            results.append({"name": name, "group": group, "skipped": f"{type(e).__name__}: {e}"})
+            print(f"{name:<24} skipped ({type(e).__name__}: {e})")
+            continue
+        result = {
+            "name": name,
+            "group": group,
+            "loops": number,
+            "repeat": len(timings),
+            "min_s": min(timings),
+            "median_s": statistics.median(timings),
+            "mean_s": statistics.fmean(timings),
+            "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        }
+        if hasattr(func, "extra"):
+            result.update(func.extra())
+        results.append(result)
+        print(f"{name:<24} {result['median_s'] * 1e6:>12.1f} µs  (min {result['min_s'] * 1e6:.1f}, ±{result['stdev_s'] * 1e6:.1f})")
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"] if "median_s" in r}
+    print(f"\n--- Compared with {baseline_path} ---")
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None or "median_s" not in result:
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        print(f"{result['name']:<24} {ratio:>6.2f}x  {'slower' if ratio > 1 else 'faster'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planter hot-path benchmarks on simulated hardware.")
+    parser.add_argument("-k", dest="select", action="append", default=[], help="run benchmarks whose name contains this (or this group)")
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing batch")
+    parser.add_argument("--repeat", type=int, default=5, help="timing batches per benchmark")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    workdir = prepare_workdir()
+    try:
+        results = run(args.select, args.min_time, args.repeat)
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output}")
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
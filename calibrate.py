@@ -0,0 +1,289 @@
+"""Streaming sensor calibration.
+
+    python3 calibrate.py soil dry        # one point
+    python3 calibrate.py water full
+    python3 calibrate.py all             # guided: soil dry/wet, water empty/full
+
+Each point streams conversions at the ADS1115's top data rate, waits until the
+reading has settled, then measures mean, noise (standard deviation) and percentiles
+with O(1)-memory running statistics. The results are written to variables.conf in
+one atomic update: <SENSOR>_<POINT>_VOLTAGE and <SENSOR>_<POINT>_NOISE. It needs the
+ADS1115 to itself, so it refuses to run while sensord is serving.
+"""
+import argparse
+import math
+import sys
+import time
+from collections import deque
+
+import board
+import busio
+from adafruit_ads1x15.ads1115 import ADS1115, P1, P2
+from adafruit_ads1x15.analog_in import AnalogIn
+
+import sensord
+from planter_config import VARIABLES_FILE, load_variables, update_variables
+
+# --- Calibration Points ---
+# (sensor, point) -> (ADS1115 pin, variables.conf key, instruction)
+POINTS = {
+    ("soil", "dry"): (P1, "SOIL_DRY_VOLTAGE", "Hold the soil probe in dry air or bone-dry soil."),
+    ("soil", "wet"): (P1, "SOIL_WET_VOLTAGE", "Push the soil probe into freshly watered soil (or a glass of water)."),
+    ("water", "empty"): (P2, "WATER_EMPTY_VOLTAGE", "Empty the tank so the level sensor is dry."),
+    ("water", "full"): (P2, "WATER_FULL_VOLTAGE", "Fill the tank to the top."),
+}
+CURVE_KEYS = {"soil": "SOIL_CURVE", "water": "WATER_CURVE"}
+
+ADS_DATA_RATE = 860          # fastest ADS1115 rate, ~1.2 ms per conversion
+MEASURE_SAMPLES = 2000       # samples kept once settled (~2-3 s at 860 SPS)
+SETTLE_TIMEOUT = 30          # seconds to wait for a stable reading
+MIN_SEPARATION_SIGMAS = 6    # warn when two points are closer than this many noise sigmas
+
+
+# --- Running Statistics ---
+
+class RunningStats:
+    """Welford's online mean and variance."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Streaming quantile estimate with the P-square algorithm: five markers, O(1) per sample."""
+
+    def __init__(self, p):
+        self.p = p
+        self._initial = []
+        self._heights = None
+
+    def update(self, x):
+        if self._heights is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                p = self.p
+                self._heights = sorted(self._initial)
+                self._positions = [0, 1, 2, 3, 4]
+                self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+                self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+            return
+        q, n = self._heights, self._positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self):
+        if self._heights is not None:
+            return self._heights[2]
+        if not self._initial:
+            return None
+        ordered = sorted(self._initial)
+        return ordered[min(int(self.p * len(ordered)), len(ordered) - 1)]
+
+
+class SettleDetector:
+    """Settled once the means of the last `blocks` blocks of `block_size` samples span no
+    more than `tolerance` volts, or four standard errors of a block mean if noise is larger."""
+
+    def __init__(self, block_size=100, blocks=5, tolerance=0.0005):
+        self.block_size = block_size
+        self.tolerance = tolerance
+        self._block = RunningStats()
+        self._means = deque(maxlen=blocks)
+        self._stds = deque(maxlen=blocks)
+
+    def update(self, x):
+        self._block.update(x)
+        if self._block.count < self.block_size:
+            return False
+        self._means.append(self._block.mean)
+        self._stds.append(self._block.std)
+        self._block = RunningStats()
+        if len(self._means) < self._means.maxlen:
+            return False
+        stderr = max(self._stds) / math.sqrt(self.block_size)
+        return max(self._means) - min(self._means) <= max(self.tolerance, 4 * stderr)
+
+
+# --- Measurement ---
+
+def stream(channel, errors, max_consecutive_errors=50):
+    """Yield conversions as fast as the ADC delivers them, skipping failed I2C reads."""
+    consecutive = 0
+    while True:
+        try:
+            voltage = channel.voltage
+        except OSError:
+            errors[0] += 1
+            consecutive += 1
+            if consecutive >= max_consecutive_errors:
+                raise
+            continue
+        consecutive = 0
+        yield voltage
+
+
+def measure(channel, samples=MEASURE_SAMPLES, timeout=SETTLE_TIMEOUT):
+    errors = [0]
+    readings = stream(channel, errors)
+    settle = SettleDetector()
+    start = time.monotonic()
+    for voltage in readings:
+        if settle.update(voltage):
+            break
+        if time.monotonic() - start > timeout:
+            raise TimeoutError(f"reading did not settle within {timeout} s (last {voltage:.4f} V)")
+    settled_after = time.monotonic() - start
+
+    stats = RunningStats()
+    quantiles = {p: P2Quantile(p) for p in (0.05, 0.5, 0.95)}
+    measure_start = time.monotonic()
+    for voltage in readings:
+        stats.update(voltage)
+        for estimator in quantiles.values():
+            estimator.update(voltage)
+        if stats.count >= samples:
+            break
+    elapsed = time.monotonic() - measure_start
+    return {
+        "mean": stats.mean,
+        "std": stats.std,
+        "min": stats.min,
+        "max": stats.max,
+        "p5": quantiles[0.05].value,
+        "p50": quantiles[0.5].value,
+        "p95": quantiles[0.95].value,
+        "samples": stats.count,
+        "rate": stats.count / elapsed if elapsed else float("inf"),
+        "settled_after": settled_after,
+        "i2c_errors": errors[0],
+    }
+
+
+def check_separation(results, config):
+    """Warn when a freshly calibrated sensor's two points are too close to tell apart through the noise."""
+    for sensor in {name for (name, _), (_, key, _) in POINTS.items() if key in results}:
+        keys = [key for (name, _), (_, key, _) in POINTS.items() if name == sensor]
+        volts = [results[key]["mean"] if key in results else config.get(key) for key in keys]
+        noises = [results[key]["std"] if key in results else config.get(key.replace("_VOLTAGE", "_NOISE"))
+                  for key in keys]
+        if None in volts or not all(isinstance(v, float) for v in volts):
+            continue
+        separation = abs(volts[0] - volts[1])
+        noise = max((n for n in noises if isinstance(n, float)), default=0.0)
+        if noise and separation < MIN_SEPARATION_SIGMAS * noise:
+            print(f"⚠️  {sensor}: points are only {separation * 1000:.1f} mV apart "
+                  f"({separation / noise:.1f} σ of noise) — readings will be jumpy.")
+        if CURVE_KEYS[sensor] in config:
+            print(f"⚠️  {CURVE_KEYS[sensor]} is set in {VARIABLES_FILE} and takes precedence over these points.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate the soil and water sensors into variables.conf.")
+    parser.add_argument("sensor", choices=["soil", "water", "all"])
+    parser.add_argument("point", nargs="?", choices=sorted({point for _, point in POINTS}))
+    parser.add_argument("--samples", type=int, default=MEASURE_SAMPLES, help="samples to average once settled")
+    parser.add_argument("--timeout", type=float, default=SETTLE_TIMEOUT, help="seconds to wait for a stable reading")
+    parser.add_argument("--config", default=VARIABLES_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="measure and print, but do not write the config")
+    args = parser.parse_args(argv)
+
+    if args.sensor == "all":
+        targets = list(POINTS)
+    elif args.point and (args.sensor, args.point) in POINTS:
+        targets = [(args.sensor, args.point)]
+    else:
+        parser.error(f"choose a point for {args.sensor}: "
+                     + ", ".join(point for sensor, point in POINTS if sensor == args.sensor))
+
+    client = sensord.connect()
+    if client is not None:
+        # Calibration needs raw back-to-back conversions at ADS_DATA_RATE, which sensord's
+        # cache can't give, and changing the data rate under it would disturb its readings.
+        client.close()
+        print(f"❌ sensord owns the ADS1115 ({sensord.SOCKET_PATH}). Stop it (and main_program) first, then rerun.")
+        return 1
+    i2c = busio.I2C(board.SCL, board.SDA)
+    ads = ADS1115(i2c)
+    ads.data_rate = ADS_DATA_RATE
+
+    results = {}
+    for sensor, point in targets:
+        pin, key, instruction = POINTS[(sensor, point)]
+        print(f"\n--- {sensor} / {point} ---\n{instruction}")
+        if len(targets) > 1:
+            input("Press Enter when ready...")
+        try:
+            result = measure(AnalogIn(ads, pin), samples=args.samples, timeout=args.timeout)
+        except TimeoutError as e:
+            print(f"❌ {sensor} {point}: {e}. Nothing written.")
+            return 1
+        results[key] = result
+        print(f"{key}: {result['mean']:.5f} V  noise σ {result['std'] * 1000:.2f} mV  "
+              f"p5/p50/p95 {result['p5']:.5f}/{result['p50']:.5f}/{result['p95']:.5f} V")
+        print(f"  {result['samples']} samples at {result['rate']:.0f}/s, settled after "
+              f"{result['settled_after']:.1f} s, {result['i2c_errors']} I2C errors")
+
+    config = load_variables(args.config)
+    check_separation(results, config)
+
+    updates = {}
+    for key, result in results.items():
+        updates[key] = round(result["mean"], 5)
+        updates[key.replace("_VOLTAGE", "_NOISE")] = round(result["std"], 6)
+    if args.dry_run:
+        print("\n(dry run) would write: " + ", ".join(f"{k}={v}" for k, v in updates.items()))
+        return 0
+    update_variables(updates, args.config)
+    print(f"\n✅ Wrote {len(updates)} values to {args.config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Sensor calibration curves shared by every planter script.
+
+A curve is piecewise-linear through two or more (volts, reading) points. Points come
+from variables.conf, either as a multi-point curve:
+
+    SOIL_CURVE=3.8378:0,3.8390:45,3.8403:100
+
+or, when no curve is given, from the classic two-point keys (SOIL_DRY_VOLTAGE /
+SOIL_WET_VOLTAGE, WATER_EMPTY_VOLTAGE / WATER_FULL_VOLTAGE).
+"""
+import bisect
+
+import numpy as np
+
+ADS1115_FULL_SCALE = 4.096  # volts at GAIN=1, the ADS1115 default used everywhere here
+ADS1115_CODES = 32768
+
+# TEMT6000 photocurrent through the 10 kΩ load: ~1 mV per lux.
+DEFAULT_LIGHT_CURVE = "0:0,1:1000"
+
+
+class Curve:
+    def __init__(self, points, clamp=True):
+        points = sorted((float(x), float(y)) for x, y in points)
+        xs = [x for x, _ in points]
+        if len(points) < 2 or len(set(xs)) != len(xs):
+            raise ValueError(f"A calibration curve needs at least two distinct voltages, got {points}")
+        self.points = points
+        self.clamp = clamp
+        # Per-segment lookup table: start, width and rise of each segment
+        self.xs = xs
+        self.ys = [y for _, y in points]
+        self.dx = [x1 - x0 for x0, x1 in zip(xs, xs[1:])]
+        self.dy = [y1 - y0 for y0, y1 in zip(self.ys, self.ys[1:])]
+        self._segments = len(self.dx)
+        self._x_first, self._x_last = xs[0], xs[-1]
+        self._y_first, self._y_last = self.ys[0], self.ys[-1]
+        self._xs = np.array(self.xs)
+        self._ys = np.array(self.ys)
+        self._dx = np.array(self.dx)
+        self._dy = np.array(self.dy)
+        self._code_table = None
+
+    def __call__(self, volts):
+        xs = self.xs
+        if self.clamp:
+            if volts <= self._x_first:
+                return self._y_first
+            if volts >= self._x_last:
+                return self._y_last
+        if self._segments == 1:
+            i = 0
+        else:
+            i = min(max(bisect.bisect_right(xs, volts) - 1, 0), self._segments - 1)
+        return self.ys[i] + (volts - xs[i]) / self.dx[i] * self.dy[i]
+
+    def apply(self, volts):
+        """Convert a whole array of samples in one vectorized pass."""
+        volts = np.asarray(volts, dtype=float)
+        i = np.clip(np.searchsorted(self._xs, volts, side="right") - 1, 0, len(self.dx) - 1)
+        out = self._ys[i] + (volts - self._xs[i]) / self._dx[i] * self._dy[i]
+        if self.clamp:
+            out = np.where(volts <= self._xs[0], self._ys[0], out)
+            out = np.where(volts >= self._xs[-1], self._ys[-1], out)
+        return out
+
+    def code_table(self):
+        """Reading for every ADS1115 code (GAIN=1), built once; index it with raw `channel.value`s."""
+        if self._code_table is None:
+            volts = np.arange(ADS1115_CODES) * (ADS1115_FULL_SCALE / ADS1115_CODES)
+            self._code_table = self.apply(volts).astype(np.float32)
+        return self._code_table
+
+    def apply_codes(self, codes):
+        codes = np.clip(np.asarray(codes), 0, ADS1115_CODES - 1)
+        return self.code_table()[codes]
+
+
+def parse_points(spec):
+    """'3.8378:0, 3.8403:100' -> [(3.8378, 0.0), (3.8403, 100.0)]"""
+    points = []
+    for pair in str(spec).split(","):
+        if pair.strip():
+            volts, reading = pair.split(":")
+            points.append((float(volts), float(reading)))
+    return points
+
+
+def _curve(config, curve_key, low_key, high_key, clamp=True):
+    if curve_key in config:
+        return Curve(parse_points(config[curve_key]), clamp=clamp)
+    return Curve([(config[low_key], 0), (config[high_key], 100)], clamp=clamp)
+
+
+def soil_curve(config):
+    return _curve(config, "SOIL_CURVE", "SOIL_DRY_VOLTAGE", "SOIL_WET_VOLTAGE")
+
+
+def water_curve(config):
+    return _curve(config, "WATER_CURVE", "WATER_EMPTY_VOLTAGE", "WATER_FULL_VOLTAGE")
+
+
+def light_curve(config):
+    return Curve(parse_points(config.get("LIGHT_CURVE", DEFAULT_LIGHT_CURVE)), clamp=False)
+
+
+def load_curves(config):
+    return {"soil": soil_curve(config), "water": water_curve(config), "light": light_curve(config)}
+
+
+# --- Percent helpers (whole percent, truncated like the original two-point maps) ---
+
+def percent(curve, volts):
+    return int(curve(volts))
+
+
+def percents(curve, volts):
+    return curve.apply(volts).astype(int)
@@ -0,0 +1,387 @@
+"""Fleet telemetry collector: planters push batched, gzip-compressed events (telemetry.py)
+over HTTP or UDP; they are stored in SQLite and served through a query API and dashboard.
+
+    python3 collector.py                          # HTTP :8600, UDP :8601, fleet.db
+    python3 collector.py --simulate 200 --duration 60   # load it with 200 local fake planters
+"""
+import argparse
+import json
+import math
+import os
+import queue
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+from flask import Flask, Response, jsonify, render_template_string, request
+
+import metrics
+from metrics import Counter, Gauge
+
+DB_FILE = "fleet.db"
+HTTP_PORT = 8600
+UDP_PORT = 8601
+MAX_BATCH_BYTES = 1_000_000       # compressed request body
+MAX_DECOMPRESSED = 8_000_000      # guards against gzip bombs
+STALE_AFTER = 900                 # a planter silent this long is flagged on the dashboard
+
+EVENTS_STORED = Counter("collector_events_total", "Telemetry events stored, by transport and kind.")
+BATCHES_REJECTED = Counter("collector_rejected_batches_total", "Batches dropped as malformed or over capacity, by reason.")
+QUEUE_DEPTH = Gauge("collector_queue_depth", "Batches waiting for the SQLite writer.")
+
+SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS readings (planter TEXT NOT NULL, t REAL NOT NULL, name TEXT NOT NULL, value REAL);
+CREATE INDEX IF NOT EXISTS readings_planter_name_t ON readings (planter, name, t);
+CREATE TABLE IF NOT EXISTS alerts (planter TEXT NOT NULL, t REAL NOT NULL, message TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS alerts_t ON alerts (t);
+CREATE INDEX IF NOT EXISTS alerts_planter_t ON alerts (planter, t);
+CREATE TABLE IF NOT EXISTS planters (planter TEXT PRIMARY KEY, last_seen REAL, events INTEGER NOT NULL DEFAULT 0, latest TEXT);
+"""
+
+
+# --- Store (single writer thread, readers on their own connections) ---
+
+class Store(threading.Thread):
+    """Batches from any number of senders are queued and written by one thread, many per
+    transaction, so SQLite never sees concurrent writers and inserts stay cheap."""
+
+    def __init__(self, path=DB_FILE, max_queue=5000, max_rows_per_commit=20000):
+        super().__init__(name="collector-store", daemon=True)
+        self.path = path
+        self.max_rows_per_commit = max_rows_per_commit
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._latest = {}  # planter -> {reading name: value}
+        with sqlite3.connect(path) as db:
+            db.executescript(SCHEMA)
+            for planter, latest in db.execute("SELECT planter, latest FROM planters"):
+                self._latest[planter] = json.loads(latest or "{}")
+
+    def submit(self, planter, events, transport):
+        """Queue a decoded batch; False when the writer is too far behind (the sender retries)."""
+        try:
+            self._queue.put_nowait((planter, events, transport))
+        except queue.Full:
+            BATCHES_REJECTED.inc(reason="backlog")
+            return False
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def run(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: durable across app crashes, cheap commits
+        while True:
+            batches = [self._queue.get()]
+            rows = len(batches[0][1])
+            while rows < self.max_rows_per_commit:
+                try:
+                    batch = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batches.append(batch)
+                rows += len(batch[1])
+            try:
+                self._write(db, batches)
+            except Exception as e:  # one bad batch must not take the writer (and every later batch) down
+                print(f"⚠️ collector: writing {len(batches)} batches failed ({e}); retrying one at a time")
+                for batch in batches:
+                    try:
+                        self._write(db, [batch])
+                    except Exception as e:
+                        print(f"⚠️ collector: dropped a batch of {len(batch[1])} events from {batch[0]!r}: {e}")
+                        BATCHES_REJECTED.inc(reason="write_error")
+            QUEUE_DEPTH.set(self._queue.qsize())
+
+    def _write(self, db, batches):
+        readings, alerts, seen, stored = [], [], {}, {}
+        latest = {}
+        for planter, events, transport in batches:
+            values = latest.setdefault(planter, dict(self._latest.get(planter, {})))
+            last_t = 0.0
+            for event in events:
+                t = event["t"]
+                last_t = max(last_t, t)
+                if event["kind"] == "reading":
+                    readings.append((planter, t, event["name"], event["value"]))
+                    values[event["name"]] = event["value"]
+                else:
+                    alerts.append((planter, t, event["message"]))
+                stored[transport, event["kind"]] = stored.get((transport, event["kind"]), 0) + 1
+            count, previous = seen.get(planter, (0, 0.0))
+            seen[planter] = (count + len(events), max(previous, last_t))
+        with db:
+            db.executemany("INSERT INTO readings VALUES (?, ?, ?, ?)", readings)
+            db.executemany("INSERT INTO alerts VALUES (?, ?, ?)", alerts)
+            db.executemany(
+                "INSERT INTO planters (planter, last_seen, events, latest) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(planter) DO UPDATE SET last_seen = max(last_seen, excluded.last_seen), "
+                "events = events + excluded.events, latest = excluded.latest",
+                [(p, t, n, json.dumps(latest[p])) for p, (n, t) in seen.items()],
+            )
+        self._latest.update(latest)  # only once committed, so a failed write can be retried cleanly
+        for (transport, kind), count in stored.items():
+            EVENTS_STORED.inc(count, transport=transport, kind=kind)
+
+    def query(self, sql, params=()):
+        """Read-only query on a short-lived connection; WAL lets it run alongside the writer."""
+        db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute(sql, params)]
+        finally:
+            db.close()
+
+
+# --- Decoding ---
+
+def _finite(number, field):
+    """A JSON number as a finite float; ValueError for NaN, Infinity, 1e999, booleans or strings,
+    which would otherwise reach SQLite (10**20 overflows its integers) or the dashboard."""
+    if isinstance(number, bool) or not isinstance(number, (int, float)):
+        raise ValueError(f"{field} is not a number")
+    try:
+        number = float(number)
+    except OverflowError:
+        raise ValueError(f"{field} is out of range")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} is not finite")
+    return number
+
+
+def decode_batch(payload):
+    """gzip or plain JSON {"planter": id, "events": [...]} -> (planter, valid events).
+
+    Events of unknown kind are skipped; a time or reading value that is not a finite number
+    rejects the whole batch (ValueError), so the sender hears about it as a 400."""
+    if payload[:2] == b"\x1f\x8b":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        payload = inflater.decompress(payload, MAX_DECOMPRESSED)
+        if inflater.unconsumed_tail:
+            raise ValueError("batch too large")
+    try:
+        body = json.loads(payload)
+    except RecursionError:  # absurdly nested JSON
+        raise ValueError("batch nested too deeply")
+    if not isinstance(body, dict):
+        raise ValueError("batch is not a JSON object")
+    planter = body.get("planter")
+    if not isinstance(planter, str) or not 0 < len(planter) <= 64:
+        raise ValueError("missing or invalid planter id")
+    if not isinstance(body.get("events", []), list):
+        raise ValueError("events is not a list")
+    events = []
+    for event in body.get("events", []):
+        if not isinstance(event, dict):
+            raise ValueError("event is not a JSON object")
+        if event.get("kind") not in ("reading", "alert"):
+            continue
+        event["t"] = _finite(event.get("t"), "event time")
+        if event["kind"] == "reading" and isinstance(event.get("name"), str):
+            if event.get("value") is not None:
+                event["value"] = _finite(event["value"], f"reading '{event['name']}'")
+            events.append(event)
+        elif event["kind"] == "alert" and isinstance(event.get("message"), str):
+            events.append(event)
+    return planter, events
+
+
+# --- HTTP: ingest, query API, dashboard ---
+
+DASHBOARD_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head><title>Planter Fleet</title><meta http-equiv="refresh" content="30"></head>
+<body>
+    <h1>Planter Fleet ({{ planters|length }} planters, {{ stale }} silent)</h1>
+    <table border="1" cellpadding="4">
+        <tr><th>Planter</th><th>Last seen</th><th>Events</th><th>Latest readings</th></tr>
+        {% for p in planters %}
+        <tr{% if p.age > stale_after %} style="color:gray"{% endif %}>
+            <td>{{ p.planter }}</td>
+            <td>{{ p.age|int }} s ago</td>
+            <td>{{ p.events }}</td>
+            <td>{% for name, value in p.latest.items() %}{{ name }}={{ value }} {% endfor %}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    <h2>Recent alerts</h2>
+    <ul>
+        {% for a in alerts %}<li>[{{ a.planter }}] {{ a.message }}</li>{% endfor %}
+    </ul>
+</body>
+</html>
+"""
+
+
+def create_app(store):
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = MAX_BATCH_BYTES
+
+    @app.route("/ingest", methods=["POST"])
+    def ingest():
+        try:
+            planter, events = decode_batch(request.get_data())
+        except (ValueError, zlib.error, UnicodeDecodeError):
+            BATCHES_REJECTED.inc(reason="malformed")
+            return jsonify(error="malformed batch"), 400
+        if not store.submit(planter, events, "http"):
+            return jsonify(error="collector busy"), 503
+        return jsonify(accepted=len(events))
+
+    @app.route("/api/planters")
+    def api_planters():
+        return jsonify(planters=list_planters(store))
+
+    @app.route("/api/readings")
+    def api_readings():
+        args = request.args
+        query = "SELECT t, value FROM readings WHERE planter = ? AND name = ? AND t >= ? AND t < ?"
+        params = [args.get("planter", ""), args.get("name", "soil"),
+                  args.get("since", 0, type=float), args.get("until", math.inf, type=float)]
+        bucket = args.get("bucket", 0, type=float)
+        if bucket > 0:  # downsample in SQL: one avg/min/max row per bucket
+            query = ("SELECT CAST(t / ? AS INTEGER) * ? AS t, avg(value) AS value, min(value) AS min, "
+                     "max(value) AS max, count(*) AS n FROM readings WHERE planter = ? AND name = ? "
+                     "AND t >= ? AND t < ? GROUP BY 1")
+            params = [bucket, bucket] + params
+        query += " ORDER BY t DESC LIMIT ?"
+        params.append(min(args.get("limit", 1000, type=int), 10000))
+        return jsonify(readings=store.query(query, params)[::-1])
+
+    @app.route("/api/alerts")
+    def api_alerts():
+        args = request.args
+        query = "SELECT planter, t, message FROM alerts WHERE t >= ? AND t < ?"
+        params = [args.get("since", 0, type=float), args.get("until", math.inf, type=float)]
+        if args.get("planter"):
+            query += " AND planter = ?"
+            params.append(args["planter"])
+        if args.get("q"):
+            query += " AND message LIKE ?"
+            params.append(f"%{args['q']}%")
+        query += " ORDER BY t DESC LIMIT ?"
+        params.append(min(args.get("limit", 100, type=int), 10000))
+        return jsonify(alerts=store.query(query, params))
+
+    @app.route("/")
+    def dashboard():
+        planters = list_planters(store)
+        alerts = store.query("SELECT planter, message FROM alerts ORDER BY t DESC LIMIT 20")
+        stale = sum(p["age"] > STALE_AFTER for p in planters)
+        return render_template_string(DASHBOARD_TEMPLATE, planters=planters, alerts=alerts,
+                                      stale=stale, stale_after=STALE_AFTER)
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+def list_planters(store):
+    now = time.time()
+    rows = store.query("SELECT planter, last_seen, events, latest FROM planters ORDER BY planter")
+    return [{"planter": row["planter"], "last_seen": row["last_seen"], "age": now - (row["last_seen"] or 0),
+             "events": row["events"], "latest": json.loads(row["latest"] or "{}")} for row in rows]
+
+
+# --- UDP ingest ---
+
+def serve_udp(store, host="0.0.0.0", port=UDP_PORT):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)  # absorb bursts from many planters
+    sock.bind((host, port))
+
+    def loop():
+        while True:
+            try:
+                payload, _ = sock.recvfrom(65535)
+            except OSError as e:
+                print(f"⚠️ collector: UDP receive failed: {e}")
+                time.sleep(1)
+                continue
+            try:
+                planter, events = decode_batch(payload)
+            except (ValueError, zlib.error, UnicodeDecodeError):
+                BATCHES_REJECTED.inc(reason="malformed")
+                continue
+            except Exception as e:  # whatever a packet holds, it must not end the UDP listener
+                print(f"⚠️ collector: dropped an undecodable datagram: {e!r}")
+                BATCHES_REJECTED.inc(reason="malformed")
+                continue
+            store.submit(planter, events, "udp")
+
+    threading.Thread(target=loop, name="collector-udp", daemon=True).start()
+    return sock
+
+
+# --- Simulated Planters ---
+
+def simulate(count, duration, http_port, udp_port, udp_share=0.25, rate=1.0):
+    """Runs `count` fake planters against this collector; each records readings every 1/rate s."""
+    from telemetry import TelemetrySender
+
+    spool_dir = tempfile.mkdtemp(prefix="planter_sim_")
+    senders = []
+    for i in range(count):
+        name = f"sim-{i:03d}"
+        if i < count * udp_share:
+            sender = TelemetrySender(f"127.0.0.1:{udp_port}", name, transport="udp", flush_interval=5,
+                                     spool_path=os.path.join(spool_dir, name))
+        else:
+            sender = TelemetrySender(f"http://127.0.0.1:{http_port}/ingest", name, flush_interval=5,
+                                     spool_path=os.path.join(spool_dir, name))
+        sender.phase = random.uniform(0, 2 * math.pi)
+        sender.start()
+        senders.append(sender)
+
+    start = time.time()
+    while time.time() - start < duration:
+        now = time.time()
+        for sender in senders:
+            soil = max(0.0, 50 + 40 * math.sin(now / 600 + sender.phase))
+            sender.record("reading", t=now, name="soil", value=round(soil, 1))
+            sender.record("reading", t=now, name="water", value=round(80 - (now - start) / 60, 1))
+            if soil < 15 and random.random() < 0.05:
+                sender.record("alert", t=now, message="🌱 Soil dry and water available → Starting watering...")
+        time.sleep(1 / rate)
+    for sender in senders:
+        sender.stop()
+    time.sleep(1)  # let the writer catch up
+    stored = sum(value for _, key, _, value in EVENTS_STORED.samples())
+    sent = count * duration * rate * 2
+    print(f"{count} planters for {duration} s: ~{sent:.0f} readings sent, {stored:.0f} events stored "
+          f"({stored / duration:.0f}/s), queue depth {QUEUE_DEPTH.value():.0f}, "
+          f"rejected {sum(v for *_, v in BATCHES_REJECTED.samples()):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planter fleet telemetry collector")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    parser.add_argument("--udp-port", type=int, default=UDP_PORT)
+    parser.add_argument("--simulate", type=int, metavar="N", help="also run N simulated planters against it")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run the simulation")
+    args = parser.parse_args()
+
+    store = Store(args.db)
+    store.start()
+    serve_udp(store, args.host, args.udp_port)
+    app = create_app(store)
+    if args.simulate:
+        server = threading.Thread(target=app.run, kwargs={"host": "127.0.0.1", "port": args.port, "threaded": True},
+                                  daemon=True)
+        server.start()
+        time.sleep(1)
+        simulate(args.simulate, args.duration, args.port, args.udp_port)
+    else:
+        app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
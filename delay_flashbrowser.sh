@@ -1,10 +1,33 @@
 #!/bin/bash
 
-# Wait until Wi-Fi has an IP address
+# Wait until Wi-Fi has an IP address. `ip monitor` wakes us on each address change
+# instead of polling once a second; it is started before the first check so an address
+# that arrives in between is not missed.
+has_address() {
+    hostname -I | grep -qE '\b192\.168\.|10\.|172\.'
+}
+
 echo "Waiting for Wi-Fi connection..."
-while ! hostname -I | grep -qE '\b192\.168\.|10\.|172\.'; do
-    sleep 1
+coproc MONITOR { exec ip -o monitor address; }
+monitor_fd=${MONITOR[0]}
+monitor_pid=$MONITOR_PID
+while ! has_address; do
+    if [ -n "$monitor_pid" ]; then
+        read -r -t 30 -u "$monitor_fd" _ 2>/dev/null
+        status=$?
+        # 0: an address event; >128: the 30 s timeout. Anything else is EOF or a bad fd.
+        if [ "$status" -eq 0 ] || [ "$status" -gt 128 ]; then
+            continue
+        fi
+        if ! kill -0 "$monitor_pid" 2>/dev/null; then
+            # `ip monitor` is gone (no `ip`, netlink error): poll instead of spinning on read
+            echo "ip monitor exited; polling every 2 s instead."
+            monitor_pid=
+        fi
+    fi
+    sleep 2
 done
+[ -n "$monitor_pid" ] && kill "$monitor_pid" 2>/dev/null
 
 echo "Wi-Fi connected, starting flashbrowser.py..."
-python3 /home/pi/flashbrowser.py >> /home/pi/flashbrowser.log 2>&1
+exec python3 /home/pi/flashbrowser.py >> /home/pi/flashbrowser.log 2>&1
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import namedtuple
+
+from metrics import DHT_FAILURES, STAGE_SECONDS, Gauge
+
+DHT_AGE = Gauge("planter_dht_reading_age_seconds", "Age of the last good DHT reading when it was last served.")
+
+# quality: "ok" (fresh), "stale" (more than stale_after overdue, values kept), "missing" (no usable values)
+DHTReading = namedtuple("DHTReading", "humidity temperature timestamp quality")
+
+DHT11_MIN_INTERVAL = 2.0   # the DHT11 needs ≥1 s between reads; 2 s keeps it reliable
+
+
+class DHTPoller(threading.Thread):
+    """Reads the DHT sensor on its own thread and serves the last good reading instantly.
+
+    Each poll is a single Adafruit_DHT.read() (no read_retry sleeps) at most once per
+    `min_interval`. With an AdaptiveSampler the poll rate also follows the sampler.
+    latest() never blocks: it returns the cached values plus a timestamp and a quality
+    flag, so callers can tell a stale-but-usable reading from a missing one. With a
+    sampler, `stale_after` and `expire_after` count from when the next read was due
+    (the sampler's current interval), so a slow steady-state poll is never reported stale.
+    """
+
+    def __init__(self, sensor, pin, min_interval=DHT11_MIN_INTERVAL, stale_after=30, expire_after=600,
+                 sampler=None, dht=None, lock=None):
+        super().__init__(name="dht-poller", daemon=True)
+        self.dht = dht  # Adafruit_DHT, imported on first read unless given
+        self.sensor = sensor  # an Adafruit_DHT sensor type, or its name ("DHT11")
+        self.pin = pin
+        self.min_interval = min_interval
+        self.stale_after = stale_after
+        self.expire_after = expire_after
+        self.sampler = sampler
+        self.read_lock = lock  # shared by pollers on one Pi so bit-banged reads never overlap
+        self.consecutive_failures = 0
+        self._good = None  # (humidity, temperature, timestamp)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def latest(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            good = self._good
+        if good is None:
+            return DHTReading(None, None, None, "missing")
+        humidity, temperature, timestamp = good
+        age = now - timestamp
+        DHT_AGE.set(age)
+        expected = self.sampler.interval if self.sampler is not None else 0.0  # gap the poll schedule allows
+        if age > expected + self.expire_after:
+            return DHTReading(None, None, timestamp, "missing")
+        return DHTReading(humidity, temperature, timestamp, "stale" if age > expected + self.stale_after else "ok")
+
+    def poll_once(self):
+        if self.dht is None:
+            import Adafruit_DHT
+            self.dht = Adafruit_DHT
+        if isinstance(self.sensor, str):
+            self.sensor = getattr(self.dht, self.sensor)
+        with STAGE_SECONDS.time(stage="dht_read"):
+            if self.read_lock is None:
+                humidity, temperature = self.dht.read(self.sensor, self.pin)
+            else:
+                with self.read_lock:
+                    humidity, temperature = self.dht.read(self.sensor, self.pin)
+        now = time.time()
+        if humidity is None or temperature is None or not 0 <= humidity <= 100:
+            DHT_FAILURES.inc()
+            self.consecutive_failures += 1
+            return False
+        self.consecutive_failures = 0
+        with self._lock:
+            self._good = (humidity, temperature, now)
+        if self.sampler is not None:
+            self.sampler.record((humidity, temperature), now)
+        return True
+
+    def run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:  # I/O or /dev/gpiomem permission error: a failed read, not the end of polling
+                DHT_FAILURES.inc()
+                self.consecutive_failures += 1
+                if self.consecutive_failures == 1:
+                    print(f"⚠️ DHT read on pin {self.pin} failed: {e!r}; retrying every {self.min_interval:g} s")
+            wait = self.min_interval
+            if self.sampler is not None and self.consecutive_failures == 0:
+                wait = max(wait, self.sampler.next_due - time.time())
+            wait -= time.monotonic() - started
+            self._stop_event.wait(max(wait, 0))
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,205 @@
+"""Closed-loop pump dosing and water accounting.
+
+DoseController learns how many soil-moisture percent one second of pumping adds
+(measured once the burst has soaked in) and sizes the next burst to land inside
+the DOSE_TARGET_LOW..DOSE_TARGET_HIGH band. WaterAccount learns how much tank
+level one pump-second draws and turns recent use into days until a refill.
+
+    python3 dosing.py --simulate      # fixed 5 s bursts vs learned dosing
+"""
+import argparse
+from collections import deque
+
+from metrics import Counter, Gauge
+
+PUMP_GAIN = Gauge("planter_pump_gain", "Learned soil moisture gain, percent per second of pumping.")
+PUMP_SECONDS = Counter("planter_pump_seconds_total", "Seconds the pump ran.")
+TANK_DAYS_LEFT = Gauge("planter_tank_days_left", "Estimated days until the water tank needs a refill.")
+
+
+class DoseController:
+    def __init__(self, target_low=35.0, target_high=55.0, initial_gain=8.0, min_burst=1.0, max_burst=15.0,
+                 absorb_seconds=300.0, alpha=0.4, confident_after=3):
+        self.target_low = target_low
+        self.target_high = target_high
+        self.gain = initial_gain
+        self.min_burst = min_burst
+        self.max_burst = max_burst
+        self.absorb_seconds = absorb_seconds
+        self.alpha = alpha
+        self.confident_after = confident_after
+        self.observations = 0
+        self.pending = None  # (pump stopped at, seconds pumped, soil before)
+        PUMP_GAIN.set(self.gain)
+
+    def target(self):
+        """Aim at the bottom quarter of the band until the gain has been measured a few times."""
+        share = 0.5 if self.observations >= self.confident_after else 0.25
+        return self.target_low + share * (self.target_high - self.target_low)
+
+    def burst_for(self, soil_percent, max_seconds=None):
+        seconds = (self.target() - soil_percent) / self.gain
+        limit = self.max_burst if max_seconds is None else min(self.max_burst, max_seconds)
+        return max(min(seconds, limit), min(self.min_burst, limit))
+
+    def snapshot(self):
+        return {"gain": self.gain, "observations": self.observations, "pending": self.pending}
+
+    def restore(self, state):
+        self.gain = state["gain"]
+        self.observations = state["observations"]
+        self.pending = state["pending"]
+        PUMP_GAIN.set(self.gain)
+
+    def pumped(self, seconds, soil_before, now):
+        PUMP_SECONDS.inc(seconds)
+        if seconds > 0:
+            self.pending = (now, seconds, soil_before)
+
+    def observe_soil(self, now, soil_percent):
+        """Feed soil samples; the first one after the burst has soaked in updates the gain."""
+        if self.pending is None:
+            return None
+        stopped, seconds, before = self.pending
+        if now - stopped < self.absorb_seconds:
+            return None
+        self.pending = None
+        if soil_percent >= 99:  # saturated reading: only a lower bound on the gain, don't learn from it
+            return None
+        measured = max((soil_percent - before) / seconds, 0.1)
+        self.gain += self.alpha * (measured - self.gain)
+        self.observations += 1
+        PUMP_GAIN.set(self.gain)
+        return measured
+
+
+class WaterAccount:
+    """Tank level drawn per pump-second, and recent daily use -> days until refill."""
+
+    def __init__(self, tank_liters=None, initial_draw=0.5, alpha=0.3, history_days=7):
+        self.tank_liters = tank_liters
+        self.draw_per_second = initial_draw  # tank percent per pump-second
+        self.alpha = alpha
+        self.history_seconds = history_days * 86400
+        self.draws = deque()  # (time, tank percent drawn)
+        self.level = None
+
+    def pumped(self, seconds, level_before, level_after, now):
+        self.level = level_after
+        if seconds <= 0:
+            return
+        delta = level_before - level_after
+        if delta > 0 and level_after > 0:  # level sensors are coarse; ignore bursts that read no change
+            self.draw_per_second += self.alpha * (delta / seconds - self.draw_per_second)
+        self.draws.append((now, self.draw_per_second * seconds))
+        while self.draws and now - self.draws[0][0] > self.history_seconds:
+            self.draws.popleft()
+
+    def observe_level(self, level):
+        self.level = level
+
+    def snapshot(self):
+        return {"draw_per_second": self.draw_per_second, "draws": list(self.draws), "level": self.level}
+
+    def restore(self, state):
+        self.draw_per_second = state["draw_per_second"]
+        self.draws = deque(state["draws"])
+        self.level = state["level"]
+
+    def max_burst(self, level):
+        """Seconds of pumping the tank can still supply."""
+        return level / self.draw_per_second if self.draw_per_second > 0 else float("inf")
+
+    def daily_use(self, now):
+        if len(self.draws) < 2:
+            return None
+        # the first draw opens the window, so it isn't counted against it
+        span = max(now - self.draws[0][0], 86400.0)
+        return sum(drawn for _, drawn in list(self.draws)[1:]) / span * 86400
+
+    def days_to_refill(self, now):
+        daily = self.daily_use(now)
+        if daily is None or self.level is None or daily <= 0:
+            return None
+        days = self.level / daily
+        TANK_DAYS_LEFT.set(days)
+        return days
+
+    def remaining_liters(self):
+        if self.tank_liters is None or self.level is None:
+            return None
+        return self.tank_liters * self.level / 100
+
+
+def from_config(config):
+    dose = DoseController(
+        target_low=config.get("DOSE_TARGET_LOW", 35),
+        target_high=config.get("DOSE_TARGET_HIGH", 55),
+        initial_gain=config.get("DOSE_INITIAL_GAIN", 8),
+        max_burst=config.get("DOSE_MAX_SECONDS", 15),
+        absorb_seconds=config.get("WATERING_WAIT_PERIOD", 300),
+    )
+    account = WaterAccount(tank_liters=config.get("TANK_LITERS"))
+    return dose, account
+
+
+# --- Simulation check ---
+
+def simulate(strategy, days=14, true_gain=4.0, true_draw=0.8, dt=60.0):
+    """Fixed 5 s bursts or learned dosing on the drying model from watering_predictor.
+
+    Returns pump cycles, bursts that landed below / inside / above the band once soaked in,
+    the days-to-refill estimate at day 7 and the true figure from the tank's actual use.
+    """
+    from watering_predictor import simulated_soil
+
+    step, read, water = simulated_soil(rate=2.0, seed=1)
+    dose = DoseController()
+    account = WaterAccount()
+    tank = 100.0
+    cycles = 0
+    landed = {"below": 0, "inside": 0, "above": 0}
+    pending_check = None
+    estimate = tank_at_day7 = None
+    t = 0.0
+    while t < days * 86400:
+        step(t, dt)
+        soil = read()
+        if pending_check is not None and t >= pending_check:
+            band = "below" if soil < dose.target_low else "above" if soil > dose.target_high else "inside"
+            landed[band] += 1
+            pending_check = None
+        dose.observe_soil(t, soil)
+        if soil <= 5 and dose.pending is None and tank > 0:
+            seconds = 5.0 if strategy == "fixed" else dose.burst_for(soil, account.max_burst(tank))
+            water(true_gain * seconds)
+            before = tank
+            tank = max(tank - true_draw * seconds, 0.0)
+            dose.pumped(seconds, soil, t)
+            account.pumped(seconds, int(before), int(tank), t)
+            cycles += 1
+            pending_check = t + dose.absorb_seconds
+        if estimate is None and t >= 7 * 86400:
+            estimate, tank_at_day7 = account.days_to_refill(t), tank
+        t += dt
+    true_days = tank_at_day7 / ((100 - tank) / days)
+    return cycles, landed, estimate, true_days
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pump dosing controller")
+    parser.add_argument("--simulate", action="store_true")
+    args = parser.parse_args()
+    if not args.simulate:
+        parser.print_help()
+        return
+    for strategy in ("fixed", "learned"):
+        cycles, landed, estimate, true_days = simulate(strategy)
+        est = f"{estimate:.1f}" if estimate is not None else "-"
+        print(f"{strategy:>8}: {cycles} pump cycles in 14 days; landed below/inside/above band "
+              f"{landed['below']}/{landed['inside']}/{landed['above']}; days to refill at day 7: "
+              f"estimated {est}, actual {true_days:.1f}")
+
+
+if __name__ == "__main__":
+    main()
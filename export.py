@@ -0,0 +1,226 @@
+"""Streaming export of reading history and alerts for a time range.
+
+Readings come from history.py's day segments and alerts from the alert index
+(alert_index.py). Both are generators in time order, merged by heapq.merge, so memory
+stays the same for an hour of data or a year of it. Output is yielded in chunks of
+about 64 KB and can be gzip-compressed as it streams. app.py serves it at /export
+(chunked transfer encoding); the CLI writes to a file or stdout.
+
+Formats:
+  csv     time,t,kind,name,value,message
+  jsonl   one event per line, shaped like telemetry events:
+          {"kind": "reading", "t": ..., "name": ..., "value": ...} / {"kind": "alert", "t": ..., "message": ...}
+  binary  b"PLNX\\x01", then tagged records, little-endian:
+          N <H id><B len><name>   declares a channel name, before its first reading
+          R <d t><H id><f value>  a reading (NaN when missing)
+          A <d t><H len><message> an alert (UTF-8)
+
+    python3 export.py --since 2026-09-01 --until 2026-10-01 --format csv --gzip -o september.csv.gz
+    curl -o week.jsonl.gz 'http://planter:5000/export?since=2026-10-12&format=jsonl&gzip=1'
+"""
+import argparse
+import csv
+import heapq
+import io
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import history
+from alert_index import ALERTS_LOG, INDEX_FILE, AlertIndex
+from metrics import Counter
+
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson", "binary": "application/octet-stream"}
+CHUNK_BYTES = 64 * 1024
+
+LATEST = datetime(9999, 1, 1).timestamp()  # later than this, fromtimestamp()/gmtime() in the encoders fail
+
+BINARY_MAGIC = b"PLNX\x01"
+NAME = struct.Struct("<cHB")
+READING = struct.Struct("<cdHf")
+ALERT = struct.Struct("<cdH")
+
+EXPORTED = Counter("planter_export_rows_total", "Rows streamed by export, by format.")
+
+
+def parse_time(value, default):
+    """Epoch seconds or an ISO date/datetime (local time); `default` when empty.
+
+    ValueError for anything that is not a finite time between 1970 and 9999, so a bad
+    request is refused up front instead of failing halfway through the stream."""
+    if value is None or str(value).strip() == "":
+        return default
+    value = str(value).strip()
+    try:
+        t = float(value)
+    except ValueError:
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"'{value}' is neither epoch seconds nor an ISO date")
+        try:
+            t = moment.timestamp()
+        except (OverflowError, OSError, ValueError):
+            t = math.nan
+    if not 0 <= t <= LATEST:  # also false for NaN
+        raise ValueError(f"'{value}' is outside 1970-01-01 .. 9999-01-01")
+    return t
+
+
+def rows(since, until, readings=None, alerts=None, kinds=("reading", "alert")):
+    """(t, kind, name, value, message) for the range, oldest first."""
+    sources = []
+    if "reading" in kinds and readings is not None:
+        sources.append((t, "reading", name, value, None) for t, name, value in readings.read(since, until))
+    if "alert" in kinds and alerts is not None:
+        sources.append((t, "alert", None, None, message) for t, message in alerts.entries(since, until))
+    return heapq.merge(*sources, key=lambda row: row[0])
+
+
+# --- Encoders: rows -> byte strings ---
+
+def encode_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("time", "t", "kind", "name", "value", "message"))
+    for t, kind, name, value, message in rows:
+        stamp = datetime.fromtimestamp(t).isoformat(timespec="seconds")
+        writer.writerow((stamp, f"{t:.3f}", kind, name or "", "" if value is None else f"{value:g}", message or ""))
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def encode_jsonl(rows):
+    for t, kind, name, value, message in rows:
+        event = {"kind": kind, "t": round(t, 3)}
+        if kind == "reading":
+            event["name"] = name
+            event["value"] = value
+        else:
+            event["message"] = message
+        yield (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+
+def encode_binary(rows):
+    yield BINARY_MAGIC
+    ids = {}
+    for t, kind, name, value, message in rows:
+        if kind == "reading":
+            channel = ids.get(name)
+            if channel is None:
+                channel = ids[name] = len(ids)
+                encoded = name.encode()[:255]
+                yield NAME.pack(b"N", channel, len(encoded)) + encoded
+            yield READING.pack(b"R", t, channel, math.nan if value is None else value)
+        else:
+            encoded = message.encode()[:65535]
+            yield ALERT.pack(b"A", t, len(encoded)) + encoded
+
+
+ENCODERS = {"csv": encode_csv, "jsonl": encode_jsonl, "binary": encode_binary}
+
+
+def _chunks(pieces, size=CHUNK_BYTES):
+    """Joins small pieces into ~`size` byte chunks."""
+    batch, length = [], 0
+    for piece in pieces:
+        batch.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b"".join(batch)
+            batch, length = [], 0
+    if batch:
+        yield b"".join(batch)
+
+
+def _gzip(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _lower_priority(niceness=10):
+    """Exports run on their own thread; on Linux that thread alone gives way to everything else."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), niceness)
+    except (AttributeError, OSError):
+        pass
+
+
+def stream(since, until, fmt="csv", compress=False, readings=None, alerts=None, kinds=("reading", "alert")):
+    """Generator of the export's byte chunks; nothing is read until the first one is requested."""
+    if fmt not in ENCODERS:
+        raise ValueError(f"unknown format '{fmt}' (use one of {', '.join(ENCODERS)})")
+    if since >= until:
+        raise ValueError("since must be before until")
+    return _stream(since, until, fmt, compress, readings, alerts, kinds)
+
+
+def _stream(since, until, fmt, compress, readings, alerts, kinds):
+    _lower_priority()
+    counted = _count(rows(since, until, readings, alerts, kinds), fmt)
+    chunks = _chunks(ENCODERS[fmt](counted))
+    yield from _gzip(chunks) if compress else chunks
+
+
+def _count(rows, fmt):
+    count = 0
+    for count, row in enumerate(rows, 1):
+        yield row
+        if count % 1000 == 0:
+            EXPORTED.inc(1000, format=fmt)
+    EXPORTED.inc(count % 1000, format=fmt)
+
+
+def filename(since, until, fmt, compress):
+    day = lambda t: datetime.fromtimestamp(t).strftime("%Y%m%d")
+    extension = {"csv": "csv", "jsonl": "jsonl", "binary": "bin"}[fmt]
+    return f"planter_{day(since)}-{day(until)}.{extension}" + (".gz" if compress else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export reading history and alerts")
+    parser.add_argument("--since", help="epoch seconds or ISO date (default: everything)")
+    parser.add_argument("--until", help="epoch seconds or ISO date (default: now)")
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--only", choices=("reading", "alert"), help="export just readings or just alerts")
+    parser.add_argument("--history", default=history.HISTORY_DIR)
+    parser.add_argument("--log", default=ALERTS_LOG)
+    parser.add_argument("--index", default=INDEX_FILE)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    since = parse_time(args.since, 0.0)
+    until = parse_time(args.until, time.time())
+    alerts = AlertIndex(args.log, args.index)
+    alerts.refresh()
+    readings = history.ReadingLog(args.history)
+    kinds = (args.only,) if args.only else ("reading", "alert")
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    started = time.perf_counter()
+    try:
+        for chunk in stream(since, until, args.format, args.gzip, readings, alerts, kinds):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"exported {written / 1024:.0f} KB in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Simulated planter hardware for running the control code on a plain Linux box.
+
+install() registers fake `board`, `busio`, `RPi.GPIO`, `Adafruit_DHT`, `st7735`,
+`adafruit_ads1x15` and `luma` modules so the planter scripts import unchanged.
+"""
+import math
+import random
+import sys
+import time
+import types
+
+# --- Simulated Signals (volts / readings) ---
+SIGNALS = {
+    0: lambda t: 1.2 + 0.05 * math.sin(t / 60),     # A0 light (TEMT6000)
+    1: lambda t: 3.839 + 0.001 * math.sin(t / 600),  # A1 soil moisture
+    2: lambda t: 2.65 - 0.00001 * t,                 # A2 water level
+    3: lambda t: 0.0,
+}
+NOISE_VOLTS = 0.0005
+DHT_READING = (55.0, 22.0)  # (humidity, temperature)
+
+_rng = random.Random(1234)
+_start = time.monotonic()
+_installed = False
+
+
+def sim_time():
+    return time.monotonic() - _start
+
+
+# --- board / busio ---
+
+class FakeI2C:
+    def __init__(self, scl=None, sda=None, frequency=100000):
+        self.transactions = 0
+        self._locked = False
+
+    def try_lock(self):
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def deinit(self):
+        pass
+
+
+# --- adafruit_ads1x15 ---
+
+P0, P1, P2, P3 = 0, 1, 2, 3
+
+
+class FakeADS1115:
+    def __init__(self, i2c, gain=1, data_rate=None, mode=None, address=0x48):
+        self.i2c = i2c
+        self.gain = gain
+        self.data_rate = data_rate or 128
+        self.mode = mode
+        self.address = address
+        self.signals = dict(SIGNALS)
+        self.conversions = 0
+
+    def convert(self, pin):
+        self.conversions += 1
+        self.i2c.transactions += 1
+        return self.signals[pin](sim_time()) + _rng.gauss(0, NOISE_VOLTS)
+
+
+class FakeAnalogIn:
+    def __init__(self, ads, positive_pin, negative_pin=None):
+        self._ads = ads
+        self._pin = positive_pin
+
+    @property
+    def voltage(self):
+        return self._ads.convert(self._pin)
+
+    @property
+    def value(self):
+        return int(self.voltage / 4.096 * 32767)
+
+
+# --- RPi.GPIO ---
+
+class FakeGPIO(types.ModuleType):
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_UP = 22
+    PUD_DOWN = 21
+    PUD_OFF = 20
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.pins = {}
+        self.inputs = {}
+        self.callbacks = {}
+        self.writes = 0
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        self.pins.setdefault(pin, self.LOW if initial is None else initial)
+
+    def output(self, pin, value):
+        self.writes += 1
+        self.pins[pin] = value
+
+    def input(self, pin):
+        if pin in self.inputs:
+            return self.inputs[pin]
+        return self.pins.get(pin, self.LOW)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks[pin] = callback
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def trigger(self, pin, value=1):
+        """Simulate an input edge (e.g. PIR motion) and fire any registered callback."""
+        self.inputs[pin] = value
+        callback = self.callbacks.get(pin)
+        if callback:
+            callback(pin)
+
+    def cleanup(self, *args):
+        self.pins.clear()
+
+
+# --- Adafruit_DHT ---
+
+class FakeDHT(types.ModuleType):
+    DHT11 = 11
+    DHT22 = 22
+    AM2302 = 22
+
+    def __init__(self):
+        super().__init__("Adafruit_DHT")
+        self.reading = DHT_READING
+        self.failure_rate = 0.0
+        self.reads = 0
+
+    def read(self, sensor, pin):
+        self.reads += 1
+        if _rng.random() < self.failure_rate:
+            return None, None
+        return self.reading
+
+    def read_retry(self, sensor, pin, retries=15, delay_seconds=2):
+        for _ in range(retries):
+            humidity, temperature = self.read(sensor, pin)
+            if humidity is not None and temperature is not None:
+                return humidity, temperature
+        return None, None
+
+
+# --- TFT controller RAM ---
+
+ST7735_CASET = 0x2A
+ST7735_RASET = 0x2B
+ST7735_RAMWR = 0x2C
+
+
+class SimulatedGRAM:
+    """ST7735 graphics RAM driven by CASET/RASET/RAMWR, counting every byte that crosses the bus."""
+
+    def __init__(self, bytes_per_pixel):
+        self.bytes_per_pixel = bytes_per_pixel
+        self.pixels = {}        # (x, y) -> tuple of pixel bytes
+        self.bytes_sent = 0     # every data byte, including window addresses
+        self.pixel_bytes = 0
+        self.windows = 0
+        self._command = None
+        self._args = []
+        self._window = (0, 0, 0, 0)
+        self._cursor = 0
+        self._partial = []
+
+    def command(self, cmd):
+        self._command = cmd
+        self._args = []
+        if cmd == ST7735_RAMWR:
+            self.windows += 1
+            self._cursor = 0
+            self._partial = []
+
+    def data(self, data):
+        if isinstance(data, int):
+            data = [data & 0xFF]
+        self.bytes_sent += len(data)
+        if self._command in (ST7735_CASET, ST7735_RASET):
+            self._args.extend(data)
+            if len(self._args) == 4:
+                start = (self._args[0] << 8) | self._args[1]
+                end = (self._args[2] << 8) | self._args[3]
+                x0, y0, x1, y1 = self._window
+                if self._command == ST7735_CASET:
+                    self._window = (start, y0, end, y1)
+                else:
+                    self._window = (x0, start, x1, end)
+        elif self._command == ST7735_RAMWR:
+            self.pixel_bytes += len(data)
+            self._write_pixels(data)
+
+    def _write_pixels(self, data):
+        x0, y0, x1, y1 = self._window
+        cols = x1 - x0 + 1
+        for byte in data:
+            self._partial.append(byte)
+            if len(self._partial) < self.bytes_per_pixel:
+                continue
+            row, col = divmod(self._cursor, cols)
+            self.pixels[(x0 + col, y0 + row)] = tuple(self._partial)
+            self._partial = []
+            self._cursor += 1
+
+    def reset_counters(self):
+        self.bytes_sent = 0
+        self.pixel_bytes = 0
+        self.windows = 0
+
+
+# --- st7735 (Pimoroni) ---
+
+class FakeST7735:
+    """Mirrors the Pimoroni driver's set_window()/data() protocol into a SimulatedGRAM."""
+
+    def __init__(self, port=0, cs=0, dc=None, backlight=None, rst=None, width=80, height=160,
+                 rotation=90, offset_left=None, offset_top=None, invert=True, spi_speed_hz=4000000):
+        self._width = width
+        self._height = height
+        self._rotation = rotation
+        self._offset_left = offset_left or 0
+        self._offset_top = offset_top or 0
+        self.gram = SimulatedGRAM(bytes_per_pixel=2)
+        self.frames = 0
+
+    @property
+    def width(self):
+        return self._width if self._rotation in (0, 180) else self._height
+
+    @property
+    def height(self):
+        return self._height if self._rotation in (0, 180) else self._width
+
+    def begin(self):
+        pass
+
+    def set_backlight(self, value):
+        pass
+
+    def command(self, data):
+        self.gram.command(data)
+
+    def data(self, data):
+        self.gram.data(data)
+
+    def set_window(self, x0=0, y0=0, x1=None, y1=None):
+        if x1 is None:
+            x1 = self._width - 1
+        if y1 is None:
+            y1 = self._height - 1
+        x0 += self._offset_left
+        x1 += self._offset_left
+        y0 += self._offset_top
+        y1 += self._offset_top
+        self.command(ST7735_CASET)
+        self.data([x0 >> 8, x0 & 0xFF, x1 >> 8, x1 & 0xFF])
+        self.command(ST7735_RASET)
+        self.data([y0 >> 8, y0 & 0xFF, y1 >> 8, y1 & 0xFF])
+        self.command(ST7735_RAMWR)
+
+    def image_to_data(self, image, rotation=0):
+        import numpy as np
+        pb = np.rot90(np.array(image.convert("RGB")), rotation // 90).astype("uint16")
+        color = ((pb[:, :, 0] & 0xF8) << 8) | ((pb[:, :, 1] & 0xFC) << 3) | (pb[:, :, 2] >> 3)
+        return np.dstack(((color >> 8) & 0xFF, color & 0xFF)).flatten().tolist()
+
+    def display(self, image):
+        self.frames += 1
+        self.set_window()
+        pixelbytes = self.image_to_data(image, self._rotation)
+        for i in range(0, len(pixelbytes), 4096):
+            self.data(pixelbytes[i:i + 4096])
+
+
+# --- luma.lcd ---
+
+class FakeLumaSerial:
+    def __init__(self, port=0, device=0, gpio_DC=24, gpio_RST=25, **kwargs):
+        pass
+
+
+class FakeLumaST7735:
+    """luma.lcd st7735 stand-in: quarter-turn rotation, 18-bit colour (3 bytes/pixel) into a SimulatedGRAM."""
+
+    def __init__(self, serial_interface=None, width=160, height=128, rotation=0, h_offset=0, v_offset=0, **kwargs):
+        assert rotation in (0, 1, 2, 3), "luma rotation is given in quarter turns (0-3)"
+        self._serial = serial_interface
+        self.rotate = rotation
+        self._w = width
+        self._h = height
+        self._offsets = (h_offset, v_offset)
+        self.width = height if rotation % 2 else width
+        self.height = width if rotation % 2 else height
+        self.size = (self.width, self.height)
+        self.mode = "RGB"
+        self.gram = SimulatedGRAM(bytes_per_pixel=3)
+        self.frames = 0
+
+    def preprocess(self, image):
+        if self.rotate == 0:
+            return image
+        return image.rotate(self.rotate * -90, expand=True).crop((0, 0, self._w, self._h))
+
+    def _apply_offsets(self, bbox):
+        left, top, right, bottom = bbox
+        return left + self._offsets[0], top + self._offsets[1], right + self._offsets[0], bottom + self._offsets[1]
+
+    def command(self, cmd, *args):
+        self.gram.command(cmd)
+        if args:
+            self.gram.data(list(args))
+
+    def data(self, data):
+        self.gram.data(data)
+
+    def display(self, image):
+        self.frames += 1
+        image = self.preprocess(image)
+        left, top, right, bottom = self._apply_offsets((0, 0, self._w, self._h))
+        self.command(ST7735_CASET, left >> 8, left & 0xFF, (right - 1) >> 8, (right - 1) & 0xFF)
+        self.command(ST7735_RASET, top >> 8, top & 0xFF, (bottom - 1) >> 8, (bottom - 1) & 0xFF)
+        self.command(ST7735_RAMWR)
+        self.data(list(image.convert("RGB").tobytes()))
+
+    def cleanup(self):
+        pass
+
+
+# --- Registration ---
+
+GPIO = FakeGPIO()
+DHT = FakeDHT()
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    """Register the fake driver modules. Call before importing any planter script."""
+    global _installed
+    if _installed:
+        return
+    _module("board", SCL="SCL", SDA="SDA")
+    _module("busio", I2C=FakeI2C)
+    rpi = _module("RPi", GPIO=GPIO)
+    sys.modules["RPi.GPIO"] = GPIO
+    rpi.GPIO = GPIO
+    sys.modules["Adafruit_DHT"] = DHT
+    _module("st7735", ST7735=FakeST7735)
+    ads_pkg = _module("adafruit_ads1x15")
+    ads_pkg.ads1115 = _module("adafruit_ads1x15.ads1115", ADS1115=FakeADS1115, P0=P0, P1=P1, P2=P2, P3=P3)
+    ads_pkg.analog_in = _module("adafruit_ads1x15.analog_in", AnalogIn=FakeAnalogIn)
+    luma = _module("luma")
+    luma.core = _module("luma.core")
+    luma.core.interface = _module("luma.core.interface")
+    luma.core.interface.serial = _module("luma.core.interface.serial", spi=FakeLumaSerial)
+    luma.lcd = _module("luma.lcd")
+    luma.lcd.device = _module("luma.lcd.device", st7735=FakeLumaST7735)
+    _installed = True
@@ -0,0 +1,225 @@
+"""Streaming per-channel filters for noisy ADS1115 readings.
+
+A channel's pipeline is declared as a comma-separated spec, e.g. in variables.conf:
+
+    FILTER_SOIL=hampel:7:3,kalman:1e-9:2.5e-7
+
+Each stage's update() takes one raw sample and returns the filtered value.
+"""
+import heapq
+from collections import Counter, deque
+
+from metrics import Counter as MetricCounter
+
+OUTLIERS = MetricCounter("planter_filter_outliers_total", "Samples replaced by the Hampel filter, by channel.")
+
+
+class EMA:
+    """Exponential moving average, O(1) per sample."""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = float(alpha)
+        self.value = None
+
+    def update(self, x, now=None):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def snapshot(self):
+        return {"value": self.value}
+
+    def restore(self, state):
+        self.value = state["value"]
+
+
+class SlidingMedian:
+    """Median of the last `window` samples: two heaps with lazy deletion, O(log window) per sample."""
+
+    def __init__(self, window=5):
+        self.window = int(window)
+        self._samples = deque()
+        self._low = []    # max-heap of the lower half (negated)
+        self._high = []   # min-heap of the upper half
+        self._low_size = 0
+        self._high_size = 0
+        self._delayed = Counter()
+
+    def update(self, x, now=None):
+        self._insert(x)
+        self._samples.append(x)
+        if len(self._samples) > self.window:
+            self._remove(self._samples.popleft())
+        return self.median()
+
+    def snapshot(self):
+        return {"samples": list(self._samples)}
+
+    def restore(self, state):
+        self.__init__(self.window)
+        for x in state["samples"][-self.window:]:
+            self.update(x)
+
+    def median(self):
+        if self._low_size > self._high_size:
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2
+
+    def _insert(self, x):
+        if not self._low or x <= -self._low[0]:
+            heapq.heappush(self._low, -x)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, x)
+            self._high_size += 1
+        self._rebalance()
+
+    def _remove(self, x):
+        self._delayed[x] += 1
+        if x <= -self._low[0]:
+            self._low_size -= 1
+            if x == -self._low[0]:
+                self._prune(self._low, negated=True)
+        else:
+            self._high_size -= 1
+            if x == self._high[0]:
+                self._prune(self._high, negated=False)
+        self._rebalance()
+
+    def _rebalance(self):
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, negated=True)
+        elif self._low_size < self._high_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._high_size -= 1
+            self._low_size += 1
+            self._prune(self._high, negated=False)
+
+    def _prune(self, heap, negated):
+        while heap:
+            top = -heap[0] if negated else heap[0]
+            if not self._delayed[top]:
+                break
+            self._delayed[top] -= 1
+            if not self._delayed[top]:
+                del self._delayed[top]
+            heapq.heappop(heap)
+
+
+class Hampel:
+    """Replaces a sample with the window median when it lies more than n_sigmas robust
+    standard deviations (1.4826 x MAD) from it. O(window) per sample on a small window."""
+
+    def __init__(self, window=7, n_sigmas=3.0, min_deviation=0.0):
+        self._window = deque(maxlen=int(window))
+        self.n_sigmas = float(n_sigmas)
+        self.min_deviation = float(min_deviation)
+        self.outliers = 0
+        self.channel = None
+
+    def update(self, x, now=None):
+        self._window.append(x)
+        if len(self._window) < 3:
+            return x
+        ordered = sorted(self._window)
+        median = _median(ordered)
+        mad = _median(sorted(abs(v - median) for v in ordered))
+        if abs(x - median) > max(self.n_sigmas * 1.4826 * mad, self.min_deviation):
+            self.outliers += 1
+            OUTLIERS.inc(channel=self.channel)
+            return median
+        return x
+
+    def snapshot(self):
+        return {"window": list(self._window), "outliers": self.outliers}
+
+    def restore(self, state):
+        self._window.clear()
+        self._window.extend(state["window"])  # the deque's maxlen (the configured window) still applies
+        self.outliers = state["outliers"]
+
+
+class Kalman1D:
+    """Scalar Kalman filter for a slowly drifting level, O(1) per sample.
+
+    process_variance is per second when update() is given timestamps, so long gaps
+    between adaptive samples let the estimate move further.
+    """
+
+    def __init__(self, process_variance=1e-9, measurement_variance=2.5e-7):
+        self.q = float(process_variance)
+        self.r = float(measurement_variance)
+        self.value = None
+        self.variance = None
+        self._last_time = None
+
+    def update(self, z, now=None):
+        if self.value is None:
+            self.value, self.variance, self._last_time = z, self.r, now
+            return z
+        dt = 1.0 if now is None or self._last_time is None else max(now - self._last_time, 0.0)
+        self._last_time = now
+        self.variance += self.q * dt
+        gain = self.variance / (self.variance + self.r)
+        self.value += gain * (z - self.value)
+        self.variance *= 1 - gain
+        return self.value
+
+    def snapshot(self):
+        return {"value": self.value, "variance": self.variance, "last_time": self._last_time}
+
+    def restore(self, state):
+        self.value, self.variance, self._last_time = state["value"], state["variance"], state["last_time"]
+
+
+def _median(ordered):
+    n = len(ordered)
+    mid = n // 2
+    return ordered[mid] if n % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+# --- Filter Pipelines ---
+
+FILTERS = {"ema": EMA, "median": SlidingMedian, "hampel": Hampel, "kalman": Kalman1D}
+
+
+class FilterChain:
+    def __init__(self, stages, channel=None):
+        self.stages = stages
+        self.value = None
+        for stage in stages:
+            if isinstance(stage, Hampel):
+                stage.channel = channel
+
+    def update(self, x, now=None):
+        for stage in self.stages:
+            x = stage.update(x, now)
+        self.value = x
+        return x
+
+    def snapshot(self):
+        return {"value": self.value, "stages": [(type(stage).__name__, stage.snapshot()) for stage in self.stages]}
+
+    def restore(self, state):
+        """Filter windows only; a chain whose spec has changed since the checkpoint starts fresh."""
+        if [name for name, _ in state["stages"]] != [type(stage).__name__ for stage in self.stages]:
+            return
+        for stage, (_, saved) in zip(self.stages, state["stages"]):
+            stage.restore(saved)
+        self.value = state["value"]
+
+
+def build_chain(spec, channel=None):
+    """'hampel:7,kalman:1e-9:2.5e-7' -> FilterChain([Hampel(7), Kalman1D(1e-9, 2.5e-7)])"""
+    stages = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, *args = part.split(":")
+        if name not in FILTERS:
+            raise ValueError(f"Unknown filter '{name}' in '{spec}' (choose from {', '.join(FILTERS)})")
+        stages.append(FILTERS[name](*(float(a) for a in args)))
+    return FilterChain(stages, channel=channel)
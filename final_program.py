@@ -1,28 +1,18 @@
 import time
-import board
-import busio
 import RPi.GPIO as GPIO
 import Adafruit_DHT
 import os
 import zipfile
 from datetime import datetime
-from adafruit_ads1x15.ads1115 import ADS1115, P0, P1, P2
-from adafruit_ads1x15.analog_in import AnalogIn
-
-# --- Load Variables from variables.txt ---
-def load_variables(filepath="variables.conf"):
-    variables = {}
-    with open(filepath) as file:
-        for line in file:
-            if '=' in line:
-                key, value = line.strip().split('=', 1)
-                try:
-                    variables[key] = float(value)
-                except ValueError:
-                    variables[key] = value
-    return variables
+import calibration
+from planter_config import load_variables
+from dht_poller import DHTPoller
+import sensord
+from alert_rules import AlertEngine
 
+# --- Load Variables and Calibration Curves from variables.conf ---
 config = load_variables()
+curves = calibration.load_curves(config)
 
 # --- GPIO Setup ---
 RELAY_PIN = 14
@@ -32,24 +22,25 @@ GPIO.setup(RELAY_PIN, GPIO.OUT)
 GPIO.setup(PIR_PIN, GPIO.IN)
 GPIO.output(RELAY_PIN, GPIO.LOW)  # Motor off initially
 
-# --- I2C and ADS1115 Setup ---
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
-
-# --- Sensor Channels ---
-channel_light = AnalogIn(ads, P0)
-channel_soil = AnalogIn(ads, P1)
-channel_water = AnalogIn(ads, P2)
+# --- Sensor Channels (through sensord when it runs, else a private I2C bus) ---
+channels = sensord.open_channels("light", "soil", "water")
+channel_light = channels["light"]
+channel_soil = channels["soil"]
+channel_water = channels["water"]
 
 # --- DHT11 Sensor Setup ---
 DHT_SENSOR = Adafruit_DHT.DHT11
 DHT_PIN = 4  # GPIO4
+dht_poller = sensord.open_dht(lambda: DHTPoller(DHT_SENSOR, DHT_PIN))  # background reads; the loop never blocks on read_retry
 
 # --- Watering Control Variables ---
 last_watering_time = 0
 watering_wait_period = 300  # 5 minutes
 watering_duration = 5       # 5 seconds
 
+# --- Alert Rules (alert_rules.conf, reloaded when it or variables.conf changes) ---
+alert_engine = AlertEngine()
+
 # --- Alert Log Setup ---
 LOG_FILE = "alerts.log"
 
@@ -75,22 +66,10 @@ def read_avg_voltage(channel, samples=10):
     return total / samples
 
 def soil_moisture_percent(voltage):
-    dry = config["SOIL_DRY_VOLTAGE"]
-    wet = config["SOIL_WET_VOLTAGE"]
-    if voltage <= dry:
-        return 0
-    elif voltage >= wet:
-        return 100
-    return int((voltage - dry) / (wet - dry) * 100)
+    return calibration.percent(curves["soil"], voltage)
 
 def water_level_percent(voltage):
-    empty = config["WATER_EMPTY_VOLTAGE"]
-    full = config["WATER_FULL_VOLTAGE"]
-    if voltage <= empty:
-        return 0
-    elif voltage >= full:
-        return 100
-    return int((voltage - empty) / (full - empty) * 100)
+    return calibration.percent(curves["water"], voltage)
 
 def classify_light_level(lux):
     if lux < config["LIGHT_THRESHOLDS_dark"]:
@@ -104,10 +83,12 @@ def classify_light_level(lux):
     return "🕶️ Moderate light"
 
 def calculate_lux_from_voltage(voltage):
-    return voltage * 1000  # Approximation: 1V ≈ 1000 lux
+    return curves["light"](voltage)
 
 # --- Main Loop ---
 
+dht_poller.start()
+
 try:
     while True:
         messages = []
@@ -120,7 +101,8 @@ try:
         water_percent = water_level_percent(water_voltage)
         lux = calculate_lux_from_voltage(light_voltage)
 
-        humidity, temperature_c = Adafruit_DHT.read_retry(DHT_SENSOR, DHT_PIN)
+        dht = dht_poller.latest()
+        humidity, temperature_c = dht.humidity, dht.temperature
 
         # Motion Detection
         motion_detected = GPIO.input(PIR_PIN)
@@ -133,27 +115,19 @@ try:
         print(f"Ambient Light: {light_voltage:.4f} V → {lux:.0f} lux")
         print(f"Light Level:   {classify_light_level(lux)}")
 
-        if temperature_c is not None and humidity is not None:
-            print(f"Temperature:   {temperature_c} °C")
-            print(f"Humidity:      {humidity} %")
+        if dht.quality != "missing":
+            print(f"Temperature:   {temperature_c} °C{' (stale)' if dht.quality == 'stale' else ''}")
+            print(f"Humidity:      {humidity} %{' (stale)' if dht.quality == 'stale' else ''}")
         else:
             print("❌ DHT11 Sensor Read Error")
 
-        # Alerts
-        if temperature_c is not None:
-            if temperature_c < config["TEMP_THRESHOLDS_low"]:
-                alert = "⚠️ Too cold! Temperature below threshold."
-                messages.append(alert)
-                log_alert(alert)
-            elif temperature_c > config["TEMP_THRESHOLDS_high"]:
-                alert = "⚠️ Too hot! Temperature above threshold."
-                messages.append(alert)
-                log_alert(alert)
-
-        if humidity is not None and humidity > config["HUMIDITY_THRESHOLD"]:
-            alert = "⚠️ Too much humidity! Above 60%."
-            messages.append(alert)
-            log_alert(alert)
+        # Alerts (alert_rules.conf): shown while active, logged when they fire
+        snapshot = {"temperature": temperature_c, "humidity": humidity, "soil": soil_percent,
+                    "water": water_percent, "lux": lux}
+        for alert in alert_engine.evaluate(snapshot):
+            messages.append(alert.message)
+            if alert.fired:
+                log_alert(alert.message)
 
         light_class = classify_light_level(lux)
         messages.append(f"Light Level: {light_class}")
@@ -195,6 +169,7 @@ except KeyboardInterrupt:
     print("\nStopped by user.")
 
 finally:
+    dht_poller.stop()
     GPIO.cleanup()
     print("GPIO cleanup complete.")
 
@@ -1,15 +1,23 @@
 from flask import Flask, render_template_string, request, render_template, redirect
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
+import profiling
+import startup
 
 load_dotenv()
 
 app = Flask(__name__)
 VARIABLES_FILE = "variables.conf"
 
-# OpenAI Client Initialization
-client = OpenAI()
+# OpenAI Client Initialization (on first /ask, so the server is up without waiting for it)
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI()
+    return _client
 
 # --- HTML Templates ---
 HTML_CONFIG = """
@@ -111,7 +119,7 @@ def index():
         if not user_prompt:
             return render_template_string(HTML_CHAT, error="Please enter a prompt.")
         try:
-            response = client.chat.completions.create(
+            response = get_client().chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are a helpful plant monitoring assistant."},
@@ -124,6 +132,14 @@ def index():
             return render_template_string(HTML_CHAT, error=str(e))
     return render_template_string(HTML_CHAT)
 
+# --- Profiling: POST /profile?n=10&mode=cprofile|sample (from localhost) captures the next n /ask or /config requests ---
+request_profiler = profiling.Profiler("flashbrowser")
+profiling.register_flask_hooks(app, request_profiler, endpoints=("index", "edit_config"))
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    from werkzeug.serving import make_server
+    server = make_server("0.0.0.0", 5000, app, threaded=True)  # binds the socket now
+    startup.mark("server_start")
+    startup.notify("READY=1")  # systemd Type=notify: connections are accepted from here on
+    server.serve_forever()
 
@@ -0,0 +1,146 @@
+"""Local history of sensor readings, kept on the planter for export.py.
+
+Readings are fixed-size binary records <time, channel id, value> appended to one
+segment per UTC day (history/readings_YYYYMMDD.bin). Channel names are assigned ids in
+history/channels, one name per line. record() only buffers, and the buffer is written
+with one unsynced write() every `flush_interval` seconds, so the control loop never
+waits on the SD card. Records within a segment are in time order (give or take a DHT
+reading's age), so read() finds the start of a range by bisecting the file and then
+streams forward, in constant memory. Segments older than `retention_days` are deleted.
+"""
+import glob
+import math
+import os
+import struct
+import time
+
+from metrics import Counter, Gauge
+
+HISTORY_DIR = "history"
+
+RECORD = struct.Struct("<dHf")  # time, channel id, value (NaN when missing)
+SLACK = 300.0  # readings may be recorded up to this late (DHT timestamps), so ranges are widened by it
+
+RECORDED = Counter("planter_history_records_total", "Readings written to the local history.")
+HISTORY_BYTES = Gauge("planter_history_bytes", "Size of the current day's history segment.")
+
+
+def _day(t):
+    return time.strftime("%Y%m%d", time.gmtime(t))
+
+
+class ReadingLog:
+    def __init__(self, directory=HISTORY_DIR, flush_interval=60.0, retention_days=400):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.channels = {}
+        self._buffer = {}       # day -> [packed records]
+        self._flushed = None
+        os.makedirs(directory, exist_ok=True)
+        self._load_channels()
+
+    def _load_channels(self):
+        try:
+            with open(os.path.join(self.directory, "channels"), encoding="utf-8") as f:
+                names = [line.rstrip("\n") for line in f]
+        except FileNotFoundError:
+            names = []
+        self.channels = {name: index for index, name in enumerate(names)}
+        self.names = names
+
+    def _channel(self, name):
+        index = self.channels.get(name)
+        if index is None:
+            index = len(self.names)
+            with open(os.path.join(self.directory, "channels"), "a", encoding="utf-8") as f:
+                f.write(name + "\n")
+            self.channels[name] = index
+            self.names.append(name)
+        return index
+
+    def segment(self, day):
+        return os.path.join(self.directory, f"readings_{day}.bin")
+
+    # --- Writing (control loop) ---
+
+    def record(self, name, value, t):
+        value = math.nan if value is None else float(value)
+        self._buffer.setdefault(_day(t), []).append(RECORD.pack(t, self._channel(name), value))
+        if self._flushed is None:
+            self._flushed = t
+        elif t - self._flushed >= self.flush_interval:
+            self.flush(t)
+
+    def flush(self, now=None):
+        buffered, self._buffer = self._buffer, {}
+        for day, records in sorted(buffered.items()):
+            path = self.segment(day)
+            with open(path, "ab") as f:
+                end = f.tell()
+                if end % RECORD.size:  # torn record from a power cut: realign before appending
+                    f.truncate(end - end % RECORD.size)
+                    f.seek(0, os.SEEK_END)
+                f.write(b"".join(records))
+                HISTORY_BYTES.set(f.tell())
+            RECORDED.inc(len(records))
+        now = time.time() if now is None else now
+        if self._flushed is None or _day(now) != _day(self._flushed):
+            self.expire(now)
+        self._flushed = now
+
+    def expire(self, now):
+        oldest = _day(now - self.retention_days * 86400)
+        for path in glob.glob(os.path.join(self.directory, "readings_*.bin")):
+            if os.path.basename(path)[9:17] < oldest:
+                os.remove(path)
+
+    def close(self):
+        self.flush()
+
+    # --- Reading (export) ---
+
+    def days(self, since, until):
+        first, last = _day(max(since - SLACK, 0)), _day(until + SLACK)
+        paths = sorted(glob.glob(os.path.join(self.directory, "readings_*.bin")))
+        return [path for path in paths if first <= os.path.basename(path)[9:17] <= last]
+
+    def read(self, since, until, chunk_records=4096):
+        """(t, name, value) for readings in [since, until), oldest first; value None if missing."""
+        self._load_channels()  # another process (the control loop) may have added channels
+        for path in self.days(since, until):
+            with open(path, "rb") as f:
+                count = os.fstat(f.fileno()).st_size // RECORD.size
+                position = _bisect(f, count, since - SLACK)
+                f.seek(position * RECORD.size)
+                while position < count:
+                    data = f.read(min(chunk_records, count - position) * RECORD.size)
+                    if not data:
+                        break
+                    position += len(data) // RECORD.size
+                    for t, index, value in RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]):
+                        if t >= until + SLACK:
+                            return
+                        if since <= t < until:
+                            name = self.names[index] if index < len(self.names) else f"channel{index}"
+                            yield t, name, None if math.isnan(value) else value
+
+
+def _bisect(f, count, t):
+    """Index of the first record at or after `t` in a time-ordered segment."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        f.seek(middle * RECORD.size)
+        if RECORD.unpack(f.read(RECORD.size))[0] < t:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def from_config(config):
+    return ReadingLog(
+        flush_interval=config.get("HISTORY_FLUSH_INTERVAL", 60),
+        retention_days=config.get("HISTORY_RETENTION_DAYS", 400),
+    )
@@ -0,0 +1,130 @@
+"""Low-power idle scheduling for the control loop.
+
+All of the loop's deadlines (sensor samples, backlight timeout, end of the absorption
+wait, predicted watering) go onto one TimerWheel. Deadlines are rounded up to the
+wheel's slot boundary, so work that falls due within one slot is done in one wakeup.
+IdleScheduler sleeps until the earliest deadline, never longer than `max_tick`, and a
+GPIO edge (the PIR) wakes it early. WakeupMeter reports the loop's wakeups, context
+switches and CPU use per hour from inside the process.
+"""
+import math
+import resource
+import threading
+
+from metrics import Counter, Gauge
+
+WAKEUPS = Counter("planter_wakeups_total", "Control loop wakeups, by reason (timer, gpio).")
+WAKEUPS_PER_HOUR = Gauge("planter_wakeups_per_hour", "Control loop wakeups over the last full hour.")
+CONTEXT_SWITCHES_PER_HOUR = Gauge("planter_context_switches_per_hour", "Voluntary context switches of the whole process (all threads) over the last full hour.")
+CPU_PERCENT = Gauge("planter_cpu_percent", "Process CPU time as a percentage of wall time over the last full hour.")
+IDLE_SLEEP = Gauge("planter_idle_sleep_seconds", "Length of the control loop's last sleep.")
+
+
+class TimerWheel:
+    """Hashed timing wheel: named deadlines in `slots` buckets of `resolution` seconds.
+
+    schedule() replaces a name's previous deadline. next_deadline() walks the buckets
+    from the current one, so the cost doesn't grow with the number of timers.
+    """
+
+    def __init__(self, resolution=3.0, slots=128):
+        self.resolution = resolution
+        self.slots = [dict() for _ in range(slots)]
+        self.where = {}  # name -> tick (deadline rounded up to the slot boundary)
+
+    def _tick(self, when):
+        return math.ceil(when / self.resolution)
+
+    def schedule(self, name, when, now):
+        """(Re)set a deadline; one already past is due in the current slot."""
+        self.cancel(name)
+        if when is None:
+            return
+        tick = self._tick(max(when, now))
+        self.where[name] = tick
+        self.slots[tick % len(self.slots)][name] = tick
+
+    def cancel(self, name):
+        tick = self.where.pop(name, None)
+        if tick is not None:
+            self.slots[tick % len(self.slots)].pop(name, None)
+
+    def next_deadline(self, now):
+        """Earliest slot boundary holding a deadline, or None."""
+        if not self.where:
+            return None
+        start = self._tick(now)
+        for offset in range(len(self.slots)):
+            ticks = self.slots[(start + offset) % len(self.slots)].values()
+            due = [tick for tick in ticks if tick <= start + offset]
+            if due:
+                return max(min(due) * self.resolution, now)
+        return max(min(self.where.values()) * self.resolution, now)  # more than one revolution away
+
+
+class IdleScheduler:
+    """Sleeps the loop until the wheel's next deadline, `max_tick` at most, or a GPIO edge."""
+
+    def __init__(self, wheel, min_tick=3.0, max_tick=60.0):
+        self.wheel = wheel
+        self.min_tick = min_tick
+        self.max_tick = max_tick
+        self.wake_event = threading.Event()
+        self.wait = self.wake_event.wait  # swapped for a virtual clock's sleep in simulations
+
+    def watch_pins(self, gpio, pins, edge=None, bouncetime=200):
+        """Wake on these inputs' edges. Returns False (the loop just polls them) without edge detection."""
+        try:
+            for pin in pins:
+                gpio.add_event_detect(pin, gpio.RISING if edge is None else edge,
+                                      callback=lambda channel: self.wake_event.set(), bouncetime=bouncetime)
+        except (RuntimeError, AttributeError) as e:
+            print(f"⚠️ No GPIO edge detection ({e}); polling inputs on each tick.")
+            return False
+        return True
+
+    def sleep(self, now):
+        """Sleep until the next deadline; returns the wakeup reason."""
+        deadline = self.wheel.next_deadline(now)
+        limit = now + self.max_tick
+        deadline = limit if deadline is None else min(max(deadline, now + self.min_tick), limit)
+        timeout = deadline - now
+        IDLE_SLEEP.set(round(timeout, 3))
+        woken = self.wait(timeout) and self.wake_event.is_set()
+        self.wake_event.clear()
+        reason = "gpio" if woken else "timer"
+        WAKEUPS.inc(reason=reason)
+        return reason
+
+
+class WakeupMeter:
+    """Wakeups, voluntary context switches and CPU per hour, measured by the process itself."""
+
+    def __init__(self, period=3600.0):
+        self.period = period
+        self.wakeups = 0
+        self._start = None
+
+    def _usage(self):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime, usage.ru_nvcsw
+
+    def wakeup(self, now):
+        """Count one wakeup; once per period returns (wakeups/h, context switches/h, CPU %)."""
+        if self._start is None:
+            self._start = (now, *self._usage())
+            return None
+        self.wakeups += 1
+        started, cpu0, switches0 = self._start
+        elapsed = now - started
+        if elapsed < self.period:
+            return None
+        cpu, switches = self._usage()
+        per_hour = 3600.0 / elapsed
+        report = (self.wakeups * per_hour, (switches - switches0) * per_hour, 100.0 * (cpu - cpu0) / elapsed)
+        WAKEUPS_PER_HOUR.set(round(report[0], 1))
+        CONTEXT_SWITCHES_PER_HOUR.set(round(report[1], 1))
+        CPU_PERCENT.set(round(report[2], 3))
+        self._start = (now, cpu, switches)
+        self.wakeups = 0
+        return report
@@ -1,26 +1,20 @@
 import time
-import board
-import busio
-from adafruit_ads1x15.ads1115 import ADS1115, P0
-from adafruit_ads1x15.analog_in import AnalogIn
+import calibration
+import sensord
+from planter_config import load_variables
 
-# --- I2C and ADS1115 Setup ---
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
-
-# TEMT6000 on ADS1115 A0
-light_channel = AnalogIn(ads, P0)
+# TEMT6000 on ADS1115 A0, read through sensord (it owns the I2C bus)
+light_channel = sensord.open_channels("light")["light"]
 
 # --- Lux Calculation ---
+light_curve = calibration.light_curve(load_variables())
+
 def voltage_to_lux(voltage):
     """
-    Approximate conversion from voltage to lux.
-    This is a rough linear estimation:
-    TEMT6000 = ~1 µA per lux → via 10K pull-down = ~0.01V per lux
+    Conversion from voltage to lux using the shared LIGHT_CURVE calibration
+    (default ~1 mV per lux, the same curve main_program.py uses).
     """
-    # For example: 1 lux = 0.01V → lux = voltage / 0.01
-    lux = voltage / 0.01
-    return int(lux)
+    return int(light_curve(voltage))
 
 # --- Read Loop ---
 try:
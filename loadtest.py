@@ -0,0 +1,403 @@
+"""Load generator for the planter web apps, run against a local stub LLM.
+
+Starts one app (app.py, flashbrowser.py or config_editor.py) in a scratch directory,
+with its LLM upstream pointed at a stub. The stub answers after an injectable latency
+and fails at an injectable rate. Workers then drive /, /ask and /config in the given
+mix, either closed-loop (each worker waits for its own response) or open-loop at a
+fixed arrival rate. In open-loop mode latency is measured from the scheduled send
+time, so queueing behind a slow server counts. The report gives throughput,
+p50/p95/p99 latency and error rates per endpoint.
+
+    python3 loadtest.py --app app --concurrency 8 --duration 30 --mix home=4,ask=2,config=3,config_save=1
+    python3 loadtest.py --app flashbrowser --rate 5 --llm-latency 3 --llm-error-rate 0.1 -o fb.json
+    python3 loadtest.py --app app --url http://planter.local:5000 --llm-host 0.0.0.0 --llm-port 8700
+
+With --url the server is not started here. Point its HF_API_URL (app.py) or
+OPENAI_BASE_URL (flashbrowser.py) at the stub. An /ask answered with 200 but without
+the stub's answer in the page counts as an upstream failure: the app caught the LLM
+error and showed it.
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import REPO_DIR, git_commit, write_alert_log
+
+STUB_ANSWER = "STUB-ANSWER: keep the soil moist and refill the tank when it runs low."
+
+# Endpoint name -> (method, path) for each app
+APPS = {
+    "app": {"home": ("GET", "/"), "ask": ("POST", "/ask"), "config": ("GET", "/config"),
+            "config_save": ("POST", "/config")},
+    "flashbrowser": {"home": ("GET", "/"), "ask": ("POST", "/ask"), "config": ("GET", "/config"),
+                     "config_save": ("POST", "/config")},
+    "config_editor": {"home": ("GET", "/"), "config": ("GET", "/"), "config_save": ("POST", "/")},
+}
+DEFAULT_MIX = "home=4,ask=2,config=3,config_save=1"
+
+QUESTIONS = (
+    "Why did my plant die?",
+    "Was it too hot yesterday?",
+    "How often was the tank empty last week?",
+    "Is the humidity a problem?",
+    "What happened on 23-06?",
+)
+
+# outcome: ok, http_error (status >= 400), upstream (the app showed an LLM error), failed (no response)
+Sample = namedtuple("Sample", "endpoint latency status outcome")
+
+
+# --- Stub LLM ---
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        stub = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with stub.lock:
+            stub.calls += 1
+            stub.active += 1
+            stub.peak_active = max(stub.peak_active, stub.active)
+            delay = max(0.0, stub.rng.gauss(stub.latency, stub.jitter))
+            fail = stub.rng.random() < stub.error_rate
+        try:
+            time.sleep(delay)
+            if fail:
+                with stub.lock:
+                    stub.failures += 1
+                self._reply(503, {"error": "stub LLM: injected failure"})
+            elif self.path.rstrip("/").endswith("/chat/completions"):  # OpenAI
+                self._reply(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": "stub", "choices": [{"index": 0, "finish_reason": "stop",
+                                                  "message": {"role": "assistant", "content": STUB_ANSWER}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+            else:  # Hugging Face inference API
+                self._reply(200, [{"generated_text": STUB_ANSWER}])
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubLLM(ThreadingHTTPServer):
+    """Answers HF inference and OpenAI chat requests after `latency` ± `jitter` s, failing at `error_rate`."""
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=1.0, jitter=0.25, error_rate=0.0, seed=None):
+        super().__init__((host, port), _StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.active = 0
+        self.peak_active = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True).start()
+        return self
+
+
+# --- Target App ---
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_workdir(log_bytes):
+    """Scratch copy of the config files and an alerts.log, so /config saves never touch the repo."""
+    workdir = tempfile.mkdtemp(prefix="planter_load_")
+    for name in ("variables.conf", "alert_rules.conf"):
+        shutil.copy(os.path.join(REPO_DIR, name), workdir)
+    write_alert_log(os.path.join(workdir, "alerts.log"), log_bytes)
+    return workdir
+
+
+def start_app(name, port, workdir, llm_url, startup_timeout=30.0):
+    env = dict(os.environ)
+    env.update({
+        "HF_API_URL": f"{llm_url}/models/stub", "HF_API_TOKEN": "loadtest",
+        "OPENAI_BASE_URL": f"{llm_url}/v1", "OPENAI_API_KEY": "loadtest",
+        "PYTHONPATH": os.pathsep.join(filter(None, (REPO_DIR, env.get("PYTHONPATH")))),
+    })
+    with open(os.path.join(workdir, "server.log"), "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-c", f"import {name}; {name}.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(os.path.join(workdir, "server.log"), errors="replace") as f:
+                raise RuntimeError(f"{name} exited during start-up:\n{f.read()[-2000:]}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{name} did not start listening on port {port} within {startup_timeout:.0f} s")
+
+
+# --- Load Generation ---
+
+def send(base_url, method, path, form=None, timeout=60.0):
+    """(status, body) of one request on a fresh connection, as a kiosk or phone would make it."""
+    url = urllib.parse.urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    try:
+        body = urllib.parse.urlencode(form) if form is not None else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def request_once(base_url, routes, endpoint, rng, timeout):
+    method, path = routes[endpoint]
+    form = None
+    if endpoint == "ask":
+        form = {"prompt": rng.choice(QUESTIONS)}
+    elif method == "POST":
+        form = {}  # a save with no fields changed rewrites variables.conf as it is
+    try:
+        status, body = send(base_url, method, path, form, timeout)
+    except (OSError, http.client.HTTPException):
+        return None, "failed"
+    if status >= 400:
+        return status, "http_error"
+    if endpoint == "ask" and STUB_ANSWER.encode() not in body:
+        return status, "upstream"
+    return status, "ok"
+
+
+def run_load(base_url, routes, mix, concurrency, duration, rate=None, timeout=60.0, seed=None):
+    """Samples from `concurrency` workers over `duration` s; open-loop at `rate` req/s when given."""
+    endpoints, weights = zip(*mix.items())
+    samples = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    arrivals = queue.Queue()
+
+    def record(endpoint, started, status, outcome):
+        with lock:
+            samples.append(Sample(endpoint, time.monotonic() - started, status, outcome))
+
+    def closed_worker(rng):
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            started = time.monotonic()
+            status, outcome = request_once(base_url, routes, endpoint, rng, timeout)
+            record(endpoint, started, status, outcome)
+
+    def open_worker(rng):
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            scheduled, endpoint = item
+            wait = scheduled - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            status, outcome = request_once(base_url, routes, endpoint, rng, timeout)
+            record(endpoint, scheduled, status, outcome)  # from the scheduled time: queueing counts
+
+    master = random.Random(seed)
+    workers = [threading.Thread(target=open_worker if rate else closed_worker, args=(random.Random(master.random()),),
+                                daemon=True) for _ in range(concurrency)]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    if rate:
+        at = started
+        while True:
+            at += master.expovariate(rate)  # Poisson arrivals
+            if at >= deadline:
+                break
+            arrivals.put((at, master.choices(endpoints, weights)[0]))
+        for _ in workers:
+            arrivals.put(None)
+    for worker in workers:
+        worker.join()
+    return samples, time.monotonic() - started
+
+
+# --- Report ---
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))  # nearest rank
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples, elapsed):
+    groups = {}
+    for sample in samples:
+        groups.setdefault(sample.endpoint, []).append(sample)
+    groups["all"] = samples
+    summary = {}
+    for endpoint, group in groups.items():
+        latencies = sorted(sample.latency for sample in group)
+        outcomes = [sample.outcome for sample in group]
+        count = len(group)
+        summary[endpoint] = {
+            "requests": count,
+            "throughput_rps": count / elapsed if elapsed else 0.0,
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "p99_s": percentile(latencies, 99),
+            "max_s": latencies[-1] if latencies else None,
+            "error_rate": (outcomes.count("http_error") + outcomes.count("failed")) / count if count else 0.0,
+            "upstream_failure_rate": outcomes.count("upstream") / count if count else 0.0,
+        }
+    return summary
+
+
+def print_report(summary, stub):
+    def ms(value):
+        return f"{value * 1000:>9.1f}" if value is not None else f"{'-':>9}"
+
+    print(f"\n{'endpoint':<12} {'requests':>8} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'max ms':>9} {'errors':>7} {'upstream':>8}")
+    for endpoint, row in summary.items():
+        print(f"{endpoint:<12} {row['requests']:>8} {row['throughput_rps']:>7.1f} {ms(row['p50_s'])} "
+              f"{ms(row['p95_s'])} {ms(row['p99_s'])} {ms(row['max_s'])} {row['error_rate']:>7.1%} "
+              f"{row['upstream_failure_rate']:>8.1%}")
+    print(f"\nstub LLM: {stub.calls} calls, {stub.failures} injected failures, "
+          f"at most {stub.peak_active} in flight at once")
+
+
+def compare(summary, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["summary"]
+    print(f"\n--- Compared with {baseline_path} ---")
+    for endpoint, row in summary.items():
+        old = baseline.get(endpoint)
+        if not old or not old.get("p95_s") or not old.get("throughput_rps") or row["p95_s"] is None:
+            continue
+        print(f"{endpoint:<12} p95 {row['p95_s'] / old['p95_s']:>6.2f}x  "
+              f"throughput {row['throughput_rps'] / old['throughput_rps']:>6.2f}x")
+
+
+def parse_mix(text, routes):
+    mix = {}
+    for part in filter(None, (piece.strip() for piece in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in routes:
+            continue  # e.g. ask against config_editor
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError(f"mix '{text}' has no endpoints for this app (it has {', '.join(routes)})")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the planter web apps against a stub LLM.")
+    parser.add_argument("--app", choices=sorted(APPS), default="app")
+    parser.add_argument("--url", help="test a server that is already running instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=4, help="simultaneous clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--rate", type=float, help="open-loop arrivals per second (default: closed loop)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="stub LLM mean response time, s")
+    parser.add_argument("--llm-jitter", type=float, default=0.25, help="stub LLM response time std dev, s")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of stub LLM calls answered 503")
+    parser.add_argument("--llm-host", default="127.0.0.1")
+    parser.add_argument("--llm-port", type=int, default=0)
+    parser.add_argument("--log-bytes", type=int, default=50_000, help="size of the scratch alerts.log")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results from an earlier run to compare against")
+    args = parser.parse_args()
+
+    routes = APPS[args.app]
+    try:
+        mix = parse_mix(args.mix, routes)
+    except ValueError as e:
+        parser.error(str(e))
+    stub = StubLLM(args.llm_host, args.llm_port, args.llm_latency, args.llm_jitter, args.llm_error_rate,
+                   args.seed).start()
+    process = workdir = None
+    base_url = args.url
+    try:
+        if base_url is None:
+            workdir = prepare_workdir(args.log_bytes)
+            port = free_port()
+            process = start_app(args.app, port, workdir, stub.url)
+            base_url = f"http://127.0.0.1:{port}"
+        else:
+            print(f"Stub LLM at {stub.url}: set HF_API_URL={stub.url}/models/stub (app.py) "
+                  f"or OPENAI_BASE_URL={stub.url}/v1 (flashbrowser.py) on the server.")
+        send(base_url, "GET", "/", timeout=args.timeout)  # warm-up: lazy imports, first template render
+        mode = f"open loop at {args.rate:g} req/s" if args.rate else "closed loop"
+        print(f"{args.app} at {base_url}: {args.concurrency} clients, {mode}, {args.duration:g} s, mix {mix}, "
+              f"stub LLM {args.llm_latency:g}±{args.llm_jitter:g} s with {args.llm_error_rate:.0%} errors")
+        samples, elapsed = run_load(base_url, routes, mix, args.concurrency, args.duration, args.rate,
+                                    args.timeout, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+        stub.shutdown()
+
+    summary = summarize(samples, elapsed)
+    print_report(summary, stub)
+    if args.output:
+        report = {
+            "meta": {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+                     "app": args.app, "url": args.url, "concurrency": args.concurrency, "rate": args.rate,
+                     "duration": args.duration, "mix": mix, "llm_latency": args.llm_latency,
+                     "llm_jitter": args.llm_jitter, "llm_error_rate": args.llm_error_rate},
+            "summary": summary,
+            "stub": {"calls": stub.calls, "failures": stub.failures, "peak_in_flight": stub.peak_active},
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(summary, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,37 @@
 import time
-import board
-import busio
 import RPi.GPIO as GPIO
-import Adafruit_DHT
 import os
 import zipfile
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-import st7735  # Pimoroni's library (lowercase import)
-from adafruit_ads1x15.ads1115 import ADS1115, P0, P1, P2
-from adafruit_ads1x15.analog_in import AnalogIn
-
-# --- Load Variables from variables.txt ---
-def load_variables(filepath="variables.conf"):
-    variables = {}
-    with open(filepath) as file:
-        for line in file:
-            if '=' in line:
-                key, value = line.strip().split('=', 1)
-                try:
-                    variables[key] = float(value)
-                except ValueError:
-                    variables[key] = value
-    return variables
-
+from adaptive_sampling import AdaptiveSampler, SamplingScheduler
+from dht_poller import DHTPoller
+import filters
+import calibration
+from planter_config import load_variables
+import metrics
+import profiling
+import sensord
+import startup
+import idle
+import history
+from state_store import StateStore
+import telemetry
+import watering_predictor
+import dosing
+import anomaly
+from alert_rules import AlertEngine
+from metrics import STAGE_SECONDS, TICK_SECONDS, ALERTS, PUMP_ACTIVATIONS, I2C_ERRORS
+
+# --- Load Variables and Calibration Curves from variables.conf ---
 config = load_variables()
+curves = calibration.load_curves(config)
+
+# --- Metrics Endpoint (Prometheus text format on /metrics) ---
+METRICS_PORT = int(config.get("METRICS_PORT", 9108))
+
+# --- On-demand Profiling (kill -USR1 <pid> = cProfile, -USR2 = stack sampler) ---
+loop_profiler = profiling.Profiler("control_loop")
+PROFILE_ITERATIONS = int(config.get("PROFILE_ITERATIONS", 10))
 
 # --- GPIO Setup ---
 RELAY_PIN = 14
@@ -40,65 +47,162 @@ BLK = 23
 GPIO.setup(BLK, GPIO.OUT)
 GPIO.output(BLK, GPIO.HIGH)  # Start with backlight ON
 
-# --- I2C and ADS1115 Setup ---
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
-
 # --- Sensor Channels ---
-channel_light = AnalogIn(ads, P0)
-channel_soil = AnalogIn(ads, P1)
-channel_water = AnalogIn(ads, P2)
+# Through sensord when it is running (it owns the I2C bus, so diagnostics can run
+# alongside); otherwise straight from the ADS1115. If sensord restarts the client
+# reconnects; if it is gone for good the channels move to this process's own bus.
+sensor_client = sensord.connect()
+if sensor_client is not None:
+    channel_light = sensord.RemoteChannel(sensor_client, "light", fallback=True)
+    channel_soil = sensord.RemoteChannel(sensor_client, "soil", fallback=True)
+    channel_water = sensord.RemoteChannel(sensor_client, "water", fallback=True)
+else:
+    channels = sensord.local_channels("light", "soil", "water")
+    channel_light, channel_soil, channel_water = channels["light"], channels["soil"], channels["water"]
 
 # --- DHT11 Sensor Setup ---
-DHT_SENSOR = Adafruit_DHT.DHT11
+DHT_SENSOR = "DHT11"  # Adafruit_DHT.DHT11, looked up when the poller first reads
 DHT_PIN = 4  # GPIO4
 
 # --- Watering Control Variables ---
 last_watering_time = 0
 watering_wait_period = 300  # 5 minutes
-watering_duration = 5       # 5 seconds
+# Burst length is sized per watering from the learned soil response (DOSE_TARGET_LOW/HIGH),
+# and tank draw per pump-second feeds the days-to-refill estimate.
+dose_controller, water_account = dosing.from_config(config)
+
+# --- Adaptive Sampling ---
+# Each signal is read only when due: slowly while stable (up to SAMPLE_MAX_INTERVAL),
+# every tick when it moves, and continuously while and just after the pump runs.
+TICK_INTERVAL = 3
+SAMPLE_MAX_INTERVAL = config.get("SAMPLE_MAX_INTERVAL", 300)
+PUMP_SAMPLE_INTERVAL = 1     # water level check while the relay is on
+PUMP_BURST_SECONDS = 60      # keep sampling soil/water fast while the burst soaks in
+
+sampling = SamplingScheduler([
+    AdaptiveSampler("soil", TICK_INTERVAL, SAMPLE_MAX_INTERVAL, change=2),     # % moisture
+    AdaptiveSampler("water", TICK_INTERVAL, SAMPLE_MAX_INTERVAL, change=2),    # % tank level
+    AdaptiveSampler("light", TICK_INTERVAL, SAMPLE_MAX_INTERVAL, change=50),   # lux
+])
+
+# --- Idle Scheduling ---
+# Between ticks the loop sleeps until the next deadline on a shared timer wheel (sensor
+# samples, backlight/display refresh, end of absorption, predicted watering), at most
+# IDLE_MAX_TICK seconds, and the PIR wakes it at once.
+IDLE_MAX_TICK = config.get("IDLE_MAX_TICK", 60)
+timer_wheel = idle.TimerWheel(resolution=TICK_INTERVAL)
+idle_scheduler = idle.IdleScheduler(timer_wheel, min_tick=TICK_INTERVAL, max_tick=IDLE_MAX_TICK)
+wakeup_meter = idle.WakeupMeter()
+
+# --- Predictive Watering ---
+# Fits the soil drying trend so watering starts shortly before the soil reaches
+# WATER_TRIGGER_PERCENT, and schedules the next soil sample from the predicted change.
+watering_planner = watering_predictor.from_config(config)
+
+# --- DHT11 Background Poller ---
+# Single non-blocking reads on their own thread (no read_retry stalls in the loop);
+# the loop uses the last good reading and its age. DHT_STALE_AFTER counts from when the
+# adaptive sampler's next read was due, so a steady 300 s poll still reads as fresh.
+def local_dht_poller():
+    return DHTPoller(
+        DHT_SENSOR, DHT_PIN,
+        stale_after=config.get("DHT_STALE_AFTER", 30),
+        expire_after=config.get("DHT_EXPIRE_AFTER", 600),
+        sampler=AdaptiveSampler("dht", TICK_INTERVAL, SAMPLE_MAX_INTERVAL, change=(1, 3)),  # (% RH, °C)
+    )
+
+if sensor_client is not None:
+    dht_poller = sensord.RemoteDHT(sensor_client, fallback=local_dht_poller)  # the daemon polls the DHT11
+else:
+    dht_poller = local_dht_poller()
+
+# --- Fleet Telemetry (only when TELEMETRY_URL is set in variables.conf) ---
+telemetry_sender = None  # started in main()
+reading_history = None   # local history for export.py, opened in main()
+
+def report_reading(name, value, now):
+    if reading_history is not None:
+        reading_history.record(name, value, now)
+    if telemetry_sender is not None:
+        telemetry_sender.record("reading", t=now, name=name, value=value)
 
 # --- Alert Log Setup ---
 LOG_FILE = "alerts.log"
 
 def log_alert(message):
-    timestamp = datetime.now().strftime("%d-%m %H:%M")
-    with open(LOG_FILE, "a") as log_file:
-        log_file.write(f"[{timestamp}] {message}\n")
-
-    # Compress if log grows too big
-    if os.path.getsize(LOG_FILE) > 50_000:  # ~50 KB
-        archive_name = f"alerts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-        with zipfile.ZipFile(archive_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(LOG_FILE)
-        open(LOG_FILE, "w").close()  # Clear log
+    ALERTS.inc()
+    if telemetry_sender is not None:
+        telemetry_sender.record("alert", message=message)
+    with STAGE_SECONDS.time(stage="log_alert"):
+        timestamp = datetime.now().strftime("%d-%m %H:%M")
+        with open(LOG_FILE, "a") as log_file:
+            log_file.write(f"[{timestamp}] {message}\n")
+
+        # Compress if log grows too big
+        if os.path.getsize(LOG_FILE) > 50_000:  # ~50 KB
+            archive_name = f"alerts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            with zipfile.ZipFile(archive_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                zipf.write(LOG_FILE)
+            open(LOG_FILE, "w").close()  # Clear log
+
+# --- Anomaly Detection ---
+# Stuck probes, level jumps, tank leaks and DHT dropouts, scored and sent to the alert log.
+def report_anomaly(event):
+    log_alert(f"{event.message} (score {event.score:.1f})")
+
+anomaly_detector = anomaly.from_config(config, sink=report_anomaly)
+
+# --- Alert Rules (alert_rules.conf, reloaded when it or variables.conf changes) ---
+alert_engine = AlertEngine()
 
 # --- Helper Functions ---
 
-def read_avg_voltage(channel, samples=10):
-    total = 0
-    for _ in range(samples):
-        total += channel.voltage
-        time.sleep(0.01)
-    return total / samples
+def read_avg_voltage(channel, samples=10, name="adc"):
+    with STAGE_SECONDS.time(stage="read_avg_voltage", channel=name):
+        total = 0
+        good = 0
+        for _ in range(samples):
+            try:
+                total += channel.voltage
+                good += 1
+            except OSError:
+                I2C_ERRORS.inc(channel=name)  # skip the failed conversion, keep the rest
+            time.sleep(0.01)
+    if not good:
+        raise OSError(f"All {samples} I2C reads failed on {name} channel")
+    return total / good
+
+# --- Streaming Filters ---
+# A couple of back-to-back conversions per reading go through a per-channel pipeline
+# (outlier rejection + smoothing) instead of a plain mean of 10 settled samples.
+SAMPLES_PER_READ = 1 if sensor_client is not None else int(config.get("SAMPLES_PER_READ", 2))  # sensord serves one cached sample
+channel_filters = {
+    "soil": filters.build_chain(config.get("FILTER_SOIL", "hampel:7:3,kalman:1e-9:2.5e-7"), "soil"),
+    "water": filters.build_chain(config.get("FILTER_WATER", "hampel:5:3,ema:0.5"), "water"),
+    "light": filters.build_chain(config.get("FILTER_LIGHT", "median:5"), "light"),
+}
+
+def read_filtered(channel, name, samples=SAMPLES_PER_READ):
+    chain = channel_filters[name]
+    value = None
+    with STAGE_SECONDS.time(stage="read_filtered", channel=name):
+        for _ in range(samples):
+            try:
+                raw = channel.voltage
+                now = time.time()
+                value = chain.update(raw, now)
+                anomaly_detector.observe(name, raw, now)
+            except OSError:
+                I2C_ERRORS.inc(channel=name)
+    if value is None:
+        raise OSError(f"All {samples} I2C reads failed on {name} channel")
+    return value
 
 def soil_moisture_percent(voltage):
-    dry = config["SOIL_DRY_VOLTAGE"]
-    wet = config["SOIL_WET_VOLTAGE"]
-    if voltage <= dry:
-        return 0
-    elif voltage >= wet:
-        return 100
-    return int((voltage - dry) / (wet - dry) * 100)
+    return calibration.percent(curves["soil"], voltage)
 
 def water_level_percent(voltage):
-    empty = config["WATER_EMPTY_VOLTAGE"]
-    full = config["WATER_FULL_VOLTAGE"]
-    if voltage <= empty:
-        return 0
-    elif voltage >= full:
-        return 100
-    return int((voltage - empty) / (full - empty) * 100)
+    return calibration.percent(curves["water"], voltage)
 
 def classify_light_level(lux):
     if lux < config["LIGHT_THRESHOLDS_dark"]:
@@ -112,9 +216,11 @@ def classify_light_level(lux):
     return f"🕶️ Moderate light ({lux:.0f} lx)"
 
 def calculate_lux_from_voltage(voltage):
-    return voltage * 1000  # Approximation: 1V ≈ 1000 lux
+    return curves["light"](voltage)
 
 # --- TFT Display Setup ---
+# PIL, st7735, the font and disp.begin() are brought up on a background thread (see
+# main), so the first reading and pump decision don't wait for the screen.
 DC = 25
 RST = 27
 CS = 0
@@ -124,139 +230,289 @@ HEIGHT = 128
 OFFSET_LEFT = 0
 OFFSET_TOP = 0
 
-disp = st7735.ST7735(
-    port=0,
-    cs=CS,
-    dc=DC,
-    rst=RST,
-    backlight=BLK,
-    rotation=270,
-    width=WIDTH,
-    height=HEIGHT,
-    offset_left=OFFSET_LEFT,
-    offset_top=OFFSET_TOP,
-)
-disp.begin()
-
-font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 14)
 line_height = 18
 
+def init_display():
+    import st7735  # Pimoroni's library (lowercase import)
+    from PIL import ImageFont
+    import tft_render
+    import tft_driver
+    disp = st7735.ST7735(
+        port=0,
+        cs=CS,
+        dc=DC,
+        rst=RST,
+        backlight=BLK,
+        rotation=270,
+        width=WIDTH,
+        height=HEIGHT,
+        offset_left=OFFSET_LEFT,
+        offset_top=OFFSET_TOP,
+    )
+    disp.begin()
+    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 14)
+    # Line bitmaps are cached and identical frames never reach the SPI bus
+    frame_renderer = tft_render.TextFrameRenderer(WIDTH, HEIGHT, font, line_height)
+    screen = tft_render.ChangeDetectingDisplay(tft_driver.PartialST7735(disp))  # only changed windows cross SPI
+    return frame_renderer, screen
+
+display = startup.Deferred("display", init_display)
+
 def display_messages(lines, color=(255, 255, 0)):
-    image = Image.new("RGB", (WIDTH, HEIGHT), "black")
-    draw = ImageDraw.Draw(image)
-    y = (HEIGHT - line_height * len(lines)) // 2
-    for line in lines:
-        bbox = draw.textbbox((0, 0), line, font=font)
-        w = bbox[2] - bbox[0]
-        x = (WIDTH - w) // 2
-        draw.text((x, y), line, font=font, fill=color)
-        y += line_height
-    disp.display(image)
+    ready = display.get()
+    if ready is None:
+        return  # still starting up; the next tick draws
+    frame_renderer, screen = ready
+    with STAGE_SECONDS.time(stage="display_render"):
+        image = frame_renderer.render(lines, color)
+    with STAGE_SECONDS.time(stage="spi_push"):
+        screen.display(image)
 
 # --- Initialize last_motion_time for PIR display control ---
 last_motion_time = 0
 
+# --- Warm Restart State (planter_state.bin) ---
+# Timers, filter windows, sampling intervals, trend fits and alert states are
+# checkpointed every CHECKPOINT_INTERVAL seconds and restored on start. A watering
+# burst is bracketed by an fsynced intent, so a crash mid-burst never waters twice.
+CHECKPOINT_INTERVAL = config.get("CHECKPOINT_INTERVAL", 30)
+state_store = StateStore()
+
+def persisted_objects():
+    """Everything with learned state. Each saves only that state via snapshot()/restore(), so
+    settings built from variables.conf always come from the current file after a restart."""
+    return {
+        **{f"filter_{name}": chain for name, chain in channel_filters.items()},
+        "sampling": sampling,
+        "watering_planner": watering_planner,
+        "dose_controller": dose_controller,
+        "water_account": water_account,
+        "anomaly_detector": anomaly_detector,
+        "alert_engine": alert_engine,
+    }
+
+def save_state(now, durable=False):
+    state_store.checkpoint({
+        "last_watering_time": last_watering_time,
+        "last_motion_time": last_motion_time,
+        "objects": {name: target.snapshot() for name, target in persisted_objects().items()},
+    }, now, durable)
+
+def restore_state(now):
+    global last_watering_time, last_motion_time
+    state, interrupted = state_store.load()
+    if state is not None:
+        last_watering_time = state["last_watering_time"]
+        last_motion_time = state["last_motion_time"]
+        saved = state["objects"]
+        for name, target in persisted_objects().items():
+            if name in saved:
+                target.restore(saved[name])
+        for sampler in sampling.samplers.values():
+            sampler.next_due = now  # every sensor is read on the first tick
+        print(f"♻️ Restored controller state from {now - state_store.latest['t']:.0f} s ago.")
+    if interrupted is not None:
+        # The relay was switched off at start-up; count the burst as a watering
+        last_watering_time = max(last_watering_time, interrupted["t"])
+        log_alert("⚠️ Restarted during a watering burst. Pump kept off until the absorption wait is over.")
+        save_state(now, durable=True)
+
 # --- Main Loop ---
-try:
-    while True:
-        messages = []
-
-        # Read sensors
-        soil_voltage = read_avg_voltage(channel_soil)
-        water_voltage = read_avg_voltage(channel_water)
-        light_voltage = read_avg_voltage(channel_light)
-        soil_percent = soil_moisture_percent(soil_voltage)
-        water_percent = water_level_percent(water_voltage)
-        lux = calculate_lux_from_voltage(light_voltage)
-
-        humidity, temperature_c = Adafruit_DHT.read_retry(DHT_SENSOR, DHT_PIN)
-
-        # Motion Detection and TFT Backlight Control
-        motion_detected = GPIO.input(PIR_PIN)
-        print(f"\n[Motion] {'Detected 👀' if motion_detected else 'No motion'}")
-
-        if motion_detected:
-            GPIO.output(BLK, GPIO.HIGH)  # Turn ON backlight (display ON)
-            last_motion_time = time.time()
-        else:
-            # Turn OFF backlight after 15 seconds of no motion
-            if time.time() - last_motion_time > 15:
-                GPIO.output(BLK, GPIO.LOW)  # Turn OFF backlight (display OFF)
-
-        # Display Sensor Readings in console
-        print("\n--- Sensor Readings ---")
-        print(f"Soil Moisture: {soil_voltage:.4f} V → {soil_percent}%")
-        print(f"Water Level:   {water_voltage:.4f} V → {water_percent}%")
-        print(f"Ambient Light: {light_voltage:.4f} V → {lux:.0f} lux")
-        print(f"Light Level:   {classify_light_level(lux)}")
-
-        if temperature_c is not None and humidity is not None:
-            print(f"Temperature:   {temperature_c} °C")
-            print(f"Humidity:      {humidity} %")
-        else:
-            print("❌ DHT11 Sensor Read Error")
-
-        # Alerts
-        if temperature_c is not None:
-            if temperature_c < config["TEMP_THRESHOLDS_low"]:
-                alert = "⚠️ Too cold! Temp below threshold."
-                messages.append(alert)
-                log_alert(alert)
-            elif temperature_c > config["TEMP_THRESHOLDS_high"]:
-                alert = "⚠️ Too hot! Temp above threshold."
-                messages.append(alert)
-                log_alert(alert)
-
-        if humidity is not None and humidity > config["HUMIDITY_THRESHOLD"]:
-            alert = "⚠️ Too much humidity! Above threshold."
-            messages.append(alert)
-            log_alert(alert)
-
-        light_class = classify_light_level(lux)
-        messages.append(f"Light Level: {light_class}")
-
-        # Watering Logic
-        current_time = time.time()
-        if soil_percent == 0:
-            if water_percent > 0:
-                if current_time - last_watering_time >= watering_wait_period:
-                    msg = "🌱 Soil dry and water available → Starting watering..."
-                    print(msg)
-                    log_alert(msg)
-                    GPIO.output(RELAY_PIN, GPIO.HIGH)
-                    time.sleep(watering_duration)
-                    GPIO.output(RELAY_PIN, GPIO.LOW)
-                    log_alert("💧 Pump OFF. Waiting absorption.")
-                    last_watering_time = current_time
+def main():
+    global last_watering_time, last_motion_time, telemetry_sender, reading_history
+
+    metrics.start_http_server(METRICS_PORT)
+    profiling.install_signal_handlers(loop_profiler, count=PROFILE_ITERATIONS)
+    dht_poller.start()
+    display.start()
+    telemetry_sender = telemetry.from_config(config)
+    reading_history = history.from_config(config)
+    idle_scheduler.watch_pins(GPIO, (PIR_PIN,))
+    restore_state(time.time())
+    last_checkpoint = time.time()
+
+    last_dht_timestamp = None
+    try:
+        while True:
+            loop_profiler.begin()
+            tick_start = time.perf_counter()
+            messages = []
+
+            # Read only the sensors whose adaptive interval has elapsed; others keep their last value
+            now = time.time()
+            due = sampling.due(now)
+            if "soil" in due:
+                soil_voltage = read_filtered(channel_soil, "soil")
+                soil_percent = soil_moisture_percent(soil_voltage)
+                sampling.record("soil", soil_percent, now)
+                watering_planner.observe(now, soil_percent)
+                dose_controller.observe_soil(now, soil_percent)
+                predicted = watering_planner.next_sample(now)
+                if predicted is not None and predicted < sampling["soil"].next_due:
+                    sampling["soil"].next_due = predicted  # sample again just before watering is due
+                report_reading("soil", soil_percent, now)
+            if "water" in due:
+                water_voltage = read_filtered(channel_water, "water")
+                water_percent = water_level_percent(water_voltage)
+                sampling.record("water", water_percent, now)
+                report_reading("water", water_percent, now)
+                water_account.observe_level(water_percent)
+                anomaly_detector.observe_level(water_percent, now)
+            if "light" in due:
+                light_voltage = read_filtered(channel_light, "light")
+                lux = calculate_lux_from_voltage(light_voltage)
+                sampling.record("light", lux, now)
+                report_reading("light", lux, now)
+            dht = dht_poller.latest(now)
+            humidity, temperature_c = dht.humidity, dht.temperature
+            anomaly_detector.observe_dht(dht, now)
+            if dht.quality == "ok" and dht.timestamp != last_dht_timestamp:
+                report_reading("humidity", humidity, dht.timestamp)
+                report_reading("temperature", temperature_c, dht.timestamp)
+                last_dht_timestamp = dht.timestamp
+            first_reading = startup.mark("first_reading")
+            if first_reading is not None:
+                report_reading("startup_first_reading_seconds", first_reading, now)
+
+            # Motion Detection and TFT Backlight Control
+            motion_detected = GPIO.input(PIR_PIN)
+            print(f"\n[Motion] {'Detected 👀' if motion_detected else 'No motion'}")
+
+            if motion_detected:
+                GPIO.output(BLK, GPIO.HIGH)  # Turn ON backlight (display ON)
+                last_motion_time = time.time()
+            else:
+                # Turn OFF backlight after 15 seconds of no motion
+                if time.time() - last_motion_time > 15:
+                    GPIO.output(BLK, GPIO.LOW)  # Turn OFF backlight (display OFF)
+
+            # Display Sensor Readings in console
+            print("\n--- Sensor Readings ---")
+            print(f"Soil Moisture: {soil_voltage:.4f} V → {soil_percent}%")
+            print(f"Water Level:   {water_voltage:.4f} V → {water_percent}%")
+            print(f"Ambient Light: {light_voltage:.4f} V → {lux:.0f} lux")
+            print(f"Light Level:   {classify_light_level(lux)}")
+
+            if dht.quality != "missing":
+                age = f" (stale, {now - dht.timestamp:.0f} s old)" if dht.quality == "stale" else ""
+                print(f"Temperature:   {temperature_c} °C{age}")
+                print(f"Humidity:      {humidity} %{age}")
+            else:
+                print("❌ DHT11 Sensor Read Error")
+
+            # Alerts: shown while active, logged when they fire
+            snapshot = {"temperature": temperature_c, "humidity": humidity, "soil": soil_percent,
+                        "water": water_percent, "lux": lux}
+            for alert in alert_engine.evaluate(snapshot, now):
+                messages.append(alert.message)
+                if alert.fired:
+                    log_alert(alert.message)
+
+            light_class = classify_light_level(lux)
+            messages.append(f"Light Level: {light_class}")
+
+            # Watering Logic
+            current_time = time.time()
+            if watering_planner.should_water(current_time, soil_percent):
+                if water_percent > 0:
+                    if current_time - last_watering_time >= watering_wait_period:
+                        msg = "🌱 Soil dry and water available → Starting watering..."
+                        print(msg)
+                        log_alert(msg)
+                        watering_duration = dose_controller.burst_for(soil_percent, water_account.max_burst(water_percent))
+                        soil_before, water_before = soil_percent, water_percent
+                        print(f"💧 Dose: {watering_duration:.1f} s (gain {dose_controller.gain:.1f} %/s)")
+                        anomaly_detector.expect_change(("soil", "water"), current_time + watering_duration + watering_wait_period)
+                        state_store.begin("watering", current_time, seconds=watering_duration)
+                        GPIO.output(RELAY_PIN, GPIO.HIGH)
+                        PUMP_ACTIVATIONS.inc()
+                        # Watch the tank at a high rate while the relay is on
+                        pump_end = current_time + watering_duration
+                        while time.time() < pump_end:
+                            time.sleep(min(PUMP_SAMPLE_INTERVAL, max(pump_end - time.time(), 0)))
+                            water_voltage = read_filtered(channel_water, "water", samples=3)
+                            water_percent = water_level_percent(water_voltage)
+                            sampling.record("water", water_percent, time.time())
+                            if water_percent == 0:
+                                log_alert("❌ Tank ran dry while watering. Pump stopped.")
+                                break
+                        GPIO.output(RELAY_PIN, GPIO.LOW)
+                        pumped_seconds = min(time.time(), pump_end) - current_time
+                        dose_controller.pumped(pumped_seconds, soil_before, time.time())
+                        water_account.pumped(pumped_seconds, water_before, water_percent, time.time())
+                        log_alert("💧 Pump OFF. Waiting absorption.")
+                        last_watering_time = current_time
+                        watering_planner.watered(time.time())
+                        sampling.burst(("soil", "water"), time.time(), PUMP_BURST_SECONDS)
+                        save_state(time.time(), durable=True)  # closes the watering intent
+                        last_checkpoint = time.time()
+                    else:
+                        wait_left = int((watering_wait_period - (current_time - last_watering_time)) / 60)
+                        messages.append(f"⏳ Waiting absorption ({wait_left} min left)...")
                 else:
-                    wait_left = int((watering_wait_period - (current_time - last_watering_time)) / 60)
-                    messages.append(f"⏳ Waiting absorption ({wait_left} min left)...")
+                    alert = "❌ No water available! Fill the tank."
+                    messages.append(alert)
+                    log_alert(alert)
+                    GPIO.output(RELAY_PIN, GPIO.LOW)
             else:
-                alert = "❌ No water available! Fill the tank."
-                messages.append(alert)
-                log_alert(alert)
+                print("✅ Soil moisture sufficient.")
                 GPIO.output(RELAY_PIN, GPIO.LOW)
-        else:
-            print("✅ Soil moisture sufficient.")
-            GPIO.output(RELAY_PIN, GPIO.LOW)
-
-        # Display System Messages in console and on TFT display
-        print("\n--- System Messages ---")
-        for msg in messages:
-            print(msg)
-            time.sleep(1)
-
-        # Display on TFT: limit lines to fit display nicely only if backlight is ON
-        if GPIO.input(BLK) == GPIO.HIGH:
-            display_lines = messages[-7:]  # last 7 messages to fit display
-            display_messages(display_lines)
-
-        time.sleep(3)
-
-except KeyboardInterrupt:
-    print("\nStopped by user.")
-
-finally:
-    GPIO.cleanup()
-    print("GPIO cleanup complete.")
-
+            if startup.mark("first_decision") is not None:
+                startup.notify("READY=1")  # systemd Type=notify: the control loop is live
+
+            days_left = water_account.days_to_refill(current_time)
+            if days_left is not None:
+                messages.append(f"💧 Tank {water_percent}% (~{days_left:.0f} days to refill)")
+
+            # Display System Messages in console and on TFT display
+            print("\n--- System Messages ---")
+            for msg in messages:
+                print(msg)
+
+            # Display on TFT: limit lines to fit display nicely only if backlight is ON
+            if GPIO.input(BLK) == GPIO.HIGH:
+                display_lines = messages[-7:]  # last 7 messages to fit display
+                display_messages(display_lines)
+
+            if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                with STAGE_SECONDS.time(stage="checkpoint"):
+                    save_state(time.time())
+                last_checkpoint = time.time()
+
+            # Sleep until the next deadline (or motion)
+            now = time.time()
+            backlight_on = GPIO.input(BLK) == GPIO.HIGH
+            absorbed_at = last_watering_time + watering_wait_period
+            timer_wheel.schedule("sample", sampling.next_deadline(), now)
+            timer_wheel.schedule("display", now + TICK_INTERVAL if backlight_on else None, now)
+            timer_wheel.schedule("absorbed", absorbed_at if absorbed_at > now else None, now)
+            watering_due = watering_planner.next_watering(now)
+            timer_wheel.schedule("watering", watering_due if watering_due and watering_due > now else None, now)
+            idle_scheduler.sleep(now)
+            report = wakeup_meter.wakeup(time.time())
+            if report is not None:
+                wakeups, switches, cpu = report
+                print(f"💤 Last hour: {wakeups:.0f} wakeups, {switches:.0f} context switches, CPU {cpu:.2f}%")
+                report_reading("wakeups_per_hour", wakeups, time.time())
+                report_reading("cpu_percent", cpu, time.time())
+            TICK_SECONDS.observe(time.perf_counter() - tick_start)
+            loop_profiler.end()
+
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+
+    finally:
+        dht_poller.stop()
+        if telemetry_sender is not None:
+            telemetry_sender.stop()
+        if reading_history is not None:
+            reading_history.close()
+        if state_store.intent is None:  # an interrupted burst stays open for the restart to see
+            save_state(time.time(), durable=True)
+        state_store.close()
+        GPIO.cleanup()
+        print("GPIO cleanup complete.")
+
+
+if __name__ == "__main__":
+    main()
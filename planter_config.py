@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+
+VARIABLES_FILE = "variables.conf"
+
+# --- Load Variables from variables.conf ---
+def load_variables(filepath=VARIABLES_FILE):
+    variables = {}
+    with open(filepath) as file:
+        for line in file:
+            if '=' in line:
+                key, value = line.strip().split('=', 1)
+                try:
+                    variables[key] = float(value)
+                except ValueError:
+                    variables[key] = value
+    return variables
+
+# --- Update Variables in variables.conf ---
+def update_variables(updates, filepath=VARIABLES_FILE):
+    """Set the given keys, keeping every other line as it is, and swap the new file in
+    atomically (temp file + fsync + rename) so a reader never sees a half-written config."""
+    try:
+        with open(filepath) as file:
+            lines = file.read().splitlines()
+    except FileNotFoundError:
+        lines = []
+    pending = dict(updates)
+    out = []
+    for line in lines:
+        key = line.split('=', 1)[0].strip() if '=' in line else None
+        out.append(f"{key}={_format_value(pending.pop(key))}" if key in pending else line)
+    out.extend(f"{key}={_format_value(value)}" for key, value in pending.items())
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".variables.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write("\n".join(out) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, tmp_path)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _format_value(value):
+    return f"{value:.6g}" if isinstance(value, float) else str(value)
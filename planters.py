@@ -0,0 +1,336 @@
+"""Several planters driven from one process and one I2C bus.
+
+Each [section] of planters.conf is one planter: its ADS1115 address and channels,
+relay and DHT pins, plus any variables.conf keys it overrides (thresholds,
+calibration, filters). Run the controller with:
+
+    python3 planters.py [planters.conf]
+"""
+import configparser
+import os
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+from datetime import datetime
+
+import board
+import busio
+import RPi.GPIO as GPIO
+import Adafruit_DHT
+from adafruit_ads1x15.ads1115 import ADS1115
+from adafruit_ads1x15.analog_in import AnalogIn
+
+import calibration
+import filters
+import metrics
+from adaptive_sampling import AdaptiveSampler, SamplingScheduler
+from alert_rules import AlertEngine
+from dht_poller import DHTPoller
+from metrics import ALERTS, I2C_ERRORS, PUMP_ACTIVATIONS, Counter, Gauge, Histogram
+from planter_config import load_variables
+
+PLANTERS_FILE = "planters.conf"
+LOG_FILE = "alerts.log"
+
+# Hardware keys of a planter section; every other key overrides variables.conf.
+# relay_pin and dht_pin are required in every section (an empty dht_pin means no DHT);
+# HARDWARE_DEFAULTS only describe the single planter used when there is no planters.conf.
+HARDWARE_KEYS = ("ads_address", "soil_channel", "water_channel", "light_channel", "relay_pin", "dht_pin")
+REQUIRED_KEYS = ("relay_pin", "dht_pin")
+HARDWARE_DEFAULTS = {"ads_address": "0x48", "soil_channel": "1", "water_channel": "2",
+                     "light_channel": "0", "relay_pin": "14", "dht_pin": "4"}
+CONTROLLER_DEFAULTS = {"tick_interval": 1.0, "bus_budget": 0.25, "max_pumps": 1, "metrics_port": 9108}
+
+BUS_READS = Counter("planter_bus_reads_total", "Channel reads served by the I2C bus scheduler, by planter.")
+BUS_DEFERRED = Counter("planter_bus_deferred_total", "Due channel reads pushed to the next tick by the bus budget.")
+BUS_TICK_SECONDS = Histogram("planter_bus_tick_seconds", "Time the bus scheduler spent on I2C reads per tick.")
+PUMPS_RUNNING = Gauge("planter_pumps_running", "Pump relays currently switched on.")
+
+
+# --- Alert Log ---
+_log_lock = threading.Lock()
+
+def log_alert(message):
+    ALERTS.inc()
+    with _log_lock:
+        timestamp = datetime.now().strftime("%d-%m %H:%M")
+        with open(LOG_FILE, "a") as log_file:
+            log_file.write(f"[{timestamp}] {message}\n")
+
+        # Compress if log grows too big
+        if os.path.getsize(LOG_FILE) > 50_000:  # ~50 KB
+            archive_name = f"alerts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            with zipfile.ZipFile(archive_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                zipf.write(LOG_FILE)
+            open(LOG_FILE, "w").close()  # Clear log
+
+
+# --- Planter Instance ---
+
+class Planter:
+    """One pot: its sensors, relay, calibration, filters and watering state."""
+
+    def __init__(self, name, config, ads, channels, relay_pin, dht_poller=None, overrides=None):
+        self.name = name
+        self.ads = ads
+        self.config = config
+        self.curves = calibration.load_curves(config)
+        self.channels = channels  # {"soil": AnalogIn, ...}
+        self.relay_pin = relay_pin
+        self.dht_poller = dht_poller
+        # the planter's own overrides are layered over variables.conf on every recompile
+        self.alert_rules = AlertEngine(overrides=overrides, labels={"planter": name})
+        self.samples_per_read = int(config.get("SAMPLES_PER_READ", 2))
+        self.filters = {
+            "soil": filters.build_chain(config.get("FILTER_SOIL", "hampel:7:3,kalman:1e-9:2.5e-7"), f"{name}/soil"),
+            "water": filters.build_chain(config.get("FILTER_WATER", "hampel:5:3,ema:0.5"), f"{name}/water"),
+            "light": filters.build_chain(config.get("FILTER_LIGHT", "median:5"), f"{name}/light"),
+        }
+        max_interval = config.get("SAMPLE_MAX_INTERVAL", 300)
+        self.sampling = SamplingScheduler([
+            AdaptiveSampler(f"{name}/soil", 3, max_interval, change=2),
+            AdaptiveSampler(f"{name}/water", 1, max_interval, change=2),  # 1 s while the pump runs
+            AdaptiveSampler(f"{name}/light", 3, max_interval, change=50),
+        ])
+        self.readings = {}
+        self.watering_wait_period = config.get("WATERING_WAIT_PERIOD", 300)
+        self.watering_duration = config.get("WATERING_DURATION", 5)
+        self.last_watering_time = 0
+        self.pump_end = None
+        GPIO.setup(relay_pin, GPIO.OUT)
+        GPIO.output(relay_pin, GPIO.LOW)
+
+    @property
+    def pumping(self):
+        return self.pump_end is not None
+
+    def due_reads(self, now):
+        """Channels whose adaptive interval has elapsed, most urgent first."""
+        due = [c for c in self.channels if self.sampling[f"{self.name}/{c}"].due(now)]
+        return sorted(due, key=lambda c: self.sampling[f"{self.name}/{c}"].next_due)
+
+    def read(self, channel_name, now):
+        chain = self.filters[channel_name]
+        voltage = None
+        for _ in range(self.samples_per_read):
+            try:
+                voltage = chain.update(self.channels[channel_name].voltage, now)
+            except OSError:
+                I2C_ERRORS.inc(channel=f"{self.name}/{channel_name}")
+        if voltage is None:
+            return  # stays due; retried on the next tick
+        if channel_name == "soil":
+            value = calibration.percent(self.curves["soil"], voltage)
+        elif channel_name == "water":
+            value = calibration.percent(self.curves["water"], voltage)
+        else:
+            value = self.curves["light"](voltage)
+        self.readings[channel_name] = value
+        self.sampling.record(f"{self.name}/{channel_name}", value, now)
+
+    def check(self, now, pump_slot_free):
+        """Alerts and the watering state machine; never blocks. Returns messages for the console."""
+        alerts = []
+        snapshot = {"soil": self.readings.get("soil"), "water": self.readings.get("water"),
+                    "lux": self.readings.get("light")}
+        if self.dht_poller is not None:
+            dht = self.dht_poller.latest(now)
+            snapshot["temperature"], snapshot["humidity"] = dht.temperature, dht.humidity
+        active = self.alert_rules.evaluate(snapshot, now)
+        alerts.extend(alert.message for alert in active if alert.fired)
+
+        messages = [alert.message for alert in active]
+        soil = snapshot["soil"]
+        water = snapshot["water"]
+        if self.pumping:
+            if water == 0:
+                self.stop_pump("❌ Tank ran dry while watering. Pump stopped.")
+            elif now >= self.pump_end:
+                self.stop_pump("💧 Pump OFF. Waiting absorption.")
+        elif soil == 0 and water is not None:
+            if water == 0:
+                alerts.append("❌ No water available! Fill the tank.")
+                messages.append(alerts[-1])
+            elif now - self.last_watering_time < self.watering_wait_period:
+                wait_left = int((self.watering_wait_period - (now - self.last_watering_time)) / 60)
+                messages.append(f"⏳ Waiting absorption ({wait_left} min left)...")
+            elif pump_slot_free:
+                self.start_pump(now)
+        for alert in alerts:
+            log_alert(f"[{self.name}] {alert}")
+        return messages
+
+    def start_pump(self, now):
+        log_alert(f"[{self.name}] 🌱 Soil dry and water available → Starting watering...")
+        GPIO.output(self.relay_pin, GPIO.HIGH)
+        PUMP_ACTIVATIONS.inc(planter=self.name)
+        self.pump_end = now + self.watering_duration
+        self.last_watering_time = now
+        self.sampling.burst((f"{self.name}/water",), now, self.watering_duration)
+
+    def stop_pump(self, message=None):
+        GPIO.output(self.relay_pin, GPIO.LOW)
+        if self.pump_end is not None:
+            self.pump_end = None
+            self.sampling.burst((f"{self.name}/soil", f"{self.name}/water"), time.time(), 60)
+        if message:
+            log_alert(f"[{self.name}] {message}")
+
+
+# --- Fair I2C Bus Scheduling ---
+
+class BusScheduler:
+    """Shares the I2C bus between planters: due reads are served round-robin, one per
+    planter per turn, until the per-tick time budget is spent. Reads left over stay due
+    and the next tick resumes with the planter after the last one served, so no planter
+    starves and a tick's bus time stays bounded however many planters are attached."""
+
+    def __init__(self, budget=0.25):
+        self.budget = budget
+        self._next = 0
+
+    def run(self, planters, now):
+        queues = [deque(planter.due_reads(now)) for planter in planters]
+        count = len(planters)
+        served = 0
+        start = time.perf_counter()
+        i = self._next
+        while any(queues):
+            if served and time.perf_counter() - start >= self.budget:
+                BUS_DEFERRED.inc(sum(len(q) for q in queues))
+                break
+            queue = queues[i % count]
+            if queue:
+                planter = planters[i % count]
+                planter.read(queue.popleft(), now)
+                BUS_READS.inc(planter=planter.name)
+                served += 1
+                self._next = (i + 1) % count
+            i += 1
+        BUS_TICK_SECONDS.observe(time.perf_counter() - start)
+        return served
+
+
+# --- Loading planters.conf ---
+
+def _parse_value(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def check_wiring(parser, filepath=PLANTERS_FILE):
+    """ValueError unless every planter section names its own relay and DHT pins and ADC channels.
+
+    Two planters on one relay pin would run each other's pump; nothing is ever inherited
+    from another section or a default."""
+    owners = {}  # ("GPIO", pin) or (ads address, channel) -> section
+    for name in parser.sections():
+        if name == "controller":
+            continue
+        section = parser[name]
+        missing = [key for key in REQUIRED_KEYS if key not in section]
+        if missing or not section["relay_pin"].strip():
+            raise ValueError(f"{filepath} [{name}]: {' and '.join(missing or ['relay_pin'])} must be set")
+        wiring = [("GPIO", int(section[key])) for key in REQUIRED_KEYS if section[key].strip()]
+        address = int(section.get("ads_address", HARDWARE_DEFAULTS["ads_address"]), 0)
+        wiring += [(f"ADS1115 0x{address:02x} channel", int(section[f"{channel}_channel"]))
+                   for channel in ("soil", "water", "light") if section.get(f"{channel}_channel", "").strip()]
+        for resource in wiring:
+            if resource in owners:
+                raise ValueError(f"{filepath}: {resource[0]} {resource[1]} is used by both "
+                                 f"[{owners[resource]}] and [{name}]")
+            owners[resource] = name
+
+
+def load_planters(filepath=PLANTERS_FILE, variables=None):
+    """Returns (controller settings, [Planter]). Without planters.conf: one planter on the default pins."""
+    variables = load_variables() if variables is None else variables
+    parser = configparser.ConfigParser(inline_comment_prefixes=("#", ";"))
+    parser.optionxform = str  # keep variables.conf key case
+    if not parser.read(filepath):
+        parser.read_dict({"planter": HARDWARE_DEFAULTS})
+    check_wiring(parser, filepath)
+
+    settings = dict(CONTROLLER_DEFAULTS)
+    if parser.has_section("controller"):
+        for key in CONTROLLER_DEFAULTS:
+            if key in parser["controller"]:
+                settings[key] = float(parser["controller"][key])
+
+    i2c = busio.I2C(board.SCL, board.SDA)
+    adcs = {}  # one ADS1115 object per address, shared by the planters wired to it
+    dht_lock = threading.Lock()
+    planters = []
+    for name in parser.sections():
+        if name == "controller":
+            continue
+        section = parser[name]
+        address = int(section.get("ads_address", HARDWARE_DEFAULTS["ads_address"]), 0)
+        if address not in adcs:
+            adcs[address] = ADS1115(i2c, address=address)
+        ads = adcs[address]
+        channels = {}
+        for channel_name in ("soil", "water", "light"):
+            pin = section.get(f"{channel_name}_channel", "").strip()
+            if pin:
+                channels[channel_name] = AnalogIn(ads, int(pin))
+        overrides = {key: _parse_value(value) for key, value in section.items() if key not in HARDWARE_KEYS}
+        config = dict(variables)
+        config.update(overrides)
+        dht_pin = section.get("dht_pin", "").strip()
+        dht_poller = None
+        if dht_pin:
+            dht_poller = DHTPoller(Adafruit_DHT.DHT11, int(dht_pin), lock=dht_lock,
+                                   stale_after=config.get("DHT_STALE_AFTER", 30),
+                                   expire_after=config.get("DHT_EXPIRE_AFTER", 600))
+        planters.append(Planter(name, config, ads, channels, int(section["relay_pin"]), dht_poller, overrides))
+    return settings, planters
+
+
+# --- Controller ---
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setwarnings(False)
+    settings, planters = load_planters(argv[0] if argv else PLANTERS_FILE)
+    bus = BusScheduler(settings["bus_budget"])
+    metrics.start_http_server(int(settings["metrics_port"]))
+    for planter in planters:
+        if planter.dht_poller is not None:
+            planter.dht_poller.start()
+    print(f"Driving {len(planters)} planter(s): {', '.join(p.name for p in planters)}")
+
+    try:
+        while True:
+            tick_start = time.time()
+            bus.run(planters, tick_start)
+            now = time.time()
+            pumps = sum(planter.pumping for planter in planters)
+            for planter in planters:
+                free = pumps < settings["max_pumps"]
+                was_pumping = planter.pumping
+                for message in planter.check(now, free):
+                    print(f"[{planter.name}] {message}")
+                pumps += planter.pumping - was_pumping
+            PUMPS_RUNNING.set(pumps)
+            time.sleep(max(settings["tick_interval"] - (time.time() - tick_start), 0))
+
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+
+    finally:
+        for planter in planters:
+            planter.stop_pump()
+            if planter.dht_poller is not None:
+                planter.dht_poller.stop()
+        GPIO.cleanup()
+        print("GPIO cleanup complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+# --- Output Location ---
+PROFILE_DIR = os.environ.get("PLANTER_PROFILE_DIR", "profiles")
+# /profile is only armed from the Pi itself unless this is set (the web apps listen on the LAN)
+ALLOW_REMOTE = os.environ.get("PLANTER_PROFILE_REMOTE", "") not in ("", "0")
+LOOPBACK = ("127.0.0.1", "::1")
+MODES = ("cprofile", "sample")
+
+
+class Profiler:
+    """Captures the next N begin()/end() sections when requested, and costs one attribute check otherwise.
+
+    "cprofile" writes a .pstats file (snakeviz, gprof2dot, flameprof); "sample" writes
+    collapsed stacks in .folded format for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, name, out_dir=PROFILE_DIR, sample_interval=0.005):
+        self.name = name
+        self.out_dir = out_dir
+        self.sample_interval = sample_interval
+        self.last_output = None
+        self._pending = None    # (count, mode) set by request(); safe to assign from a signal handler
+        self._remaining = 0
+        self._active = 0
+        self._mode = None
+        self._stats = None
+        self._sampler = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def request(self, count, mode="cprofile"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        if count < 1:
+            raise ValueError("Profile count must be at least 1")
+        self._pending = (int(count), mode)
+
+    def busy(self):
+        return bool(self._pending or self._remaining or self._active)
+
+    def begin(self):
+        if not (self._remaining or self._pending):
+            return
+        with self._lock:
+            if self._pending and not self._remaining and not self._active:
+                self._start_capture(*self._pending)
+                self._pending = None
+            if self._remaining <= 0:
+                return
+            self._remaining -= 1
+            self._active += 1
+        self._local.active = True
+        if self._mode == "cprofile":
+            profile = cProfile.Profile()
+            self._local.profile = profile
+            profile.enable()
+        else:
+            self._sampler.watch(threading.get_ident())
+
+    def end(self):
+        if not self._active or not getattr(self._local, "active", False):
+            return
+        self._local.active = False
+        if self._mode == "cprofile":
+            profile = self._local.profile
+            profile.disable()
+            self._local.profile = None
+        else:
+            self._sampler.unwatch(threading.get_ident())
+        with self._lock:
+            if self._mode == "cprofile":
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            self._active -= 1
+            if not self._remaining and not self._active:
+                self._finish_capture()
+
+    def _start_capture(self, count, mode):
+        self._mode = mode
+        self._remaining = count
+        self._stats = None
+        if mode == "sample":
+            self._sampler = _StackSampler(self.sample_interval)
+            self._sampler.start()
+
+    def _finish_capture(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if self._mode == "cprofile":
+            path = os.path.join(self.out_dir, f"{self.name}_{stamp}.pstats")
+            if self._stats is not None:
+                self._stats.dump_stats(path)
+            self._stats = None
+        else:
+            path = os.path.join(self.out_dir, f"{self.name}_{stamp}.folded")
+            stacks = self._sampler.stop()
+            with open(path, "w") as out:
+                for stack, hits in stacks.most_common():
+                    out.write(f"{stack} {hits}\n")
+            self._sampler = None
+        self.last_output = path
+        print(f"📈 Profile written to {path}")
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stacks of watched threads at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self._watched = set()
+        self._stop_event = threading.Event()
+
+    def watch(self, thread_id):
+        self._watched.add(thread_id)
+
+    def unwatch(self, thread_id):
+        self._watched.discard(thread_id)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            watched = tuple(self._watched)
+            if not watched:
+                continue
+            frames = sys._current_frames()
+            for thread_id in watched:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# --- Runtime Triggers ---
+
+def install_signal_handlers(profiler, count=10):
+    """SIGUSR1 profiles the next `count` sections with cProfile, SIGUSR2 with the stack sampler."""
+    signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.request(count, "cprofile"))
+    signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.request(count, "sample"))
+
+
+def register_flask_hooks(app, profiler, endpoints, allow_remote=None):
+    """Wrap the given Flask endpoints in profiler sections and add a POST /profile route to arm them.
+
+    /profile answers 403 to anything but loopback unless `allow_remote` (default: the
+    PLANTER_PROFILE_REMOTE environment variable) is set."""
+    from flask import request
+
+    allow_remote = ALLOW_REMOTE if allow_remote is None else allow_remote
+
+    endpoints = set(endpoints)
+
+    @app.before_request
+    def _profile_begin():
+        if request.endpoint in endpoints:
+            profiler.begin()
+
+    @app.teardown_request
+    def _profile_end(exc):
+        profiler.end()
+
+    @app.route("/profile", methods=["POST"])
+    def profile_requests():
+        if not allow_remote and request.remote_addr not in LOOPBACK:
+            return "Profiling can only be started from the planter itself (curl -X POST localhost).\n", 403
+        try:
+            count = int(request.values.get("n", 10))
+            mode = request.values.get("mode", "cprofile")
+            if profiler.busy():
+                return f"Profiler busy; last output: {profiler.last_output}\n", 409
+            profiler.request(count, mode)
+        except ValueError as e:
+            return f"{e}\n", 400
+        targets = ", ".join(sorted(endpoints))
+        return f"Profiling next {count} requests to {targets} ({mode}); output in {profiler.out_dir}/\n"
+
+    return app
@@ -0,0 +1,484 @@
+"""Sensor daemon: the one process that talks to the ADS1115 (and the DHT11).
+
+Clients connect over a Unix domain socket and get cached readings, so any number
+of scripts can watch the sensors next to main_program without adding conversions
+or switching the ADC's channel mid-read. A channel is only converted while some
+client wants it (a read in the last `idle_after` seconds or a live subscription).
+
+Wire protocol (little-endian), one request per frame:
+
+    request   <2sBBH   magic b"PS", op, channel mask, arg
+    response  <2sBBH   magic b"PS", op, status, record count
+    record    <BBdfI   channel, quality, timestamp, value, sequence
+
+    READ      arg = max age in ms; replies once with one record per channel
+    SUBSCRIBE replies with a frame every time a subscribed channel gets a new sample
+    RELAY     arg = 0/1; only when the daemon was started with --relay-pin
+
+    python3 sensord.py [--socket PATH] [--interval 0.5] [--relay-pin 14]
+"""
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from dht_poller import DHTReading
+from metrics import Counter, Gauge
+
+SOCKET_PATH = os.environ.get("SENSORD_SOCKET", "/tmp/planter-sensord.sock")
+MAGIC = b"PS"
+REQUEST = struct.Struct("<2sBBH")
+RESPONSE = struct.Struct("<2sBBH")
+RECORD = struct.Struct("<BBdfI")
+
+OP_READ, OP_SUBSCRIBE, OP_RELAY = 1, 2, 3
+STATUS_OK, STATUS_BAD_REQUEST, STATUS_UNSUPPORTED = 0, 1, 2
+
+# Channel ids: the four ADS1115 inputs, then the DHT11 values
+CHANNELS = ("light", "soil", "water", "a3", "humidity", "temperature")
+ADC_CHANNELS = CHANNELS[:4]
+QUALITIES = ("ok", "stale", "missing")
+
+Reading = namedtuple("Reading", "value timestamp quality seq")
+
+SENSORD_CONVERSIONS = Counter("planter_sensord_conversions_total", "ADS1115 conversions done by the sensor daemon, by channel.")
+SENSORD_REQUESTS = Counter("planter_sensord_requests_total", "Client requests served by the sensor daemon, by op.")
+SENSORD_CLIENTS = Gauge("planter_sensord_clients", "Connected sensor daemon clients.")
+
+
+def channel_mask(names):
+    mask = 0
+    for name in names:
+        mask |= 1 << CHANNELS.index(name)
+    return mask
+
+
+def mask_channels(mask):
+    return [i for i in range(len(CHANNELS)) if mask & (1 << i)]
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("sensor daemon connection closed")
+        data += chunk
+    return data
+
+
+# --- Daemon ---
+
+class SensorCache:
+    """Latest sample per channel plus the demand that decides which channels get converted."""
+
+    def __init__(self, channels, dht_poller=None, interval=0.5, idle_after=10.0):
+        self.channels = channels  # {channel id: AnalogIn}
+        self.dht_poller = dht_poller
+        self.interval = interval
+        self.idle_after = idle_after
+        self.readings = {}  # channel id -> Reading
+        self._wanted_until = {}
+        self._subscribers = {}  # channel id -> subscription count
+        self._updated = threading.Condition()
+        self._seq = 0
+
+    def want(self, ids, duration=None):
+        until = time.monotonic() + (self.idle_after if duration is None else duration)
+        with self._updated:
+            for cid in ids:
+                self._wanted_until[cid] = max(self._wanted_until.get(cid, 0), until)
+            self._updated.notify_all()
+
+    def subscribe(self, ids, delta):
+        with self._updated:
+            for cid in ids:
+                self._subscribers[cid] = self._subscribers.get(cid, 0) + delta
+            self._updated.notify_all()
+
+    def snapshot(self, ids):
+        now = time.time()
+        out = []
+        for cid in ids:
+            if CHANNELS[cid] in ("humidity", "temperature"):
+                out.append((cid, self._dht_reading(cid, now)))
+            else:
+                out.append((cid, self.readings.get(cid, Reading(float("nan"), 0.0, "missing", 0))))
+        return out
+
+    def _dht_reading(self, cid, now):
+        dht = self.dht_poller.latest(now) if self.dht_poller else DHTReading(None, None, None, "missing")
+        value = dht.humidity if CHANNELS[cid] == "humidity" else dht.temperature
+        return Reading(float("nan") if value is None else value, dht.timestamp or 0.0, dht.quality,
+                       int(dht.timestamp or 0))
+
+    def wait_fresh(self, ids, max_age, timeout):
+        """Block until every ADC channel in ids has a sample newer than max_age seconds."""
+        deadline = time.monotonic() + timeout
+        with self._updated:
+            while True:
+                now = time.time()
+                if all(now - self.readings.get(cid, Reading(0, 0.0, "", 0)).timestamp <= max_age
+                       for cid in ids if cid in self.channels):
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._updated.wait(remaining)
+
+    def wait_update(self, ids, seen, timeout):
+        """Block until a subscribed channel has a sequence number newer than `seen`."""
+        with self._updated:
+            self._updated.wait_for(lambda: any(self.readings.get(cid, Reading(0, 0, "", 0)).seq > seen.get(cid, 0)
+                                               for cid in ids), timeout)
+
+    def active(self):
+        now = time.monotonic()
+        return [cid for cid in self.channels
+                if self._subscribers.get(cid, 0) > 0 or self._wanted_until.get(cid, 0) > now]
+
+    def run(self, stop):
+        """Sampler loop: converts wanted channels every `interval`, idles otherwise."""
+        while not stop.is_set():
+            started = time.monotonic()
+            active = self.active()
+            for cid in active:
+                try:
+                    value = self.channels[cid].voltage
+                except OSError:
+                    continue
+                SENSORD_CONVERSIONS.inc(channel=CHANNELS[cid])
+                with self._updated:
+                    self._seq += 1
+                    self.readings[cid] = Reading(value, time.time(), "ok", self._seq)
+                    self._updated.notify_all()
+            if active:
+                stop.wait(max(self.interval - (time.monotonic() - started), 0))
+            else:
+                with self._updated:
+                    self._updated.wait(self.interval)  # woken as soon as a client wants something
+
+
+class SensorRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        cache = self.server.cache
+        SENSORD_CLIENTS.inc()
+        try:
+            while True:
+                magic, op, mask, arg = REQUEST.unpack(_recv_exact(self.request, REQUEST.size))
+                SENSORD_REQUESTS.inc(op=op)
+                ids = mask_channels(mask)
+                if magic != MAGIC:
+                    return
+                if op == OP_READ:
+                    adc_ids = [cid for cid in ids if cid in cache.channels]
+                    cache.want(adc_ids)
+                    cache.wait_fresh(adc_ids, max(arg / 1000, cache.interval), timeout=2.0)
+                    self.send(op, STATUS_OK, cache.snapshot(ids))
+                elif op == OP_SUBSCRIBE:
+                    self.stream(cache, ids)
+                    return
+                elif op == OP_RELAY:
+                    if self.server.relay is None:
+                        self.send(op, STATUS_UNSUPPORTED, [])
+                    else:
+                        self.server.relay(bool(arg))
+                        self.send(op, STATUS_OK, [])
+                else:
+                    self.send(op, STATUS_BAD_REQUEST, [])
+        except ConnectionError:
+            pass
+        finally:
+            SENSORD_CLIENTS.inc(-1)
+
+    def stream(self, cache, ids):
+        cache.subscribe(ids, +1)
+        seen = {}
+        try:
+            while True:
+                cache.wait_update(ids, seen, timeout=5.0)
+                records = cache.snapshot(ids)
+                self.send(OP_SUBSCRIBE, STATUS_OK, records)
+                seen = {cid: reading.seq for cid, reading in records}
+        except OSError:
+            pass
+        finally:
+            cache.subscribe(ids, -1)
+
+    def send(self, op, status, records):
+        frame = [RESPONSE.pack(MAGIC, op, status, len(records))]
+        for cid, reading in records:
+            frame.append(RECORD.pack(cid, QUALITIES.index(reading.quality) if reading.quality in QUALITIES else 2,
+                                     reading.timestamp, reading.value, reading.seq))
+        self.request.sendall(b"".join(frame))
+
+
+class SensorServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, path, cache, relay=None):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, SensorRequestHandler)
+        os.chmod(path, 0o660)
+        self.cache = cache
+        self.relay = relay
+
+
+# --- Client ---
+
+class SensorClient:
+    """Connection to sensord. Thread-safe; read() costs no bus time when the cache is fresh."""
+
+    def __init__(self, path=SOCKET_PATH, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.sock = self._connect()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _request(self, op, mask, arg):
+        if self.sock is None:
+            self._reconnect()
+        try:
+            self.sock.sendall(REQUEST.pack(MAGIC, op, mask, arg))
+            return self._read_frame()
+        except ConnectionError:
+            self._reconnect()  # sensord restarted: one fresh connection, then the caller hears it is gone
+            self.sock.sendall(REQUEST.pack(MAGIC, op, mask, arg))
+            return self._read_frame()
+
+    def _reconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        try:
+            self.sock = self._connect()
+        except OSError as e:
+            raise ConnectionError(f"sensor daemon is gone: {e}")
+
+    def _read_frame(self):
+        magic, op, status, count = RESPONSE.unpack(_recv_exact(self.sock, RESPONSE.size))
+        if magic != MAGIC:
+            raise ConnectionError("not a sensor daemon")
+        body = _recv_exact(self.sock, RECORD.size * count)
+        readings = {}
+        for cid, quality, timestamp, value, seq in RECORD.iter_unpack(body):
+            readings[CHANNELS[cid]] = Reading(value, timestamp, QUALITIES[quality], seq)
+        return status, readings
+
+    def read(self, *names, max_age=1.0):
+        with self._lock:
+            status, readings = self._request(OP_READ, channel_mask(names), int(max_age * 1000))
+        return readings
+
+    def subscribe(self, *names):
+        """Yields {name: Reading} whenever one of the channels has a new sample (own connection)."""
+        client = SensorClient(self.path, timeout=None)
+        try:
+            client.sock.sendall(REQUEST.pack(MAGIC, OP_SUBSCRIBE, channel_mask(names), 0))
+            while True:
+                yield client._read_frame()[1]
+        finally:
+            client.close()
+
+    def relay(self, on):
+        with self._lock:
+            status, _ = self._request(OP_RELAY, 0, int(bool(on)))
+        if status == STATUS_UNSUPPORTED:
+            raise RuntimeError("sensord was started without --relay-pin")
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+
+class RemoteChannel:
+    """Stands in for adafruit_ads1x15's AnalogIn: .voltage comes from the daemon's cache.
+
+    With `fallback`, a daemon that is gone for good (not just restarted) is replaced by a
+    channel on this process's own bus, as open_channels() does at startup."""
+
+    def __init__(self, client, name, max_age=1.0, fallback=False):
+        self.client = client
+        self.name = name
+        self.max_age = max_age
+        self.fallback = fallback
+        self.local = None
+
+    @property
+    def voltage(self):
+        if self.local is not None:
+            return self.local.voltage
+        try:
+            value = self.client.read(self.name, max_age=self.max_age)[self.name].value
+        except ConnectionError as e:
+            if not self.fallback:
+                raise
+            _warn_fallback(e)
+            self.local = local_channels(self.name)[self.name]
+            return self.local.voltage
+        if value != value:  # NaN: the daemon has no sample yet
+            raise OSError(f"sensord has no reading for {self.name}")
+        return value
+
+
+class RemoteDHT:
+    """Stands in for DHTPoller: latest() returns the daemon's DHT reading.
+
+    `fallback` builds a DHTPoller for this process to start and use instead once the
+    daemon is gone for good."""
+
+    def __init__(self, client, fallback=None):
+        self.client = client
+        self.fallback = fallback
+        self.local = None
+
+    def latest(self, now=None):
+        if self.local is not None:
+            return self.local.latest(now)
+        try:
+            readings = self.client.read("humidity", "temperature")
+        except ConnectionError as e:
+            if self.fallback is None:
+                raise
+            _warn_fallback(e)
+            self.local = self.fallback()
+            self.local.start()
+            return self.local.latest(now)
+        humidity, temperature = readings["humidity"], readings["temperature"]
+        if humidity.quality == "missing":
+            return DHTReading(None, None, humidity.timestamp or None, "missing")
+        return DHTReading(humidity.value, temperature.value, humidity.timestamp, humidity.quality)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        if self.local is not None:
+            self.local.stop()
+
+
+def connect(path=SOCKET_PATH):
+    """A client when the daemon is running, else None (callers fall back to the bus)."""
+    try:
+        return SensorClient(path)
+    except OSError:
+        return None
+
+
+def open_channels(*names, path=SOCKET_PATH, fallback=True):
+    """{name: channel with .voltage}: through the daemon when it runs, else on a private bus.
+
+    With `fallback` the channels also move to the private bus if the daemon goes away later."""
+    client = connect(path)
+    if client is not None:
+        return {name: RemoteChannel(client, name, fallback=fallback) for name in names}
+    print(f"⚠️  sensord is not running ({path}); reading the ADS1115 directly, "
+          "which disturbs any other program using it.")
+    return local_channels(*names)
+
+
+def open_dht(local, path=SOCKET_PATH):
+    """A DHTPoller stand-in: the daemon's DHT readings when it runs, else `local()`.
+
+    The DHT11 is bit-banged, so a second poller on its pin corrupts sensord's reads."""
+    client = connect(path)
+    if client is not None:
+        return RemoteDHT(client, fallback=local)
+    return local()
+
+
+_local_ads = []  # this process's own ADS1115, opened once by whichever fallback needs it first
+_warned = []
+
+
+def local_channels(*names):
+    """{name: AnalogIn} on this process's own I2C bus."""
+    if not _local_ads:
+        import board
+        import busio
+        from adafruit_ads1x15.ads1115 import ADS1115
+        _local_ads.append(ADS1115(busio.I2C(board.SCL, board.SDA)))
+    from adafruit_ads1x15.analog_in import AnalogIn
+    return {name: AnalogIn(_local_ads[0], CHANNELS.index(name)) for name in names}
+
+
+def _warn_fallback(error):
+    if not _warned:
+        _warned.append(error)
+        print(f"⚠️  lost sensord ({error}); reading the sensors directly from now on.")
+
+
+# --- Entry Point ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Planter sensor daemon")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between conversions of a wanted channel")
+    parser.add_argument("--idle-after", type=float, default=10.0, help="stop converting a channel nobody read for this long")
+    parser.add_argument("--dht-pin", type=int, default=4)
+    parser.add_argument("--relay-pin", type=int, help="let clients switch this relay (off by default)")
+    parser.add_argument("--metrics-port", type=int, default=0)
+    args = parser.parse_args()
+
+    import board
+    import busio
+    import Adafruit_DHT
+    from adafruit_ads1x15.ads1115 import ADS1115, P0, P1, P2, P3
+    from adafruit_ads1x15.analog_in import AnalogIn
+    from dht_poller import DHTPoller
+    import metrics
+
+    i2c = busio.I2C(board.SCL, board.SDA)
+    ads = ADS1115(i2c)
+    channels = {cid: AnalogIn(ads, pin) for cid, pin in enumerate((P0, P1, P2, P3))}
+    dht_poller = DHTPoller(Adafruit_DHT.DHT11, args.dht_pin)
+    dht_poller.start()
+
+    relay = None
+    if args.relay_pin is not None:
+        import RPi.GPIO as GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(args.relay_pin, GPIO.OUT)
+        GPIO.output(args.relay_pin, GPIO.LOW)
+        relay = lambda on: GPIO.output(args.relay_pin, GPIO.HIGH if on else GPIO.LOW)
+
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+
+    cache = SensorCache(channels, dht_poller, interval=args.interval, idle_after=args.idle_after)
+    stop = threading.Event()
+    threading.Thread(target=cache.run, args=(stop,), name="sensord-sampler", daemon=True).start()
+    server = SensorServer(args.socket, cache, relay)
+    print(f"sensord listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+    finally:
+        stop.set()
+        dht_poller.stop()
+        server.server_close()
+        os.unlink(args.socket)
+        if relay is not None:
+            relay(False)
+            GPIO.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,17 @@
 import time
-import board
-import busio
 import RPi.GPIO as GPIO
-from adafruit_ads1x15.ads1115 import ADS1115, P0, P1, P2
-from adafruit_ads1x15.analog_in import AnalogIn
+import sensord
 
 # Setup relay pin
 RELAY_PIN = 14
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(RELAY_PIN, GPIO.OUT)
 
-# Setup I2C and ADS1115
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
-
-# Setup analog input channels
-channel_dht22 = AnalogIn(ads, P0)  # A0
-channel_soil = AnalogIn(ads, P1)   # A1
-channel_water = AnalogIn(ads, P2)  # A2
+# Analog input channels, read through sensord (it owns the I2C bus)
+channels = sensord.open_channels("light", "soil", "water")
+channel_dht22 = channels["light"]  # A0
+channel_soil = channels["soil"]    # A1
+channel_water = channels["water"]  # A2
 
 try:
     while True:
@@ -1,25 +1,16 @@
 import time
-import board
-import busio
-from adafruit_ads1x15.ads1115 import ADS1115, P0, P1, P2
-from adafruit_ads1x15.analog_in import AnalogIn
+import calibration
+import sensord
+from planter_config import load_variables
 
-# Setup I2C and ADS1115
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
+# Analog channels, read through sensord (it owns the I2C bus)
+channels = sensord.open_channels("light", "soil", "water")
+channel_dht11 = channels["light"]  # A0 (for your DHT11's analog output; not real digital data)
+channel_soil = channels["soil"]    # Soil Moisture Sensor
+channel_water = channels["water"]  # Water Level Sensor
 
-# Analog channels
-channel_dht11 = AnalogIn(ads, P0)  # Analog pin (for your DHT11's analog output; not real digital data)
-channel_soil = AnalogIn(ads, P1)   # Soil Moisture Sensor
-channel_water = AnalogIn(ads, P2)  # Water Level Sensor
-
-# Calibrated voltage levels for soil moisture sensor
-SOIL_DRY_VOLTAGE = 3.8378
-SOIL_WET_VOLTAGE = 3.8403
-
-# Calibrated voltage levels for water level sensor
-WATER_EMPTY_VOLTAGE = 0.04
-WATER_FULL_VOLTAGE = 3.0
+# Calibration curves for soil moisture and water level (from variables.conf)
+curves = calibration.load_curves(load_variables())
 
 # --- Helper Functions ---
 
@@ -28,20 +19,10 @@ def read_avg_voltage(channel, samples=10):
     return sum(channel.voltage for _ in range(samples)) / samples
 
 def soil_moisture_percent(voltage):
-    if voltage <= SOIL_DRY_VOLTAGE:
-        return 0
-    elif voltage >= SOIL_WET_VOLTAGE:
-        return 100
-    else:
-        return int((voltage - SOIL_DRY_VOLTAGE) / (SOIL_WET_VOLTAGE - SOIL_DRY_VOLTAGE) * 100)
+    return calibration.percent(curves["soil"], voltage)
 
 def water_level_percent(voltage):
-    if voltage <= WATER_EMPTY_VOLTAGE:
-        return 0
-    elif voltage >= WATER_FULL_VOLTAGE:
-        return 100
-    else:
-        return int((voltage - WATER_EMPTY_VOLTAGE) / (WATER_FULL_VOLTAGE - WATER_EMPTY_VOLTAGE) * 100)
+    return calibration.percent(curves["water"], voltage)
 
 # --- Main Loop ---
 
@@ -1,9 +1,8 @@
 import time
-import board
-import busio
 import RPi.GPIO as GPIO
-from adafruit_ads1x15.ads1115 import ADS1115, P0, P1, P2
-from adafruit_ads1x15.analog_in import AnalogIn
+import calibration
+import sensord
+from planter_config import load_variables
 
 # Setup GPIO for motor control
 RELAY_PIN = 14  # GPIO14 (physical pin 8)
@@ -11,41 +10,24 @@ GPIO.setmode(GPIO.BCM)
 GPIO.setup(RELAY_PIN, GPIO.OUT)
 GPIO.output(RELAY_PIN, GPIO.LOW)
 
-# Setup I2C and ADS1115
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
+# Analog channels, read through sensord (it owns the I2C bus)
+channels = sensord.open_channels("light", "soil", "water")
+channel_dht11 = channels["light"]  # A0
+channel_soil = channels["soil"]
+channel_water = channels["water"]
 
-# Analog channels
-channel_dht11 = AnalogIn(ads, P0)
-channel_soil = AnalogIn(ads, P1)
-channel_water = AnalogIn(ads, P2)
-
-# Calibrated voltage levels (based on your readings)
-SOIL_DRY_VOLTAGE = 3.8378    # 0% moisture
-SOIL_WET_VOLTAGE = 3.8403    # 100% moisture
-
-WATER_EMPTY_VOLTAGE = 0.04
-WATER_FULL_VOLTAGE = 3.0
+# Calibration curves (from variables.conf)
+curves = calibration.load_curves(load_variables())
 
 # Helper Functions
 def read_avg_voltage(channel, samples=10):
     return sum(channel.voltage for _ in range(samples)) / samples
 
 def soil_moisture_percent(voltage):
-    if voltage <= SOIL_DRY_VOLTAGE:
-        return 0
-    elif voltage >= SOIL_WET_VOLTAGE:
-        return 100
-    else:
-        return int((voltage - SOIL_DRY_VOLTAGE) / (SOIL_WET_VOLTAGE - SOIL_DRY_VOLTAGE) * 100)
+    return calibration.percent(curves["soil"], voltage)
 
 def water_level_percent(voltage):
-    if voltage <= WATER_EMPTY_VOLTAGE:
-        return 0
-    elif voltage >= WATER_FULL_VOLTAGE:
-        return 100
-    else:
-        return int((voltage - WATER_EMPTY_VOLTAGE) / (WATER_FULL_VOLTAGE - WATER_EMPTY_VOLTAGE) * 100)
+    return calibration.percent(curves["water"], voltage)
 
 # Main loop
 try:
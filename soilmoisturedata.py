@@ -1,12 +1,7 @@
 import time
-import board
-import busio
-from adafruit_ads1x15.ads1115 import ADS1115, P1
-from adafruit_ads1x15.analog_in import AnalogIn
+import sensord
 
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
-channel_soil = AnalogIn(ads, P1)  # A1
+channel_soil = sensord.open_channels("soil")["soil"]  # A1, through sensord
 
 try:
     while True:
@@ -0,0 +1,107 @@
+"""Cold-start helpers: background initialization, startup timing and systemd readiness.
+
+Deferred runs a slow initializer (TFT bring-up, API clients) on its own thread so
+the control loop can take its first reading without waiting for it. mark() records
+how long after process start each stage was reached, and notify() is sd_notify(3)
+without the libsystemd dependency: a datagram to $NOTIFY_SOCKET, a no-op elsewhere.
+"""
+import os
+import socket
+import threading
+import time
+
+from metrics import Gauge
+
+STARTUP_SECONDS = Gauge("planter_startup_seconds", "Seconds from process start until a startup stage was reached, by stage.")
+BOOT_TO_FIRST_READING = Gauge("planter_boot_to_first_reading_seconds", "Seconds from OS boot until the first sensor reading.")
+
+_imported_at = time.monotonic()
+_marked = {}
+
+
+def _uptime():
+    try:
+        with open("/proc/uptime") as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError):
+        return None
+
+
+def process_age():
+    """Seconds since this process started (from /proc, so interpreter start-up and imports count)."""
+    uptime = _uptime()
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")  # field 22, starttime in clock ticks
+    except (OSError, ValueError, IndexError):
+        started = None
+    if uptime is None or started is None:
+        return time.monotonic() - _imported_at
+    return uptime - started
+
+
+def mark(stage):
+    """Record the first time `stage` is reached; returns its age in seconds (None if already marked)."""
+    if stage in _marked:
+        return None
+    age = process_age()
+    _marked[stage] = age
+    STARTUP_SECONDS.set(round(age, 3), stage=stage)
+    if stage == "first_reading":
+        uptime = _uptime()
+        if uptime is not None:
+            BOOT_TO_FIRST_READING.set(round(uptime, 3))
+    print(f"⏱️ {stage}: {age:.2f} s after start")
+    return age
+
+
+def notify(state):
+    """sd_notify: e.g. notify("READY=1"). Returns False when not run by systemd (Type=notify)."""
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        address = "\0" + address[1:]  # abstract namespace socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode())
+    except OSError:
+        return False
+    return True
+
+
+class Deferred(threading.Thread):
+    """Builds a value on a background thread; get() returns None until it is ready."""
+
+    def __init__(self, name, init):
+        super().__init__(name=f"init-{name}", daemon=True)
+        self.stage = f"{name}_ready"
+        self.init = init
+        self.value = None
+        self.error = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def run(self):
+        try:
+            self.value = self.init()
+            mark(self.stage)
+        except Exception as e:  # reported by get(); the caller keeps running without it
+            self.error = e
+            print(f"❌ {self.name} failed: {e}")
+        finally:
+            self._ready.set()
+
+    def start(self):
+        with self._start_lock:
+            if self.ident is None:
+                super().start()
+
+    def get(self, wait=False, timeout=None):
+        """The value if ready. wait=True starts it if needed and blocks until it is built."""
+        if wait:
+            self.start()
+            self._ready.wait(timeout)
+        return self.value
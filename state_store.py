@@ -0,0 +1,241 @@
+"""Controller state checkpointed to an append-only file, for warm restarts.
+
+Each record is <length, crc32, kind> followed by a pickled dict, appended with one
+write(). A torn or corrupt tail (power cut mid-write) fails its CRC and is cut off, so
+the last complete record wins; on load only that record (and an intent after it) is
+unpickled. Periodic checkpoints are not fsynced; a watering intent and the
+checkpoint that closes it are, so a crash mid-burst is always visible on restart.
+The file is compacted to its latest records once it passes `max_bytes`.
+
+Objects are saved as their snapshot(): learned and runtime state only (fits, gains,
+filter windows, timers). restore() puts that back onto objects freshly built from
+variables.conf, so a config edit still applies after a warm restart.
+
+    store = StateStore()
+    state, interrupted = store.load()     # interrupted: the watering intent a crash left open
+    store.checkpoint({"last_watering_time": t, "objects": {...}})
+
+    python3 state_store.py --simulate      # warm restart across a variables.conf edit
+"""
+import argparse
+import os
+import pickle
+import struct
+import tempfile
+import time
+import zlib
+
+from metrics import Counter, Gauge
+
+STATE_FILE = "planter_state.bin"
+SCHEMA = 2  # 2: objects saved as snapshot() dicts of learned state, not whole pickled objects
+
+HEADER = struct.Struct("<IIB")  # payload length, crc32, kind
+CHECKPOINT, INTENT = 1, 2
+
+CHECKPOINTS = Counter("planter_state_checkpoints_total", "State records appended, by kind.")
+STATE_FILE_BYTES = Gauge("planter_state_file_bytes", "Size of the controller state file.")
+
+
+class StateStore:
+    def __init__(self, path=STATE_FILE, max_bytes=256 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.latest = None   # last checkpoint record, kept for compaction
+        self.intent = None   # open watering intent, if any
+        self.valid_bytes = 0  # end of the last intact record found by load()
+        self._file = None
+
+    # --- Reading ---
+
+    def _scan(self, data):
+        """(kind, payload) of every intact record, oldest first; stops at the first torn one."""
+        offset = 0
+        records = []
+        while offset + HEADER.size <= len(data):
+            length, crc, kind = HEADER.unpack_from(data, offset)
+            payload = data[offset + HEADER.size:offset + HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            records.append((kind, payload))
+            offset += HEADER.size + length
+        self.valid_bytes = offset
+        if offset < len(data):
+            print(f"⚠️ {self.path}: ignoring a torn record at byte {offset}")
+        return records
+
+    def _unpickle(self, payload):
+        try:
+            record = pickle.loads(payload)
+        except Exception as e:  # a class changed shape since it was written
+            print(f"⚠️ {self.path}: unreadable state record: {e}")
+            return None
+        return record if record.get("schema") == SCHEMA else None
+
+    def load(self):
+        """(last checkpoint's state or None, open watering intent or None)."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None, None
+        records = self._scan(data)
+        if self.valid_bytes < len(data):
+            os.truncate(self.path, self.valid_bytes)  # new records must follow the last intact one
+        last = max((i for i, (kind, _) in enumerate(records) if kind == CHECKPOINT), default=-1)
+        if last >= 0:
+            self.latest = self._unpickle(records[last][1])
+        intents = [payload for kind, payload in records[last + 1:] if kind == INTENT]
+        if intents:
+            self.intent = self._unpickle(intents[-1])
+        return (self.latest["state"] if self.latest else None), self.intent
+
+    # --- Writing ---
+
+    def _append(self, record, durable):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(_frame(record))
+        self._file.flush()
+        if durable:
+            os.fsync(self._file.fileno())
+        CHECKPOINTS.inc(kind=record["kind"])
+        size = self._file.tell()
+        STATE_FILE_BYTES.set(size)
+        if size > self.max_bytes:
+            self.compact()
+
+    def checkpoint(self, state, now=None, durable=False):
+        record = {"schema": SCHEMA, "kind": "checkpoint", "t": time.time() if now is None else now, "state": state}
+        closes_intent = self.intent is not None
+        self.intent = None
+        self.latest = record
+        self._append(record, durable or closes_intent)
+
+    def begin(self, action, now=None, **fields):
+        """Write-ahead intent, fsynced before the action starts; the next checkpoint closes it."""
+        self.intent = {"schema": SCHEMA, "kind": "intent", "action": action,
+                       "t": time.time() if now is None else now, **fields}
+        self._append(self.intent, durable=True)
+
+    def compact(self):
+        """Rewrite the file with just the latest checkpoint (and open intent), atomically."""
+        keep = [record for record in (self.latest, self.intent) if record is not None]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".state.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for record in keep:
+                    f.write(_frame(record))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        STATE_FILE_BYTES.set(os.path.getsize(self.path))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _frame(record):
+    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    kind = CHECKPOINT if record["kind"] == "checkpoint" else INTENT
+    return HEADER.pack(len(payload), zlib.crc32(payload), kind) + payload
+
+
+
+# --- Simulation check ---
+
+def simulate(path=None):
+    """Learn on objects built from one config, checkpoint, restore onto objects built from an
+    edited config. Returns the problems found: edited settings lost or learned state not restored."""
+    import filters
+    import anomaly
+    import dosing
+    import watering_predictor
+    from adaptive_sampling import AdaptiveSampler, SamplingScheduler
+
+    def build(config):
+        dose, account = dosing.from_config(config)
+        return {
+            "dose": dose, "account": account, "planner": watering_predictor.from_config(config),
+            "sampling": SamplingScheduler([AdaptiveSampler("soil", 3, config["SAMPLE_MAX_INTERVAL"], change=2)]),
+            "anomaly": anomaly.from_config(config), "filter": filters.build_chain(config["FILTER_SOIL"]),
+        }
+
+    before = {"DOSE_TARGET_LOW": 35, "DOSE_TARGET_HIGH": 55, "DOSE_MAX_SECONDS": 15, "WATER_TRIGGER_PERCENT": 5,
+              "SAMPLE_MAX_INTERVAL": 300, "ANOMALY_STUCK_SECONDS": 3600, "ANOMALY_JUMP_SIGMA": 6,
+              "FILTER_SOIL": "hampel:7:3,kalman:1e-9:2.5e-7"}
+    edited = dict(before, DOSE_TARGET_LOW=50, DOSE_TARGET_HIGH=70, DOSE_MAX_SECONDS=5, WATER_TRIGGER_PERCENT=20,
+                  SAMPLE_MAX_INTERVAL=600, ANOMALY_STUCK_SECONDS=7200, ANOMALY_JUMP_SIGMA=8,
+                  FILTER_SOIL="hampel:5:2,kalman:1e-9:2.5e-7")
+
+    old = build(before)
+    for i in range(200):
+        t = 1000.0 + 60 * i
+        soil = 60 - i * 0.2
+        old["planner"].observe(t, soil)
+        old["sampling"].record("soil", soil, t)
+        old["anomaly"].observe("soil", 2.0 + i * 0.001, t)
+        old["filter"].update(2.0 + i * 0.001, t)
+    old["dose"].pumped(5, 20, 1000)
+    old["dose"].observe_soil(2000, 45)
+    old["account"].pumped(5, 80, 77, 1000)
+
+    path = path or os.path.join(tempfile.mkdtemp(prefix="planter_state_"), STATE_FILE)
+    store = StateStore(path)
+    store.checkpoint({name: target.snapshot() for name, target in old.items()}, now=13000)
+    store.close()
+    saved, _ = StateStore(path).load()
+    new = build(edited)
+    for name, target in new.items():
+        target.restore(saved[name])
+
+    fresh = build(edited)
+    problems = []
+
+    def expect(label, got, want):
+        if got != want:
+            problems.append(f"{label}: {got!r}, expected {want!r}")
+
+    for field in ("target_low", "target_high", "max_burst"):
+        expect(f"dose {field}", getattr(new["dose"], field), getattr(fresh["dose"], field))
+    expect("watering trigger", new["planner"].trigger, fresh["planner"].trigger)
+    expect("soil max interval", new["sampling"]["soil"].max_interval, 600)
+    soil_monitor = new["anomaly"].channels["soil"]
+    expect("stuck seconds", soil_monitor.stuck_seconds, 7200)
+    expect("jump sigma", soil_monitor.jump_sigma, 8)
+    expect("hampel window", new["filter"].stages[0]._window.maxlen, 5)
+    expect("hampel sigmas", new["filter"].stages[0].n_sigmas, 2.0)
+    expect("dose gain", new["dose"].gain, old["dose"].gain)
+    expect("dose observations", new["dose"].observations, 1)
+    expect("tank draw", new["account"].draw_per_second, old["account"].draw_per_second)
+    expect("drying fit", new["planner"].predictor.fit(), old["planner"].predictor.fit())
+    expect("soil next due", new["sampling"]["soil"].next_due, old["sampling"]["soil"].next_due)
+    expect("anomaly stats", soil_monitor.stats.snapshot(), old["anomaly"].channels["soil"].stats.snapshot())
+    expect("kalman estimate", new["filter"].stages[1].value, old["filter"].stages[1].value)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Controller state checkpoints")
+    parser.add_argument("--simulate", action="store_true")
+    args = parser.parse_args()
+    if not args.simulate:
+        parser.print_help()
+        return
+    problems = simulate()
+    for problem in problems:
+        print(f"❌ {problem}")
+    print("warm restart across a variables.conf edit: " + ("ok" if not problems else f"{len(problems)} problems"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Pushes readings and alert events to a fleet collector (collector.py).
+
+Events are buffered and sent in gzip-compressed JSON batches, over HTTP (acknowledged,
+retried with backoff) or UDP (fire-and-forget, one datagram per batch). While the
+collector is unreachable the buffer keeps the newest events in memory and spills the
+oldest to a spool file, which is drained first once the collector is back.
+"""
+import gzip
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+
+from metrics import Counter, Gauge
+
+TELEMETRY_EVENTS = Counter("planter_telemetry_events_total", "Telemetry events by outcome (sent, spooled, dropped).")
+TELEMETRY_BACKLOG = Gauge("planter_telemetry_backlog", "Telemetry events waiting to be sent, in memory and spooled.")
+
+MAX_DATAGRAM = 60_000  # stay under the 64 KB UDP limit after compression
+
+
+def encode_batch(planter, events):
+    return gzip.compress(json.dumps({"planter": planter, "events": events}, separators=(",", ":")).encode(), 6)
+
+
+class TelemetrySender(threading.Thread):
+    """Batches events on a background thread; record() never blocks the control loop."""
+
+    def __init__(self, url, planter, transport="http", batch_size=200, flush_interval=10.0,
+                 max_buffer=5000, spool_path="telemetry_spool.jsonl", timeout=5.0, max_backoff=300.0):
+        super().__init__(name="telemetry", daemon=True)
+        self.url = url
+        self.planter = planter
+        self.transport = transport
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spool_path = spool_path
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._buffer = deque()
+        self._overflow = []  # oldest events pushed out of the buffer, written to the spool by the sender thread
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._backoff = 0.0
+        self._spooled = self._count_spooled()
+        if transport == "udp":
+            host, port = url.rsplit(":", 1)
+            self._udp_addr = (host, int(port))
+            self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    # --- Producer side ---
+
+    def record(self, kind, t=None, **fields):
+        """Queue an event. NaN/inf values are sent as missing (None): the collector rejects a
+        whole batch over one non-finite number, and events with a non-finite time are dropped."""
+        t = time.time() if t is None else t
+        if not math.isfinite(t):
+            TELEMETRY_EVENTS.inc(outcome="dropped")
+            return
+        for key, value in fields.items():
+            if isinstance(value, float) and not math.isfinite(value):
+                fields[key] = None
+        event = {"t": t, "kind": kind, **fields}
+        with self._lock:
+            self._buffer.append(event)
+            if len(self._buffer) > self.max_buffer:
+                self._overflow.append(self._buffer.popleft())
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def stop(self, flush=True):
+        """Stop the sender; whatever a last flush could not deliver goes to the spool file."""
+        self._stopping = True
+        self._wake.set()
+        self.join()
+        if flush:
+            self.flush()
+        with self._lock:
+            leftover = self._overflow + list(self._buffer)
+            self._overflow = []
+            self._buffer.clear()
+        if leftover:
+            self._spool(leftover)
+        self._update_backlog()
+
+    # --- Sender thread ---
+
+    def run(self):
+        while not self._stopping:
+            self._wake.wait(self._backoff or self.flush_interval)
+            self._wake.clear()
+            if self._stopping:
+                break
+            self.flush()
+
+    def flush(self):
+        """Send the spool first (oldest data), then the in-memory buffer. Returns True when empty."""
+        with self._lock:
+            overflow, self._overflow = self._overflow, []
+        if overflow:
+            self._spool(overflow)
+        if self._spooled and not self._drain_spool():
+            return False
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                self._update_backlog()
+                return True
+            if not self._send(batch):
+                with self._lock:
+                    self._buffer.extendleft(reversed(batch))
+                self._update_backlog()
+                return False
+
+    def _send(self, events):
+        payload = encode_batch(self.planter, events)
+        try:
+            if self.transport == "udp":
+                if len(payload) > MAX_DATAGRAM and len(events) > 1:
+                    half = len(events) // 2
+                    return self._send(events[:half]) and self._send(events[half:])
+                self._udp.sendto(payload, self._udp_addr)
+            else:
+                request = urllib.request.Request(self.url, data=payload, method="POST", headers={
+                    "Content-Type": "application/json", "Content-Encoding": "gzip"})
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500:  # the collector rejected the batch; retrying would never succeed
+                TELEMETRY_EVENTS.inc(len(events), outcome="dropped")
+                return True
+            return self._failed()
+        except OSError:
+            return self._failed()
+        self._backoff = 0.0
+        TELEMETRY_EVENTS.inc(len(events), outcome="sent")
+        return True
+
+    def _failed(self):
+        # back off exponentially with jitter so a fleet coming back online doesn't retry in lockstep
+        self._backoff = min(max(self._backoff * 2, 1.0), self.max_backoff) * random.uniform(0.8, 1.2)
+        return False
+
+    # --- Spool file (survives restarts while offline) ---
+
+    def _spool(self, events):
+        with open(self.spool_path, "a") as spool:
+            for event in events:
+                spool.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self._spooled += len(events)
+        TELEMETRY_EVENTS.inc(len(events), outcome="spooled")
+
+    def _drain_spool(self):
+        batch = []
+        done = 0  # spool lines already delivered
+        with open(self.spool_path) as spool:
+            for index, line in enumerate(spool, 1):
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    TELEMETRY_EVENTS.inc(outcome="dropped")  # torn last line after a crash
+                    continue
+                if len(batch) >= self.batch_size:
+                    if not self._send(batch):
+                        self._rewrite_spool(done)
+                        return False
+                    done = index
+                    batch = []
+        if batch and not self._send(batch):
+            self._rewrite_spool(done)
+            return False
+        os.remove(self.spool_path)
+        self._spooled = 0
+        return True
+
+    def _rewrite_spool(self, done):
+        """Drop the first `done` lines that made it out; keep the rest for the next attempt."""
+        if not done:
+            return
+        with open(self.spool_path) as spool:
+            remaining = spool.readlines()[done:]
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, "w") as spool:
+            spool.writelines(remaining)
+        os.replace(tmp_path, self.spool_path)
+        self._spooled = len(remaining)
+
+    def _count_spooled(self):
+        try:
+            with open(self.spool_path) as spool:
+                return sum(1 for _ in spool)
+        except FileNotFoundError:
+            return 0
+
+    def _update_backlog(self):
+        TELEMETRY_BACKLOG.set(len(self._buffer) + len(self._overflow) + self._spooled)
+
+
+def from_config(config, planter=None):
+    """A started sender when TELEMETRY_URL is set in variables.conf, else None."""
+    url = config.get("TELEMETRY_URL")
+    if not url:
+        return None
+    sender = TelemetrySender(
+        str(url),
+        planter or str(config.get("PLANTER_ID", socket.gethostname())),
+        transport=str(config.get("TELEMETRY_TRANSPORT", "http")),
+        flush_interval=float(config.get("TELEMETRY_FLUSH_INTERVAL", 10)),
+    )
+    sender.start()
+    return sender
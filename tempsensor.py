@@ -1,21 +1,28 @@
 import Adafruit_DHT
 import time
+from dht_poller import DHTPoller
 
 # Sensor type and GPIO pin
 SENSOR = Adafruit_DHT.DHT11
 GPIO_PIN = 4  # GPIO4 = Pin 7
 
+# Reads run on a background thread; each print shows the last good reading and its age
+poller = DHTPoller(SENSOR, GPIO_PIN)
+poller.start()
+
 try:
     while True:
-        humidity, temperature = Adafruit_DHT.read_retry(SENSOR, GPIO_PIN)
+        reading = poller.latest()
 
-        if humidity is not None and temperature is not None:
-            print(f"🌡️  Temperature: {temperature:.1f}°C  |  💧 Humidity: {humidity:.1f}%")
+        if reading.quality != "missing":
+            age = time.time() - reading.timestamp
+            print(f"🌡️  Temperature: {reading.temperature:.1f}°C  |  💧 Humidity: {reading.humidity:.1f}%  "
+                  f"({reading.quality}, {age:.0f} s old, {poller.consecutive_failures} failed reads since)")
         else:
             print("❌ Sensor error — no valid readings yet.")
 
         time.sleep(2)
 
 except KeyboardInterrupt:
+    poller.stop()
     print("\n👋 Exiting gracefully...")
-
@@ -0,0 +1,5 @@
+"""The planter modules are top-level scripts: make the repository root importable."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+
+from alert_index import time_window
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+def window(question):
+    start, end, label = time_window(question, NOW)
+    return datetime.fromtimestamp(start), datetime.fromtimestamp(end), label
+
+
+def test_relative_windows():
+    assert window("how hot was it in the last 3 days?") == (datetime(2026, 10, 16, 12), NOW, "the last 3 days")
+    assert window("any alerts in the past hour") == (datetime(2026, 10, 19, 11), NOW, "the last hour")
+    assert window("was it too dry yesterday") == (datetime(2026, 10, 18), datetime(2026, 10, 19), "yesterday")
+    assert window("what happened today") == (datetime(2026, 10, 19), NOW, "today")
+    assert window("alerts last night") == (datetime(2026, 10, 18, 18), datetime(2026, 10, 19, 8), "last night")
+
+
+def test_day_month_dates_fall_on_or_before_now():
+    assert window("alerts on 14-10") == (datetime(2026, 10, 14), datetime(2026, 10, 15), "14-10")
+    assert window("what about 3/10?")[:2] == (datetime(2026, 10, 3), datetime(2026, 10, 4))
+    assert window("and 25-12")[:2] == (datetime(2025, 12, 25), datetime(2025, 12, 26))
+
+
+def test_month_names():
+    assert window("too cold in may") == (datetime(2026, 5, 1), datetime(2026, 6, 1), "May")
+    assert window("december alerts") == (datetime(2025, 12, 1), datetime(2026, 1, 1), "December")
+
+
+@pytest.mark.parametrize("question", [
+    "may I ask why it is so dry",
+    "was it above 23.5 degrees",
+    "humidity between 10-12%",
+    "alerts on 2026-10-01",
+    "alerts on 10-12-2026",
+    "water at 3/4 v",
+    "alerts on 31-02",
+])
+def test_no_window(question):
+    assert time_window(question, NOW) is None
@@ -0,0 +1,94 @@
+import pytest
+
+from alert_rules import AlertEngine, RuleError, compile_plan
+
+RULES = """
+[too_cold]
+metric = temperature
+op = <
+threshold = TEMP_THRESHOLDS_low
+hysteresis = 1
+duration = 30
+message = Too cold: {value:g} < {threshold:g}
+
+[too_dry]
+metric = soil
+op = <=
+threshold = 20
+severity = critical
+repeat = 60
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    rules = tmp_path / "alert_rules.conf"
+    rules.write_text(RULES, encoding="utf-8")
+    variables = tmp_path / "variables.conf"
+    variables.write_text("TEMP_THRESHOLDS_low=18\n", encoding="utf-8")
+    return AlertEngine(str(rules), str(variables), check_interval=1e9)
+
+
+def names(alerts):
+    return [alert.rule for alert in alerts]
+
+
+def test_threshold_resolved_from_variables(engine):
+    steps = {step.name: step for step in engine.plan}
+    assert steps["too_cold"].threshold == 18.0
+    assert steps["too_dry"].threshold == 20.0
+
+
+def test_condition_must_hold_for_duration(engine):
+    assert engine.evaluate({"temperature": 17}, now=0) == []
+    assert engine.evaluate({"temperature": 17}, now=29) == []
+    alerts = engine.evaluate({"temperature": 17.5}, now=30)
+    assert names(alerts) == ["too_cold"]
+    assert alerts[0].fired and alerts[0].message == "Too cold: 17.5 < 18"
+
+
+def test_blip_above_threshold_restarts_the_clock(engine):
+    engine.evaluate({"temperature": 17}, now=0)
+    engine.evaluate({"temperature": 18}, now=20)
+    assert engine.evaluate({"temperature": 17}, now=40) == []
+    assert engine.evaluate({"temperature": 17}, now=69) == []
+    assert names(engine.evaluate({"temperature": 17}, now=70)) == ["too_cold"]
+
+
+def test_hysteresis_band_holds_the_alert(engine):
+    engine.evaluate({"temperature": 17}, now=0)
+    engine.evaluate({"temperature": 17}, now=30)
+    for now, value in ((31, 18.0), (32, 18.5), (33, 18.99)):
+        alerts = engine.evaluate({"temperature": value}, now=now)
+        assert names(alerts) == ["too_cold"] and not alerts[0].fired
+    assert engine.evaluate({"temperature": 19.0}, now=34) == []  # clears at threshold + hysteresis
+    assert engine.evaluate({"temperature": 17}, now=35) == []  # and has to hold for the duration again
+
+
+def test_missing_metric_keeps_state(engine):
+    engine.evaluate({"soil": 10}, now=0)
+    alerts = engine.evaluate({"soil": None}, now=1)
+    assert names(alerts) == ["too_dry"] and alerts[0].message.endswith("(10)")
+    engine.evaluate({"soil": 50}, now=2)
+    assert engine.evaluate({}, now=3) == []
+
+
+def test_repeat_fires_again_and_severity_orders(engine):
+    engine.evaluate({"temperature": 10}, now=0)
+    first = engine.evaluate({"temperature": 10, "soil": 5}, now=30)
+    assert names(first) == ["too_dry", "too_cold"]  # critical before warning
+    assert [alert.fired for alert in first] == [True, True]
+    assert [a.fired for a in engine.evaluate({"temperature": 10, "soil": 5}, now=60)] == [False, False]
+    assert [a.fired for a in engine.evaluate({"temperature": 10, "soil": 5}, now=90)] == [True, False]
+
+
+@pytest.mark.parametrize("rule, error", [
+    ({"metric": "soil", "op": "==", "threshold": "1"}, "unknown op"),
+    ({"op": "<", "threshold": "1"}, "required"),
+    ({"metric": "soil", "threshold": "1", "severity": "fatal"}, "unknown severity"),
+    ({"metric": "soil", "threshold": "NO_SUCH_KEY"}, "neither a number"),
+    ({"metric": "soil", "threshold": "1", "message": "{oops}"}, "bad message template"),
+])
+def test_compile_plan_rejects_bad_rules(rule, error):
+    with pytest.raises(RuleError, match=error):
+        compile_plan({"bad": rule}, {})
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import calibration
+from calibration import Curve
+
+
+def test_two_point_curve_interpolates_and_clamps():
+    curve = Curve([(3.0, 0), (2.0, 100)])  # wetter soil reads lower
+    assert curve(2.5) == pytest.approx(50)
+    assert curve(3.5) == 0
+    assert curve(1.0) == 100
+
+
+def test_multi_point_curve_is_piecewise_linear():
+    curve = Curve([(0.0, 0), (1.0, 10), (2.0, 100)])
+    assert curve(0.5) == pytest.approx(5)
+    assert curve(1.5) == pytest.approx(55)
+    assert curve(1.0) == pytest.approx(10)
+
+
+def test_unclamped_curve_extrapolates_from_end_segments():
+    curve = Curve([(0.0, 0), (1.0, 1000)], clamp=False)
+    assert curve(1.5) == pytest.approx(1500)
+    assert curve(-0.1) == pytest.approx(-100)
+
+
+def test_curve_needs_two_distinct_voltages():
+    with pytest.raises(ValueError):
+        Curve([(1.0, 0)])
+    with pytest.raises(ValueError):
+        Curve([(1.0, 0), (1.0, 100)])
+
+
+def test_vectorized_paths_match_scalar():
+    curve = Curve([(3.8378, 0), (3.8390, 45), (3.8403, 100)])
+    volts = np.linspace(3.83, 3.85, 101)
+    assert curve.apply(volts) == pytest.approx([curve(v) for v in volts])
+    codes = np.array([0, 30700, 30712, 30725, 32767])
+    expected = [curve(c * calibration.ADS1115_FULL_SCALE / calibration.ADS1115_CODES) for c in codes]
+    assert curve.apply_codes(codes) == pytest.approx(expected, abs=1e-3)
+
+
+def test_parse_points_and_config_curves():
+    assert calibration.parse_points("3.8378:0, 3.8403:100,") == [(3.8378, 0.0), (3.8403, 100.0)]
+    config = {"SOIL_DRY_VOLTAGE": 3.0, "SOIL_WET_VOLTAGE": 2.0, "SOIL_CURVE": "3:0,2.5:80,2:100",
+              "WATER_EMPTY_VOLTAGE": 2.0, "WATER_FULL_VOLTAGE": 3.0}
+    curves = calibration.load_curves(config)
+    assert curves["soil"](2.5) == pytest.approx(80)  # SOIL_CURVE wins over the two-point keys
+    assert curves["water"](2.5) == pytest.approx(50)
+    assert curves["light"](0.5) == pytest.approx(500)  # default TEMT6000 curve
+
+
+def test_percent_truncates_like_the_original_maps():
+    curve = Curve([(0.0, 0), (1.0, 100)])
+    assert calibration.percent(curve, 0.999) == 99
+    assert list(calibration.percents(curve, [0.255, 0.5])) == [25, 50]
@@ -0,0 +1,96 @@
+import gzip
+import json
+import queue
+import socket
+
+import pytest
+
+import collector
+
+
+def batch(events, planter="p1"):
+    return json.dumps({"planter": planter, "events": events}).encode()
+
+
+def test_decode_plain_and_gzip():
+    events = [{"kind": "reading", "name": "soil", "value": 42, "t": 1000},
+              {"kind": "alert", "message": "⚠️ Too dry", "t": 1001}]
+    for payload in (batch(events), gzip.compress(batch(events))):
+        planter, decoded = collector.decode_batch(payload)
+        assert planter == "p1"
+        assert [e["kind"] for e in decoded] == ["reading", "alert"]
+        assert decoded[0]["value"] == 42.0 and isinstance(decoded[0]["value"], float)
+
+
+def test_decode_skips_unknown_kinds_and_keeps_missing_values():
+    planter, decoded = collector.decode_batch(batch([
+        {"kind": "heartbeat", "t": "whenever"},
+        {"kind": "reading", "name": "lux", "value": None, "t": 5},
+        {"kind": "reading", "name": "soil", "value": 10 ** 20, "t": 5},
+    ]))
+    assert [e["value"] for e in decoded] == [None, 1e20]
+
+
+@pytest.mark.parametrize("payload", [
+    b"[]",
+    b"1",
+    b'"p1"',
+    b'{"planter": "p1", "events": 5}',
+    b'{"planter": "p1", "events": [1]}',
+    b'{"events": []}',
+    b'{"planter": "", "events": []}',
+    json.dumps({"planter": "x" * 65, "events": []}).encode(),
+    b"[" * 100_000 + b"]" * 100_000,
+    b"not json",
+], ids=["list", "number", "string", "events-not-list", "event-not-object", "no-planter", "empty-planter",
+        "long-planter", "deep-nesting", "garbage"])
+def test_decode_rejects_malformed_batches(payload):
+    with pytest.raises(ValueError):
+        collector.decode_batch(payload)
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), 10 ** 400, True, "12", [1]],
+                         ids=["nan", "inf", "huge-int", "bool", "string", "list"])
+def test_decode_rejects_non_finite_readings(value):
+    payload = json.dumps({"planter": "p1", "events": [{"kind": "reading", "name": "soil", "value": value, "t": 1}]})
+    with pytest.raises(ValueError):
+        collector.decode_batch(payload.encode())
+
+
+def test_decode_rejects_overflowing_literal_and_bad_time():
+    with pytest.raises(ValueError, match="not finite"):
+        collector.decode_batch(b'{"planter": "p1", "events": [{"kind": "reading", "name": "soil", "value": 1e999, "t": 1}]}')
+    with pytest.raises(ValueError, match="event time"):
+        collector.decode_batch(batch([{"kind": "alert", "message": "hi", "t": None}]))
+
+
+def test_decode_rejects_gzip_bomb():
+    bomb = gzip.compress(b'{"planter": "p1", "events": [' + b" " * (collector.MAX_DECOMPRESSED + 1) + b"]}")
+    with pytest.raises(ValueError, match="too large"):
+        collector.decode_batch(bomb)
+
+
+def test_ingest_answers_400_for_malformed_batches(tmp_path):
+    store = collector.Store(str(tmp_path / "fleet.db"))
+    client = collector.create_app(store).test_client()
+    assert client.post("/ingest", data=b"[]").status_code == 400
+    assert client.post("/ingest", data=gzip.compress(b"\x00" * 10)).status_code == 400
+    response = client.post("/ingest", data=batch([{"kind": "reading", "name": "soil", "value": 1, "t": 1}]))
+    assert response.status_code == 200 and response.get_json() == {"accepted": 1}
+
+
+def test_udp_listener_survives_bad_datagrams(tmp_path):
+    store = collector.Store(str(tmp_path / "fleet.db"))  # not started: batches stay in its queue
+    sock = collector.serve_udp(store, host="127.0.0.1", port=0)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        address = sock.getsockname()
+        for payload in (b"[]", b'{"planter": "p1", "events": [1]}', b"\x1f\x8bjunk", b"[" * 60_000):
+            sender.sendto(payload, address)
+        sender.sendto(batch([{"kind": "reading", "name": "soil", "value": 3, "t": 1}]), address)
+        planter, events, transport = store._queue.get(timeout=5)
+    finally:
+        sender.close()
+    assert (planter, transport, events[0]["value"]) == ("p1", "udp", 3.0)
+    with pytest.raises(queue.Empty):
+        store._queue.get_nowait()
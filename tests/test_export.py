@@ -0,0 +1,58 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+import export
+from history import ReadingLog
+
+T0 = 1_790_000_000.0
+
+
+def test_parse_time_accepts_epoch_iso_and_default():
+    assert export.parse_time("1790000000", 5) == T0
+    assert export.parse_time(" 1790000000.5 ", 5) == T0 + 0.5
+    assert export.parse_time("2026-10-01", 5) == datetime(2026, 10, 1).timestamp()
+    assert export.parse_time("2026-10-01T12:30", 5) == datetime(2026, 10, 1, 12, 30).timestamp()
+    assert export.parse_time("", 5) == 5
+    assert export.parse_time(None, 7) == 7
+
+
+@pytest.mark.parametrize("value", ["inf", "nan", "-1", "1e300", "0001-01-01", "9999-12-31", "last tuesday"])
+def test_parse_time_rejects_out_of_range_and_garbage(value):
+    with pytest.raises(ValueError):
+        export.parse_time(value, 0)
+
+
+def test_stream_validates_up_front():
+    with pytest.raises(ValueError, match="unknown format"):
+        export.stream(0, 1, fmt="xml")
+    with pytest.raises(ValueError, match="before until"):
+        export.stream(T0, T0)
+
+
+@pytest.fixture
+def readings(tmp_path):
+    log = ReadingLog(str(tmp_path), flush_interval=1e9)
+    log.record("soil", 41.5, T0)
+    log.record("lux", None, T0 + 1)
+    log.record("soil", 40, T0 + 120)
+    log.flush(T0)
+    return log
+
+
+def test_csv_export(readings):
+    data = b"".join(export.stream(T0, T0 + 60, "csv", readings=readings)).decode()
+    rows = list(csv.reader(io.StringIO(data)))
+    assert rows[0] == ["time", "t", "kind", "name", "value", "message"]
+    assert [row[1:] for row in rows[1:]] == [[f"{T0:.3f}", "reading", "soil", "41.5", ""],
+                                             [f"{T0 + 1:.3f}", "reading", "lux", "", ""]]
+
+
+def test_gzipped_jsonl_export(readings):
+    data = gzip.decompress(b"".join(export.stream(T0, T0 + 3600, "jsonl", compress=True, readings=readings)))
+    events = [json.loads(line) for line in data.decode().splitlines()]
+    assert [(e["name"], e["value"]) for e in events] == [("soil", 41.5), ("lux", None), ("soil", 40)]
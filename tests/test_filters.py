@@ -0,0 +1,86 @@
+import random
+import statistics
+
+import pytest
+
+import filters
+
+
+def test_sliding_median_matches_reference():
+    rng = random.Random(7)
+    median = filters.SlidingMedian(5)
+    samples = []
+    for _ in range(500):
+        x = rng.choice((rng.gauss(2.0, 0.1), 2.0, 2.5))  # repeated values exercise the lazy deletion
+        samples.append(x)
+        assert median.update(x) == pytest.approx(statistics.median(samples[-5:]))
+
+
+def test_sliding_median_even_window_averages_middle_pair():
+    median = filters.SlidingMedian(4)
+    for x in (1.0, 2.0, 10.0, 20.0):
+        result = median.update(x)
+    assert result == 6.0
+
+
+def test_sliding_median_restore_keeps_last_window():
+    median = filters.SlidingMedian(3)
+    for x in (1.0, 2.0, 3.0, 4.0):
+        median.update(x)
+    restored = filters.SlidingMedian(3)
+    restored.restore(median.snapshot())
+    assert restored.update(5.0) == median.update(5.0) == 4.0
+
+
+def test_hampel_replaces_spike_with_window_median():
+    hampel = filters.Hampel(window=5, n_sigmas=3)
+    for x in (2.00, 2.01, 1.99, 2.00):
+        assert hampel.update(x) == x
+    assert hampel.update(9.0) == 2.0
+    assert hampel.outliers == 1
+
+
+def test_hampel_passes_first_samples_and_respects_min_deviation():
+    hampel = filters.Hampel(window=5, n_sigmas=3, min_deviation=0.5)
+    assert hampel.update(1.0) == 1.0
+    assert hampel.update(5.0) == 5.0  # fewer than three samples: nothing to compare against
+    hampel = filters.Hampel(window=5, n_sigmas=3, min_deviation=0.5)
+    for x in (2.0, 2.0, 2.0, 2.0):
+        hampel.update(x)
+    assert hampel.update(2.3) == 2.3  # MAD is 0, but the step is inside min_deviation
+    assert hampel.outliers == 0
+
+
+def test_hampel_restore_keeps_configured_window():
+    hampel = filters.Hampel(window=3)
+    hampel.restore({"window": [1.0, 2.0, 3.0, 4.0, 5.0], "outliers": 2})
+    assert list(hampel.snapshot()["window"]) == [3.0, 4.0, 5.0]
+    assert hampel.outliers == 2
+
+
+def test_build_chain_parses_stages_and_arguments():
+    chain = filters.build_chain(" hampel:7:3, ,kalman:1e-9:2.5e-7,ema:0.5 ", channel="soil")
+    hampel, kalman, ema = chain.stages
+    assert isinstance(hampel, filters.Hampel) and hampel.n_sigmas == 3.0 and hampel.channel == "soil"
+    assert isinstance(kalman, filters.Kalman1D) and kalman.q == 1e-9 and kalman.r == 2.5e-7
+    assert isinstance(ema, filters.EMA) and ema.alpha == 0.5
+
+
+def test_build_chain_rejects_unknown_filter():
+    with pytest.raises(ValueError, match="Unknown filter 'lowpass'"):
+        filters.build_chain("median:5,lowpass:3")
+
+
+def test_empty_chain_passes_samples_through():
+    chain = filters.build_chain("")
+    assert chain.update(1.5) == 1.5
+
+
+def test_chain_restore_ignores_checkpoint_of_another_spec():
+    old = filters.build_chain("median:3")
+    for x in (1.0, 2.0, 3.0):
+        old.update(x)
+    new = filters.build_chain("ema:0.5")
+    new.restore(old.snapshot())
+    assert new.value is None
+    assert new.update(4.0) == 4.0
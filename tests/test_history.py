@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+import history
+from history import RECORD, ReadingLog
+
+T0 = 1_790_000_000.0  # 2026-09-21, mid-day UTC
+
+
+@pytest.fixture
+def log(tmp_path):
+    return ReadingLog(str(tmp_path / "history"), flush_interval=1e9)
+
+
+def test_roundtrip_and_range(log):
+    for i in range(100):
+        log.record("soil", i, T0 + i)
+        log.record("lux", None, T0 + i)
+    log.flush(T0 + 100)
+    readings = list(log.read(T0 + 10, T0 + 12))
+    assert readings == [(T0 + 10, "soil", 10.0), (T0 + 10, "lux", None), (T0 + 11, "soil", 11.0), (T0 + 11, "lux", None)]
+    assert ReadingLog(log.directory).names == ["soil", "lux"]  # channel ids survive a restart
+
+
+def test_segments_split_on_utc_days(log):
+    log.record("soil", 1, T0)
+    log.record("soil", 2, T0 + 86400)
+    log.flush(T0 + 86400)
+    assert sorted(os.listdir(log.directory)) == ["channels", "readings_20260921.bin", "readings_20260922.bin"]
+    assert [value for _, _, value in log.read(T0, T0 + 86401)] == [1.0, 2.0]
+
+
+def test_bisect_finds_first_record_at_or_after(log):
+    for i in range(0, 1000, 10):
+        log.record("soil", i, T0 + i)
+    log.flush(T0)
+    with open(log.segment("20260921"), "rb") as f:
+        count = 100
+        assert history._bisect(f, count, T0) == 0
+        assert history._bisect(f, count, T0 + 10) == 1
+        assert history._bisect(f, count, T0 + 11) == 2
+        assert history._bisect(f, count, T0 + 990) == 99
+        assert history._bisect(f, count, T0 + 991) == 100
+        assert history._bisect(f, count, T0 - 1) == 0
+
+
+def test_flush_truncates_torn_record(log):
+    log.record("soil", 1, T0)
+    log.flush(T0)
+    path = log.segment("20260921")
+    with open(path, "ab") as f:
+        f.write(RECORD.pack(T0 + 1, 0, 99.0)[:7])  # power cut halfway through a write
+    assert [value for _, _, value in log.read(T0, T0 + 10)] == [1.0]  # the partial record is ignored
+    log.record("soil", 2, T0 + 2)
+    log.flush(T0 + 2)
+    assert os.path.getsize(path) == 2 * RECORD.size
+    assert [value for _, _, value in log.read(T0, T0 + 10)] == [1.0, 2.0]
+
+
+def test_expire_removes_old_segments(tmp_path):
+    log = ReadingLog(str(tmp_path), retention_days=2)
+    for day in ("20260917", "20260919", "20260921"):
+        open(log.segment(day), "wb").close()
+    log.expire(T0)
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".bin")) == ["readings_20260919.bin",
+                                                                                        "readings_20260921.bin"]
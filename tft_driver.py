@@ -0,0 +1,268 @@
+import argparse
+import sys
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import Counter
+
+SPI_BYTES = Counter("planter_display_spi_bytes_total", "Pixel bytes sent to the TFT controller.")
+SPI_WINDOWS = Counter("planter_display_windows_total", "Address windows (CASET/RASET/RAMWR) sent to the TFT controller.")
+RGB565_CACHE = Counter("planter_rgb565_cache_total", "RGB565 frame conversions, by cache hit or miss.")
+
+# Bytes of command traffic plus per-transfer latency a new window costs, in pixel-byte equivalents.
+# Two dirty bands closer than this are cheaper to send as one window.
+WINDOW_OVERHEAD_BYTES = 64
+SPI_CHUNK = 4096  # same chunking as the Pimoroni driver's display()
+
+
+def dirty_windows(previous, current, bytes_per_pixel, overhead=WINDOW_OVERHEAD_BYTES):
+    """Return (x0, y0, x1, y1) inclusive windows covering every pixel that differs.
+
+    Changed rows are grouped into bands, each band is trimmed to its changed columns,
+    and neighbouring bands are merged whenever one larger window costs fewer bytes
+    than two windows plus the extra addressing overhead.
+    """
+    diff = previous != current
+    if diff.ndim == 3:
+        diff = diff.any(axis=2)
+    changed_rows = np.flatnonzero(diff.any(axis=1))
+    if changed_rows.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(changed_rows) > 1)
+    starts = np.concatenate(([changed_rows[0]], changed_rows[breaks + 1]))
+    ends = np.concatenate((changed_rows[breaks], [changed_rows[-1]]))
+
+    windows = []
+    for y0, y1 in zip(starts, ends):
+        cols = np.flatnonzero(diff[y0:y1 + 1].any(axis=0))
+        band = (int(cols[0]), int(y0), int(cols[-1]), int(y1))
+        if windows:
+            merged = _union(windows[-1], band)
+            separate = (_area(windows[-1]) + _area(band)) * bytes_per_pixel + overhead
+            if _area(merged) * bytes_per_pixel <= separate:
+                windows[-1] = merged
+                continue
+        windows.append(band)
+    return windows
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _area(window):
+    return (window[2] - window[0] + 1) * (window[3] - window[1] + 1)
+
+
+def rgb_to_rgb565(pixels):
+    """(rows, cols, 3) uint8 RGB -> (rows, cols) uint16 RGB565."""
+    pixels = pixels.astype(np.uint16)
+    return ((pixels[:, :, 0] & 0xF8) << 8) | ((pixels[:, :, 1] & 0xFC) << 3) | (pixels[:, :, 2] >> 3)
+
+
+class RGB565Converter:
+    """RGB image -> panel-order big-endian RGB565, with an LRU of converted frames.
+
+    Conversion runs in place with NumPy ufuncs on preallocated buffers: a cache miss
+    reuses the buffer of the frame it evicts, so steady state allocates nothing, and a
+    recurring frame (idle screen, a standard alert) costs a CRC and a byte compare.
+    The returned array belongs to the cache; it stays valid until max_cached - 1 newer
+    frames have been converted, which always covers the frame sent just before.
+    """
+
+    def __init__(self, max_cached=8):
+        if max_cached < 2:
+            raise ValueError("max_cached must be at least 2 to keep the previous frame intact")
+        self.max_cached = max_cached
+        self._frames = OrderedDict()  # (crc32, rotation) -> (raw RGB bytes, (rows, cols) '>u2' array)
+        self._spare = []
+        self._scratch = None
+
+    def convert(self, image, rotation=0):
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        raw = image.tobytes()
+        key = (zlib.crc32(raw), rotation)
+        entry = self._frames.get(key)
+        if entry is not None and entry[0] == raw:  # the byte compare rules out CRC collisions
+            self._frames.move_to_end(key)
+            RGB565_CACHE.inc(result="hit")
+            return entry[1]
+        RGB565_CACHE.inc(result="miss")
+
+        pixels = np.rot90(np.frombuffer(raw, dtype=np.uint8).reshape(image.height, image.width, 3), rotation // 90)
+        out = self._buffer(pixels.shape[:2])
+        tmp = self._scratch
+        np.copyto(out, pixels[:, :, 0], casting="unsafe")
+        out &= 0xF8
+        out <<= 8
+        np.copyto(tmp, pixels[:, :, 1], casting="unsafe")
+        tmp &= 0xFC
+        tmp <<= 3
+        out |= tmp
+        np.copyto(tmp, pixels[:, :, 2], casting="unsafe")
+        tmp >>= 3
+        out |= tmp
+        if sys.byteorder == "little":
+            out.byteswap(inplace=True)
+        frame = out.view(">u2")  # SPI byte order, ready for tobytes()
+
+        if entry is not None:
+            self._spare.append(entry[1])
+        self._frames[key] = (raw, frame)
+        self._frames.move_to_end(key)
+        if len(self._frames) > self.max_cached:
+            _, (_, evicted) = self._frames.popitem(last=False)
+            self._spare.append(evicted)
+        return frame
+
+    def _buffer(self, shape):
+        if self._scratch is None or self._scratch.shape != shape:
+            self._scratch = np.empty(shape, dtype=np.uint16)
+            self._spare.clear()
+        while self._spare:
+            spare = self._spare.pop().view(np.uint16)
+            if spare.shape == shape:
+                return spare
+        return np.empty(shape, dtype=np.uint16)
+
+
+class DirtyRectDisplay:
+    """Base wrapper: keeps the last frame sent in panel order and pushes only changed windows."""
+
+    bytes_per_pixel = 2
+
+    def __init__(self, device):
+        self.device = device
+        self._previous = None
+
+    def display(self, image):
+        current = self.encode(image)
+        if self._previous is None or self._previous.shape != current.shape:
+            windows = [self.full_window(current)]
+        else:
+            windows = dirty_windows(self._previous, current, self.bytes_per_pixel)
+        for x0, y0, x1, y1 in windows:
+            self.send_window(x0, y0, x1, y1, current[y0:y1 + 1, x0:x1 + 1])
+        self._previous = current
+        return windows
+
+    def invalidate(self):
+        """Forget the panel contents so the next frame is sent in full (e.g. after a reset)."""
+        self._previous = None
+
+    def full_window(self, frame):
+        rows, cols = frame.shape[:2]
+        return (0, 0, cols - 1, rows - 1)
+
+    def encode(self, image):
+        raise NotImplementedError
+
+    def send_window(self, x0, y0, x1, y1, block):
+        raise NotImplementedError
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+
+class PartialST7735(DirtyRectDisplay):
+    """Dirty-rectangle front end for Pimoroni's st7735.ST7735 (RGB565, 2 bytes per pixel)."""
+
+    bytes_per_pixel = 2
+
+    def __init__(self, device, converter=None):
+        super().__init__(device)
+        self.converter = converter or RGB565Converter()
+
+    def encode(self, image):
+        """Panel-order frame shaped like the controller's address window (_height rows of _width).
+
+        The stock display() opens set_window() over _width x _height and streams the rotated
+        image into it row by row. When the rotated image is shaped the other way round (a
+        140x128 image on a width=140, height=128 panel at 270), reshaping keeps that exact
+        byte order, so dirty windows land where display() would have put the pixels.
+        """
+        frame = self.converter.convert(image, self.device._rotation)
+        shape = (self.device._height, self.device._width)
+        if frame.shape != shape:
+            if frame.size != shape[0] * shape[1]:
+                raise ValueError(f"{image.width}x{image.height} image does not fill the "
+                                 f"{self.device._width}x{self.device._height} panel")
+            frame = frame.reshape(shape)
+        return frame
+
+    def full_window(self, frame):
+        return (0, 0, self.device._width - 1, self.device._height - 1)  # as set_window() defaults
+
+    def send_window(self, x0, y0, x1, y1, block):
+        self.device.set_window(x0, y0, x1, y1)  # CASET/RASET/RAMWR, panel offsets applied by the driver
+        data = block.tobytes()  # already big-endian RGB565
+        for i in range(0, len(data), SPI_CHUNK):
+            self.device.data(list(data[i:i + SPI_CHUNK]))
+        SPI_WINDOWS.inc(panel="st7735")
+        SPI_BYTES.inc(len(data), panel="st7735")
+
+
+class PartialLumaST7735(DirtyRectDisplay):
+    """Dirty-rectangle front end for luma.lcd's st7735 device (18-bit colour, 3 bytes per pixel)."""
+
+    bytes_per_pixel = 3
+
+    def encode(self, image):
+        native = self.device.preprocess(image) if hasattr(self.device, "preprocess") else image
+        return np.asarray(native.convert("RGB"))
+
+    def send_window(self, x0, y0, x1, y1, block):
+        left, top, right, bottom = x0, y0, x1 + 1, y1 + 1
+        if hasattr(self.device, "_apply_offsets"):
+            left, top, right, bottom = self.device._apply_offsets((left, top, right, bottom))
+        self.device.command(0x2A, left >> 8, left & 0xFF, (right - 1) >> 8, (right - 1) & 0xFF)
+        self.device.command(0x2B, top >> 8, top & 0xFF, (bottom - 1) >> 8, (bottom - 1) & 0xFF)
+        self.device.command(0x2C)
+        data = block.tobytes()
+        self.device.data(list(data))
+        SPI_WINDOWS.inc(panel="luma_st7735")
+        SPI_BYTES.inc(len(data), panel="luma_st7735")
+
+
+def simulate():
+    """Drive main_program's own panel (fakehw) through PartialST7735 and, in parallel, a plain
+    panel built with the same settings through the stock display(). Returns the frames whose
+    GRAM contents differ."""
+    import benchmarks
+    import fakehw
+    benchmarks.prepare_workdir()
+    import main_program
+    frame_renderer, screen = main_program.display.get(wait=True)
+    panel = screen.device.device
+    reference = fakehw.FakeST7735(width=panel._width, height=panel._height, rotation=panel._rotation,
+                                  offset_left=panel._offset_left, offset_top=panel._offset_top)
+    frames = [["Soil 41%  Water 63%", f"Waiting absorption ({minutes} min left)..."] for minutes in range(3)]
+    frames += [["Too hot! Temp above threshold."], [], ["Soil 41%  Water 63%", "Light: bright"]]
+    mismatched = []
+    for i, lines in enumerate(frames):
+        image = frame_renderer.render(lines)
+        screen.display(image)
+        reference.display(image)
+        if panel.gram.pixels != reference.gram.pixels:
+            mismatched.append(i)
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dirty-rectangle TFT driver")
+    parser.add_argument("--simulate", action="store_true",
+                        help="check partial updates leave GRAM exactly as display() would, on main_program's panel")
+    args = parser.parse_args()
+    if not args.simulate:
+        parser.print_help()
+        return
+    mismatched = simulate()
+    print("GRAM matches display(): " + ("ok" if not mismatched else f"differs after frames {mismatched}"))
+    sys.exit(1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    main()
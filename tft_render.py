@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+from metrics import Counter
+
+DISPLAY_FRAMES = Counter("planter_display_frames_total", "Frames offered to the TFT, by whether they were pushed or skipped.")
+LINE_CACHE = Counter("planter_line_cache_total", "Rasterized line lookups, by cache hit or miss.")
+
+
+class LineCache:
+    """LRU of rasterized text lines keyed by (text, font, color).
+
+    Each entry keeps the measured width, the paste origin, the glyph mask and a solid-colour
+    tile, so a cached line is composed with a single paste instead of textbbox() + text().
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, text, font, color):
+        key = (text, font, color)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            LINE_CACHE.inc(result="hit")
+            return entry
+        LINE_CACHE.inc(result="miss")
+        left, top, right, bottom = font.getbbox(text)
+        origin = (min(left, 0), min(top, 0))  # glyphs such as "j" can start left of the pen
+        mask = Image.new("L", (max(right - origin[0], 1), max(bottom - origin[1], 1)), 0)
+        ImageDraw.Draw(mask).text((-origin[0], -origin[1]), text, font=font, fill=255)
+        tile = Image.new("RGB", mask.size, color)
+        entry = (right - left, origin, tile, mask)
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+
+class TextFrameRenderer:
+    """Composes centred lines of text into a frame, reusing the last frame when nothing changed."""
+
+    def __init__(self, width, height, font, line_height, background="black", line_cache=None):
+        self.width = width
+        self.height = height
+        self.font = font
+        self.line_height = line_height
+        self.background = background
+        self.line_cache = line_cache or LineCache()
+        self._last_key = None
+        self._last_frame = None
+
+    def render(self, lines, color=(255, 255, 0)):
+        key = (tuple(lines), color)
+        if key == self._last_key:
+            return self._last_frame
+        image = Image.new("RGB", (self.width, self.height), self.background)
+        y = (self.height - self.line_height * len(lines)) // 2
+        for line in lines:
+            w, origin, tile, mask = self.line_cache.get(line, self.font, color)
+            x = (self.width - w) // 2
+            image.paste(tile, (x + origin[0], y + origin[1]), mask)
+            y += self.line_height
+        self._last_key = key
+        self._last_frame = image
+        return image
+
+
+class ChangeDetectingDisplay:
+    """Wraps a display and skips display() when the frame is identical to the last one pushed."""
+
+    def __init__(self, device):
+        self.device = device
+        self._last_frame = None
+
+    def display(self, image):
+        raw = image.tobytes()
+        if raw == self._last_frame:  # a straight memcmp is cheaper than hashing the frame
+            DISPLAY_FRAMES.inc(result="skipped")
+            return False
+        self.device.display(image)
+        self._last_frame = raw
+        DISPLAY_FRAMES.inc(result="pushed")
+        return True
+
+    def invalidate(self):
+        """Force the next frame out, e.g. after the panel was reset or re-initialised."""
+        self._last_frame = None
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+
+class FrameCarousel(threading.Thread):
+    """Rotates through the published frames on its own timer, off the control thread.
+
+    publish() takes the current set of frame keys (e.g. (emoji, message) pairs). Frames
+    are composed once per key by `compose(key)` and kept in an LRU, so a recurring alert
+    is never re-rendered. When the set changes, the frame on screen keeps its place and
+    its time slot if it is still in the set; otherwise the new set starts at once from
+    its first frame. Republishing faster than `interval` therefore never stalls rotation.
+    """
+
+    def __init__(self, device, compose, interval=4.0, max_cached=32):
+        super().__init__(name="tft-carousel", daemon=True)
+        self.device = device
+        self.compose = compose
+        self.interval = interval
+        self.max_cached = max_cached
+        self._frames = OrderedDict()
+        self._keys = ()
+        self._lock = threading.Lock()  # _keys and _changed move together
+        self._changed = threading.Event()
+        self._stopping = False
+
+    def publish(self, keys):
+        keys = tuple(keys)
+        with self._lock:
+            if keys != self._keys:
+                self._keys = keys
+                self._changed.set()
+
+    def stop(self):
+        self._stopping = True
+        self._changed.set()
+        self.join()
+
+    def frame(self, key):
+        image = self._frames.get(key)
+        if image is None:
+            image = self._frames[key] = self.compose(key)
+            if len(self._frames) > self.max_cached:
+                self._frames.popitem(last=False)
+        else:
+            self._frames.move_to_end(key)
+        return image
+
+    def run(self):
+        index = 0        # position of the next frame to show
+        shown = None
+        due = 0.0        # monotonic time the next frame is due
+        while not self._stopping:
+            with self._lock:
+                changed = self._changed.is_set()
+                self._changed.clear()
+                keys = self._keys
+            if changed:
+                for key in keys:
+                    self.frame(key)  # pre-render the whole set before rotating through it
+                if shown in keys:
+                    index = keys.index(shown) + 1  # keep rotating from the frame on screen
+                else:
+                    index, due = 0, 0.0
+            now = time.monotonic()
+            if keys and now >= due:
+                key = keys[index % len(keys)]
+                if key != shown:
+                    self.device.display(self.frame(key))
+                    shown = key
+                index += 1
+                due = now + self.interval
+            self._changed.wait(max(due - time.monotonic(), 0.0) if keys else self.interval)
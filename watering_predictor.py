@@ -0,0 +1,245 @@
+"""Predicts when the soil will be dry from its recent drying trend.
+
+DryingPredictor fits soil moisture against time with exponentially forgetting
+least squares (O(1) per sample, old points fade with `half_life`). WateringPlanner
+turns the fit into decisions: water shortly *before* the trigger level is reached,
+and when the next soil sample is worth taking.
+
+    python3 watering_predictor.py --simulate      # check against simulated drying curves
+"""
+import argparse
+import math
+import random
+
+from metrics import Gauge
+
+PREDICTED_DRY_IN = Gauge("planter_predicted_dry_seconds", "Predicted seconds until soil moisture reaches the watering trigger.")
+DRYING_RATE = Gauge("planter_soil_drying_rate", "Fitted soil moisture trend in percent per hour (negative while drying).")
+
+
+class DryingPredictor:
+    """Weighted linear regression of moisture (%) on time, with exponential forgetting."""
+
+    def __init__(self, half_life=7200.0, min_points=4, min_span=600.0):
+        self.half_life = half_life
+        self.min_points = min_points
+        self.min_span = min_span
+        self.reset()
+
+    def reset(self, now=None):
+        """Forget the fit, e.g. after watering: the curve jumps and a new drying phase starts."""
+        self._t0 = now
+        self._last = None
+        self._sw = self._st = self._sy = self._stt = self._sty = self._syy = 0.0
+        self.points = 0
+        self._first = None
+
+    def update(self, now, moisture):
+        if self._t0 is None:
+            self._t0 = now
+        if self._last is not None:
+            decay = 0.5 ** ((now - self._last) / self.half_life)
+            self._sw *= decay
+            self._st *= decay
+            self._sy *= decay
+            self._stt *= decay
+            self._sty *= decay
+            self._syy *= decay
+        t = now - self._t0
+        self._sw += 1.0
+        self._st += t
+        self._sy += moisture
+        self._stt += t * t
+        self._sty += t * moisture
+        self._syy += moisture * moisture
+        self._last = now
+        self._first = now if self._first is None else self._first
+        self.points += 1
+
+    _LEARNED = ("_t0", "_last", "_sw", "_st", "_sy", "_stt", "_sty", "_syy", "points", "_first")
+
+    def snapshot(self):
+        return {name: getattr(self, name) for name in self._LEARNED}
+
+    def restore(self, state):
+        for name in self._LEARNED:
+            setattr(self, name, state[name])
+
+    def fit(self):
+        """(slope %/s, value at the last sample, residual std) or None until there is enough data."""
+        if self.points < self.min_points or self._last - self._first < self.min_span:
+            return None
+        w = self._sw
+        mean_t = self._st / w
+        mean_y = self._sy / w
+        var_t = self._stt / w - mean_t * mean_t
+        if var_t <= 0:
+            return None
+        slope = (self._sty / w - mean_t * mean_y) / var_t
+        residual = max(self._syy / w - mean_y * mean_y - slope * slope * var_t, 0.0)
+        level = mean_y + slope * (self._last - self._t0 - mean_t)
+        return slope, level, math.sqrt(residual)
+
+    def time_to(self, level, now):
+        """Seconds from now until the fitted trend reaches `level`; None when not drying or unknown."""
+        fit = self.fit()
+        if fit is None:
+            return None
+        slope, current, _ = fit
+        DRYING_RATE.set(slope * 3600)
+        if slope >= 0:
+            return None
+        remaining = (current - level) / -slope - (now - self._last)
+        return max(remaining, 0.0)
+
+
+class WateringPlanner:
+    """Schedules watering ahead of the trigger and the next soil sample from the fitted trend."""
+
+    def __init__(self, predictor=None, trigger=5.0, lead_time=600.0, sample_change=2.0,
+                 min_sample_interval=3.0, max_sample_interval=1800.0):
+        self.predictor = predictor or DryingPredictor()
+        self.trigger = trigger
+        self.lead_time = lead_time
+        self.sample_change = sample_change
+        self.min_sample_interval = min_sample_interval
+        self.max_sample_interval = max_sample_interval
+
+    def observe(self, now, moisture):
+        self.predictor.update(now, moisture)
+
+    def watered(self, now):
+        self.predictor.reset(now)
+
+    def snapshot(self):
+        return {"predictor": self.predictor.snapshot()}
+
+    def restore(self, state):
+        self.predictor.restore(state["predictor"])
+
+    def time_to_dry(self, now):
+        remaining = self.predictor.time_to(self.trigger, now)
+        if remaining is not None:
+            PREDICTED_DRY_IN.set(remaining)
+        return remaining
+
+    def should_water(self, now, moisture):
+        """Soil at or below the trigger, or predicted to get there within lead_time."""
+        if moisture <= self.trigger:
+            return True
+        remaining = self.time_to_dry(now)
+        return remaining is not None and remaining <= self.lead_time
+
+    def next_watering(self, now):
+        """Absolute time watering is expected to be due, or None while the trend is unknown."""
+        remaining = self.time_to_dry(now)
+        return None if remaining is None else now + max(remaining - self.lead_time, 0.0)
+
+    def next_sample(self, now):
+        """When the soil is next expected to have moved `sample_change` percent, or to need water."""
+        fit = self.predictor.fit()
+        if fit is None:
+            return None  # no trend yet: leave sampling to the caller's own schedule
+        slope = abs(fit[0])
+        interval = self.sample_change / slope if slope > 0 else self.max_sample_interval
+        interval = min(max(interval, self.min_sample_interval), self.max_sample_interval)
+        due = self.next_watering(now)
+        return min(now + interval, due) if due is not None else now + interval
+
+
+def from_config(config):
+    return WateringPlanner(
+        DryingPredictor(half_life=config.get("PREDICT_HALF_LIFE", 7200)),
+        trigger=config.get("WATER_TRIGGER_PERCENT", 5),
+        lead_time=config.get("PREDICT_LEAD_SECONDS", 600),
+        max_sample_interval=config.get("SAMPLE_MAX_INTERVAL", 300),
+    )
+
+
+# --- Simulation check ---
+
+def simulated_soil(rate, seed):
+    """A soil model: dries at `rate` %/h at midday, slower at night and as it gets drier."""
+    rng = random.Random(seed)
+    state = {"m": 70.0}
+
+    def step(t, dt):
+        daylight = 0.3 + 0.7 * max(math.sin(2 * math.pi * (t / 86400.0 - 0.25)), 0.0)
+        state["m"] = max(state["m"] - rate * daylight * (0.4 + 0.6 * state["m"] / 70) * dt / 3600, 0.0)
+        return state["m"]
+
+    def read():
+        return max(0, min(100, int(state["m"] + rng.gauss(0, 0.7))))  # integer %, like soil_moisture_percent
+
+    def water(amount=45.0):
+        state["m"] = min(state["m"] + amount, 95.0)
+
+    return step, read, water
+
+
+def simulate(strategy, hours=168, rate=3.0, seed=0, dt=3.0):
+    """Runs 'reactive' (water at 0 %, sample every tick) or 'predictive' watering on the model.
+
+    Returns hours the soil spent below the trigger, waterings, soil samples taken, and the
+    median error (minutes) of time-to-trigger predictions made 1-6 h ahead. The error can
+    only be scored when the soil is allowed to reach the trigger, i.e. in the reactive run.
+    """
+    step, read, water = simulated_soil(rate, seed)
+    planner = WateringPlanner(max_sample_interval=1800)
+    t = 0.0
+    next_sample = 0.0
+    last_watering = -1e9
+    stressed = waterings = samples = 0
+    reading = 100
+    predictions = []  # (made at, predicted crossing time)
+    errors = []
+    below = False
+    while t < hours * 3600:
+        true_m = step(t, dt)
+        if true_m < planner.trigger:
+            stressed += dt
+            if not below:  # the true curve just crossed the trigger: score the earlier predictions
+                errors += [abs(p - t) / 60 for made, p in predictions if 3600 <= t - made <= 6 * 3600]
+                predictions = []
+            below = True
+        if strategy == "reactive" or t >= next_sample:
+            reading = read()
+            samples += 1
+            planner.observe(t, reading)
+            next_sample = planner.next_sample(t) or t + 60
+            remaining = planner.time_to_dry(t)
+            if remaining is not None:
+                predictions.append((t, t + remaining))
+        due = reading == 0 if strategy == "reactive" else planner.should_water(t, reading)
+        if due and t - last_watering >= 300:
+            water()
+            waterings += 1
+            last_watering = t
+            planner.watered(t)
+            predictions = []
+            below = False
+            next_sample = t + 60
+        t += dt
+    errors.sort()
+    median_error = errors[len(errors) // 2] if errors else float("nan")
+    return stressed / 3600, waterings, samples, median_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soil drying predictor")
+    parser.add_argument("--simulate", action="store_true", help="compare reactive vs predictive watering")
+    parser.add_argument("--hours", type=float, default=168)
+    args = parser.parse_args()
+    if not args.simulate:
+        parser.print_help()
+        return
+    print(f"{'drying rate':>12} {'strategy':>11} {'h < trigger':>12} {'waterings':>10} {'samples':>8} {'ETA error':>10}")
+    for rate in (1.5, 3.0, 6.0):
+        for strategy in ("reactive", "predictive"):
+            stressed, waterings, samples, error = simulate(strategy, args.hours, rate)
+            error = f"{error:.0f} min" if error == error else "-"
+            print(f"{rate:>9.1f}%/h {strategy:>11} {stressed:>12.2f} {waterings:>10} {samples:>8} {error:>10}")
+
+
+if __name__ == "__main__":
+    main()
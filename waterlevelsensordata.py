@@ -1,15 +1,8 @@
 import time
-import board
-import busio
-from adafruit_ads1x15.ads1115 import ADS1115, P2
-from adafruit_ads1x15.analog_in import AnalogIn
+import sensord
 
-# Setup I2C and ADS1115
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
-
-# Water level sensor is connected to A2
-channel_water = AnalogIn(ads, P2)
+# Water level sensor is connected to A2 (read through sensord, which owns the I2C bus)
+channel_water = sensord.open_channels("water")["water"]
 
 def read_avg_voltage(channel, samples=10):
     return sum(channel.voltage for _ in range(samples)) / samples